@@ -4,6 +4,7 @@ import os
 import csv
 import io
 import hashlib
+import hmac
 from datetime import datetime, timedelta
 from functools import wraps
 from zoneinfo import ZoneInfo
@@ -13,13 +14,33 @@ load_dotenv()
 
 from flask import (
     Flask, request, redirect, render_template, session,
-    flash, url_for, jsonify, Response
+    flash, url_for, jsonify, Response, stream_with_context, g
 )
 from werkzeug.security import generate_password_hash, check_password_hash
-from models import init_db, get_db
+from models import init_db, get_db, get_main_db, get_read_db, current_db_path
+from member_versions import VERSIONED_FIELDS, record_changes, summary_as_of, members_as_of, monthly_value
+import perf
+import metrics
+from clicks import record_click, unique_visitors, SEGMENTS, TOP_REFERRERS, OTHER_REFERRERS
+import attribution
+from referrals import sync_referrers, tree_summary, descendants
+import live
+import csv_import
+import mrr_movements
+import communities
+import timeseries
+import widgets
+import assets
+import payloads
+import replica
+import maintenance
+from payloads import api_json
 
 app = Flask(__name__)
 app.secret_key = os.environ.get("SECRET_KEY", "dev-secret-key-change-me")
+app.config["PERF_PROFILING"] = os.environ.get("PERF_PROFILING", "") == "1"
+app.config["ANALYTICS_REPLICA"] = os.environ.get("ANALYTICS_REPLICA", "1") != "0"
+app.config["MAINTENANCE"] = os.environ.get("MAINTENANCE", "1") != "0"
 
 SKOOL_URL = os.environ.get("SKOOL_INVITE_URL", "https://www.skool.com/stepizy-sois-enfin-visible-5378/about")
 TZ = ZoneInfo("Europe/Paris")
@@ -29,28 +50,48 @@ DEFAULT_CHANNELS = [
     "newsletter", "google-ads", "reddit", "substack", "direct", "autre"
 ]
 
-init_db(app)
+VERSIONED_COLUMNS = ", ".join(VERSIONED_FIELDS)
+# Rejected rows listed on the upload page (all of them are counted)
+MAX_IMPORT_ERRORS = 100
+
+
+def startup():
+    """Migrations, asset build, background threads and the admin account."""
+    init_db(app)
+    payloads.init_app(app)
+    assets.init_app(app)
+    communities.init_app(app)
+    replica.init_app(app, communities.database_paths)
+    maintenance.init_app(app, communities.database_paths)
+    perf.init_app(app)
+    metrics.init_app(app)
+
+    # Create or update admin on every startup
+    with app.app_context():
+        db = get_main_db()
+        admin_pw_raw = os.environ.get("ADMIN_PASSWORD", "admin")
+        print(f"[STARTUP] ADMIN_PASSWORD from env: '{admin_pw_raw[:3]}***' (length: {len(admin_pw_raw)})")
+        admin_pw = generate_password_hash(admin_pw_raw)
+        existing = db.execute("SELECT id FROM users WHERE username = 'admin'").fetchone()
+        if existing:
+            db.execute("UPDATE users SET password_hash = ? WHERE username = 'admin'", (admin_pw,))
+            print("[STARTUP] Admin password UPDATED")
+        else:
+            db.execute(
+                "INSERT INTO users (username, password_hash, role, created_at) VALUES (?, ?, ?, ?)",
+                ("admin", admin_pw, "admin", datetime.now(TZ).strftime("%Y-%m-%d %H:%M:%S"))
+            )
+            print("[STARTUP] Admin user CREATED")
+        db.commit()
+        # Verify it works
+        verify = db.execute("SELECT password_hash FROM users WHERE username = 'admin'").fetchone()
+        print(f"[STARTUP] Verify login test: {check_password_hash(verify['password_hash'], admin_pw_raw)}")
 
-# Create or update admin on every startup
-with app.app_context():
-    db = get_db()
-    admin_pw_raw = os.environ.get("ADMIN_PASSWORD", "admin")
-    print(f"[STARTUP] ADMIN_PASSWORD from env: '{admin_pw_raw[:3]}***' (length: {len(admin_pw_raw)})")
-    admin_pw = generate_password_hash(admin_pw_raw)
-    existing = db.execute("SELECT id FROM users WHERE username = 'admin'").fetchone()
-    if existing:
-        db.execute("UPDATE users SET password_hash = ? WHERE username = 'admin'", (admin_pw,))
-        print("[STARTUP] Admin password UPDATED")
-    else:
-        db.execute(
-            "INSERT INTO users (username, password_hash, role, created_at) VALUES (?, ?, ?, ?)",
-            ("admin", admin_pw, "admin", datetime.now(TZ).strftime("%Y-%m-%d %H:%M:%S"))
-        )
-        print("[STARTUP] Admin user CREATED")
-    db.commit()
-    # Verify it works
-    verify = db.execute("SELECT password_hash FROM users WHERE username = 'admin'").fetchone()
-    print(f"[STARTUP] Verify login test: {check_password_hash(verify['password_hash'], admin_pw_raw)}")
+
+# Under `python app.py`, csv_import's pool processes re-import this file as __mp_main__;
+# they only parse CSV chunks, so the startup is not repeated there
+if __name__ != "__mp_main__":
+    startup()
 
 
 # ==================== AUTH ====================
@@ -81,7 +122,7 @@ def login():
     if request.method == "POST":
         username = request.form.get("username", "").strip()
         password = request.form.get("password", "")
-        db = get_db()
+        db = get_main_db()
         user = db.execute("SELECT * FROM users WHERE username = ?", (username,)).fetchone()
         if user and check_password_hash(user["password_hash"], password):
             session["user_id"] = user["id"]
@@ -99,8 +140,38 @@ def logout():
     return redirect(url_for("login"))
 
 
+def refresh_replica():
+    """Have the analytics replica copied after a write the user expects to see shortly (in the background)."""
+    if app.config["ANALYTICS_REPLICA"]:
+        replica.request_refresh(current_db_path())
+
+
 # ==================== DASHBOARD ====================
 
+def widget_response(name):
+    try:
+        return jsonify(widgets.compute(get_read_db(), [name], request.args, datetime.now(TZ), key=current_db_path())[name])
+    except timeseries.RangeError as e:
+        return jsonify({"error": str(e)}), 400
+
+
+@app.route("/api/bundle")
+@login_required
+def api_bundle():
+    """Several dashboard widgets in one document, computed from a single scan of members.
+
+    ?widgets=overview,revenue,referrals,churn,referral_tree,mrr_movements (range and limit arguments
+    of the single-widget endpoints apply to the matching widgets).
+    """
+    names = list(dict.fromkeys(w.strip() for w in request.args.get("widgets", "overview").split(",") if w.strip()))
+    unknown = [w for w in names if w not in widgets.WIDGETS]
+    if unknown:
+        return jsonify({"error": f"Widget inconnu : {', '.join(unknown)}"}), 400
+    try:
+        return api_json(widgets.compute(get_read_db(), names, request.args, datetime.now(TZ), key=current_db_path()))
+    except timeseries.RangeError as e:
+        return jsonify({"error": str(e)}), 400
+
 @app.route("/")
 @app.route("/dashboard")
 @login_required
@@ -111,57 +182,7 @@ def dashboard():
 @app.route("/api/overview")
 @login_required
 def api_overview():
-    db = get_db()
-    now = datetime.now(TZ)
-    this_month = now.strftime("%Y-%m")
-    last_month = (now.replace(day=1) - timedelta(days=1)).strftime("%Y-%m")
-
-    total = db.execute("SELECT COUNT(*) as c FROM members WHERE status = 'active'").fetchone()["c"]
-    total_ever = db.execute("SELECT COUNT(*) as c FROM members WHERE email NOT LIKE '__no_email_%'").fetchone()["c"]
-    churned = db.execute("SELECT COUNT(*) as c FROM members WHERE status = 'churned'").fetchone()["c"]
-    this_month_new = db.execute(
-        "SELECT COUNT(*) as c FROM members WHERE joined_at LIKE ?", (this_month + "%",)
-    ).fetchone()["c"]
-    last_month_new = db.execute(
-        "SELECT COUNT(*) as c FROM members WHERE joined_at LIKE ?", (last_month + "%",)
-    ).fetchone()["c"]
-
-    # MRR — only count active members who have actually paid (LTV > 0)
-    mrr = db.execute("SELECT SUM(price) as s FROM members WHERE status = 'active' AND price > 0 AND ltv > 0 AND recurring_interval = 'month'").fetchone()["s"] or 0
-    annual_monthly = db.execute("SELECT SUM(price) as s FROM members WHERE status = 'active' AND price > 0 AND ltv > 0 AND recurring_interval = 'year'").fetchone()["s"] or 0
-    mrr += annual_monthly / 12
-
-    avg_ltv = db.execute("SELECT AVG(ltv) as a FROM members WHERE ltv > 0").fetchone()["a"] or 0
-    total_ltv = db.execute("SELECT SUM(ltv) as s FROM members").fetchone()["s"] or 0
-
-    referral_count = db.execute("SELECT COUNT(*) as c FROM members WHERE invited_by != ''").fetchone()["c"]
-    referral_pct = round(referral_count / total * 100, 1) if total > 0 else 0
-
-    # Growth rate
-    growth = 0
-    if last_month_new > 0:
-        growth = round((this_month_new - last_month_new) / last_month_new * 100, 1)
-
-    # Members by month for sparkline
-    monthly = db.execute("""
-        SELECT SUBSTR(joined_at, 1, 7) as month, COUNT(*) as cnt
-        FROM members GROUP BY month ORDER BY month
-    """).fetchall()
-
-    return jsonify({
-        "total_members": total,
-        "total_ever": total_ever,
-        "churned": churned,
-        "this_month_new": this_month_new,
-        "last_month_new": last_month_new,
-        "growth_pct": growth,
-        "mrr": round(mrr, 2),
-        "avg_ltv": round(avg_ltv, 2),
-        "total_ltv": round(total_ltv, 2),
-        "referral_count": referral_count,
-        "referral_pct": referral_pct,
-        "monthly": [{"month": r["month"], "count": r["cnt"]} for r in monthly]
-    })
+    return widget_response("overview")
 
 
 # ==================== GROWTH ====================
@@ -175,29 +196,34 @@ def growth_page():
 @app.route("/api/growth")
 @login_required
 def api_growth():
-    db = get_db()
-    group_by = request.args.get("group", "day")
-
-    if group_by == "week":
-        sql = """SELECT SUBSTR(joined_at, 1, 4) || '-W' ||
-                 CAST((JULIANDAY(joined_at) - JULIANDAY(SUBSTR(joined_at, 1, 4) || '-01-01')) / 7 + 1 AS INTEGER) as period,
-                 COUNT(*) as cnt FROM members GROUP BY period ORDER BY period"""
-    elif group_by == "month":
-        sql = "SELECT SUBSTR(joined_at, 1, 7) as period, COUNT(*) as cnt FROM members GROUP BY period ORDER BY period"
-    else:
-        sql = "SELECT DATE(joined_at) as period, COUNT(*) as cnt FROM members GROUP BY period ORDER BY period"
-
-    rows = db.execute(sql).fetchall()
-    data = [{"period": r["period"], "count": r["cnt"]} for r in rows]
-
-    # Cumulative
+    db = get_read_db()
+    first = db.execute("SELECT MIN(DATE(joined_at)) AS d FROM members").fetchone()["d"]
+    try:
+        start, end, granularity, max_points = timeseries.parse_range(
+            {"granularity": request.args.get("group", "day"), **request.args},
+            timeseries.parse_day(first), datetime.now(TZ).date()
+        )
+    except timeseries.RangeError as e:
+        return jsonify({"error": str(e)}), 400
+
+    points, step = timeseries.series(db, """
+        SELECT DATE(joined_at) AS day, COUNT(*) AS value FROM members
+        WHERE joined_at >= ? AND joined_at < ? GROUP BY day
+    """, (start.isoformat() if start else "", (end + timedelta(days=1)).isoformat()), start, end, granularity,
+        max_points=max_points)
+    data = [{"period": period, "count": count} for period, count in points]
+
+    # Cumulative, starting from the members who joined before the range
+    total = db.execute(
+        "SELECT COUNT(*) AS c FROM members WHERE joined_at < ?", (start.isoformat() if start else "",)
+    ).fetchone()["c"]
     cumulative = []
-    total = 0
     for d in data:
         total += d["count"]
         cumulative.append({"period": d["period"], "total": total})
 
-    return jsonify({"signups": data, "cumulative": cumulative})
+    return api_json({"signups": data, "cumulative": cumulative,
+                    "range": timeseries.range_info(start, end, granularity, step)})
 
 
 # ==================== REVENUE ====================
@@ -211,54 +237,14 @@ def revenue_page():
 @app.route("/api/revenue")
 @login_required
 def api_revenue():
-    db = get_db()
-
-    # Price distribution
-    prices = db.execute("""
-        SELECT price, COUNT(*) as cnt FROM members
-        WHERE price > 0 GROUP BY price ORDER BY cnt DESC
-    """).fetchall()
-
-    # Tier distribution
-    tiers = db.execute("""
-        SELECT tier, COUNT(*) as cnt FROM members
-        WHERE tier != '' GROUP BY tier ORDER BY cnt DESC
-    """).fetchall()
-
-    # LTV distribution buckets
-    ltv_buckets = db.execute("""
-        SELECT
-            CASE
-                WHEN ltv = 0 THEN '0 (gratuit)'
-                WHEN ltv <= 30 THEN '1-30'
-                WHEN ltv <= 60 THEN '31-60'
-                WHEN ltv <= 100 THEN '61-100'
-                WHEN ltv <= 200 THEN '101-200'
-                ELSE '200+'
-            END as bucket,
-            COUNT(*) as cnt
-        FROM members GROUP BY bucket ORDER BY MIN(ltv)
-    """).fetchall()
-
-    # Revenue per month (new members * price)
-    monthly_rev = db.execute("""
-        SELECT SUBSTR(joined_at, 1, 7) as month, SUM(price) as revenue, COUNT(*) as members
-        FROM members WHERE price > 0
-        GROUP BY month ORDER BY month
-    """).fetchall()
+    return widget_response("revenue")
 
-    # Free vs paid
-    free = db.execute("SELECT COUNT(*) as c FROM members WHERE price = 0 OR price IS NULL OR price = ''").fetchone()["c"]
-    paid = db.execute("SELECT COUNT(*) as c FROM members WHERE price > 0").fetchone()["c"]
 
-    return jsonify({
-        "prices": [{"price": r["price"], "count": r["cnt"]} for r in prices],
-        "tiers": [{"tier": r["tier"], "count": r["cnt"]} for r in tiers],
-        "ltv_buckets": [{"bucket": r["bucket"], "count": r["cnt"]} for r in ltv_buckets],
-        "monthly_revenue": [{"month": r["month"], "revenue": r["revenue"], "members": r["members"]} for r in monthly_rev],
-        "free": free,
-        "paid": paid
-    })
+@app.route("/api/revenue/movements")
+@login_required
+def api_revenue_movements():
+    """MRR waterfall: starting MRR, new/expansion/contraction/churned/reactivated and ending MRR per import."""
+    return widget_response("mrr_movements")
 
 
 # ==================== REFERRALS ====================
@@ -272,30 +258,34 @@ def referrals_page():
 @app.route("/api/referrals")
 @login_required
 def api_referrals():
-    db = get_db()
+    return widget_response("referrals")
 
-    top_referrers = db.execute("""
-        SELECT invited_by, COUNT(*) as cnt FROM members
-        WHERE invited_by != '' GROUP BY invited_by ORDER BY cnt DESC LIMIT 20
-    """).fetchall()
-
-    organic_count = db.execute("SELECT COUNT(*) as c FROM members WHERE invited_by = ''").fetchone()["c"]
-    referral_count = db.execute("SELECT COUNT(*) as c FROM members WHERE invited_by != ''").fetchone()["c"]
 
-    # Referrals over time
-    monthly = db.execute("""
-        SELECT SUBSTR(joined_at, 1, 7) as month,
-               SUM(CASE WHEN invited_by != '' THEN 1 ELSE 0 END) as referrals,
-               SUM(CASE WHEN invited_by = '' THEN 1 ELSE 0 END) as organic
-        FROM members GROUP BY month ORDER BY month
-    """).fetchall()
+@app.route("/api/referrals/tree")
+@login_required
+def api_referrals_tree():
+    """Referrers with the size, depth and revenue of their whole downstream tree (from referral_closure).
 
-    return jsonify({
-        "top_referrers": [{"name": r["invited_by"], "count": r["cnt"]} for r in top_referrers],
-        "organic": organic_count,
-        "referral": referral_count,
-        "monthly": [{"month": r["month"], "referrals": r["referrals"], "organic": r["organic"]} for r in monthly]
-    })
+    ?root=<member id> lists that member's descendants instead, with their depth and direct referrer.
+    """
+    try:
+        limit = timeseries.parse_count(request.args, "limit", 50)
+        root = request.args.get("root")
+        root = int(root) if root else None
+    except timeseries.RangeError as e:
+        return jsonify({"error": str(e)}), 400
+    except ValueError:
+        return jsonify({"error": "Identifiant de membre invalide"}), 400
+    db = get_read_db()
+    if root is not None:
+        member = db.execute("SELECT id, first_name, last_name FROM members WHERE id = ?", (root,)).fetchone()
+        if not member:
+            return jsonify({"error": "Membre introuvable"}), 404
+        return jsonify({
+            "root": {"id": member["id"], "name": f"{member['first_name']} {member['last_name']}".strip()},
+            "descendants": descendants(db, member["id"], limit)
+        })
+    return jsonify(tree_summary(db, limit))
 
 
 # ==================== CHURN ====================
@@ -309,53 +299,7 @@ def churn_page():
 @app.route("/api/churn")
 @login_required
 def api_churn():
-    db = get_db()
-
-    active = db.execute("SELECT COUNT(*) as c FROM members WHERE status = 'active' AND email NOT LIKE '__no_email_%'").fetchone()["c"]
-    churned = db.execute("SELECT COUNT(*) as c FROM members WHERE status = 'churned'").fetchone()["c"]
-    total_ever = active + churned
-    churn_pct = round(churned / total_ever * 100, 1) if total_ever > 0 else 0
-    retention_pct = round(100 - churn_pct, 1)
-
-    # Lost revenue (sum of last known price of churned members)
-    lost_mrr = db.execute("SELECT SUM(ltv) as s FROM members WHERE status = 'churned'").fetchone()["s"] or 0
-
-    # Churned members list
-    churned_list = db.execute("""
-        SELECT first_name, last_name, email, joined_at, churned_at, ltv, invited_by
-        FROM members WHERE status = 'churned'
-        ORDER BY churned_at DESC LIMIT 100
-    """).fetchall()
-
-    # Churn by month (when they churned)
-    monthly_churn = db.execute("""
-        SELECT SUBSTR(churned_at, 1, 7) as month, COUNT(*) as cnt
-        FROM members WHERE status = 'churned' AND churned_at != ''
-        GROUP BY month ORDER BY month
-    """).fetchall()
-
-    # Average lifetime (days between join and churn)
-    avg_lifetime = db.execute("""
-        SELECT AVG(JULIANDAY(churned_at) - JULIANDAY(joined_at)) as avg_days
-        FROM members WHERE status = 'churned' AND churned_at != '' AND joined_at != ''
-    """).fetchone()["avg_days"] or 0
-
-    return jsonify({
-        "active": active,
-        "churned": churned,
-        "total_ever": total_ever,
-        "churn_pct": churn_pct,
-        "retention_pct": retention_pct,
-        "lost_ltv": round(lost_mrr, 2),
-        "avg_lifetime_days": round(avg_lifetime, 0),
-        "monthly_churn": [{"month": r["month"], "count": r["cnt"]} for r in monthly_churn],
-        "churned_list": [{
-            "name": f"{r['first_name']} {r['last_name']}",
-            "email": r["email"], "joined_at": r["joined_at"],
-            "churned_at": r["churned_at"], "ltv": r["ltv"],
-            "invited_by": r["invited_by"]
-        } for r in churned_list]
-    })
+    return widget_response("churn")
 
 
 # ==================== FORECAST ====================
@@ -369,7 +313,7 @@ def forecast_page():
 @app.route("/api/forecast")
 @login_required
 def api_forecast():
-    db = get_db()
+    db = get_read_db()
     months_ahead = int(request.args.get("months", 6))
 
     monthly = db.execute("""
@@ -432,7 +376,7 @@ def members_page():
 @app.route("/api/members")
 @login_required
 def api_members():
-    db = get_db()
+    db = get_read_db()
     search = request.args.get("search", "")
     sort = request.args.get("sort", "joined_at")
     order = request.args.get("order", "DESC")
@@ -451,7 +395,7 @@ def api_members():
     else:
         rows = db.execute(f"SELECT * FROM members ORDER BY {sort} {order} LIMIT 500").fetchall()
 
-    return jsonify([{
+    return api_json([{
         "id": r["id"], "first_name": r["first_name"], "last_name": r["last_name"],
         "email": r["email"], "invited_by": r["invited_by"],
         "joined_at": r["joined_at"], "price": r["price"],
@@ -478,17 +422,23 @@ def upload_csv():
         except UnicodeDecodeError:
             content = file.read().decode("latin-1")
 
-        stats = process_skool_csv(content)
+        with metrics.timer("tracker_import_seconds"):
+            stats = process_skool_csv(content)
         if stats.get("error"):
             flash(stats["error"], "error")
         else:
             # Save upload history snapshot
             save_upload_snapshot(stats)
-            msg = f"{stats['imported']} membres importés ({stats['new']} nouveaux, {stats['updated']} mis à jour)"
+            maintenance.optimize(get_db(), "import")
+            refresh_replica()
+            msg = (f"{stats['imported']} membres importés ({stats['new']} nouveaux, "
+                   f"{stats['updated']} mis à jour, {stats['unchanged']} inchangés)")
             if stats.get('churned', 0) > 0:
                 msg += f", {stats['churned']} churned détectés"
             if stats.get('reactivated', 0) > 0:
                 msg += f", {stats['reactivated']} réactivés"
+            if stats.get('error_count', 0) > 0:
+                msg += f", {stats['error_count']} lignes ignorées"
             flash(msg, "success")
 
     return render_template("upload.html", stats=stats)
@@ -496,11 +446,13 @@ def upload_csv():
 
 def process_skool_csv(content):
     """Parse and import Skool CSV with churn detection."""
-    delimiter = ";" if ";" in content.split("\n")[0] else ","
-    reader = csv.DictReader(io.StringIO(content), delimiter=delimiter)
-    rows = list(reader)
+    with metrics.timer("tracker_import_parse_seconds"):
+        export = csv_import.parse(content)
 
-    if not rows:
+    if not len(export):
+        if export.errors:
+            first = export.errors[0]
+            return {"error": f"Aucune ligne valide ({len(export.errors)} erreurs, ligne {first['line']} : {first['error']})"}
         return {"error": "Fichier vide"}
 
     db = get_db()
@@ -509,17 +461,37 @@ def process_skool_csv(content):
     imported = 0
     new_count = 0
     updated = 0
+    unchanged = 0
     reactivated = 0
+    versions = 0
 
     # Remove old placeholder entries (members without email from previous uploads)
+    placeholder_mrr = mrr_movements.placeholder_mrr(db)
     db.execute("DELETE FROM members WHERE email LIKE '__no_email_%'")
 
-    # Collect all real emails in this upload
-    csv_emails = set()
+    # Load current state once; rows whose content hash still matches are left untouched.
+    # Keyed by lowercased email, as the parser lowercases the export's.
+    existing_by_email = {
+        r["email"].lower(): dict(r) for r in db.execute(
+            f"SELECT id, email, row_hash, referrer_id, {VERSIONED_COLUMNS} FROM members"
+        ).fetchall()
+    }
+
+    movements = mrr_movements.Movements(placeholder_mrr + sum(monthly_value(m) for m in existing_by_email.values()))
+    new_placeholder_mrr = 0
+
+    progress = live.ImportProgress(live.get_hub(current_db_path()), batch, len(export))
+
+    # Collect all real emails in this upload; rows rejected by the parser still count
+    # as present, so a typo in a price does not churn the member
+    csv_emails = set(export.rejected_emails)
+    # Members whose referrer must be (re)resolved: new ones and changed "Invited By"
+    referral_ids = set()
 
     no_email_idx = 0
-    for row in rows:
-        email = row.get("Email", "").strip()
+    columns = zip(*(getattr(export, name) for name in csv_import.COLUMNS))
+    for done, (first_name, last_name, email, invited_by, joined_at, interval, tier, price, ltv) in enumerate(columns, 1):
+        progress.row(done)
         is_placeholder = False
         if not email:
             no_email_idx += 1
@@ -528,60 +500,100 @@ def process_skool_csv(content):
         else:
             csv_emails.add(email)
 
-        first_name = row.get("FirstName", "").strip()
-        last_name = row.get("LastName", "").strip()
-        invited_by = row.get("Invited By", "").strip()
-        joined_at = row.get("JoinedDate", "").strip()
-        price_str = row.get("Price", "0").replace("$", "").replace(",", "").strip()
-        price = float(price_str) if price_str else 0
-        interval = row.get("Recurring Interval", "").strip()
-        tier = row.get("Tier", "").strip()
-        ltv_str = row.get("LTV", "0").replace("$", "").replace(",", "").strip()
-        ltv = float(ltv_str) if ltv_str else 0
+        row_hash = member_row_hash(first_name, last_name, invited_by, price, interval, tier, ltv)
+        existing = existing_by_email.get(email)
+        fields = {
+            "first_name": first_name, "last_name": last_name, "invited_by": invited_by,
+            "price": price, "recurring_interval": interval, "tier": tier, "ltv": ltv,
+            "status": "active", "churned_at": ""
+        }
 
-        existing = db.execute("SELECT id, status FROM members WHERE email = ?", (email,)).fetchone()
+        if existing and existing["status"] == "active" and existing["row_hash"] == row_hash:
+            unchanged += 1
+            imported += 1
+            continue
 
         if existing:
             was_churned = existing["status"] == "churned"
             db.execute("""
                 UPDATE members SET first_name=?, last_name=?, invited_by=?,
                 price=?, recurring_interval=?, tier=?, ltv=?, upload_batch=?,
-                status='active', churned_at='', last_seen_at=?
-                WHERE email=?
-            """, (first_name, last_name, invited_by, price, interval, tier, ltv, batch, now, email))
+                status='active', churned_at='', row_hash=?
+                WHERE id=?
+            """, (first_name, last_name, invited_by, price, interval, tier, ltv, batch, row_hash, existing["id"]))
+            member_id = existing["id"]
+            if existing["invited_by"] != invited_by:
+                referral_ids.add(member_id)
             updated += 1
             if was_churned:
                 reactivated += 1
         else:
-            db.execute("""
+            cur = db.execute("""
                 INSERT INTO members (first_name, last_name, email, invited_by, joined_at,
-                    price, recurring_interval, tier, ltv, status, first_seen_at, last_seen_at, upload_batch)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 'active', ?, ?, ?)
-            """, (first_name, last_name, email, invited_by, joined_at, price, interval, tier, ltv, now, now, batch))
+                    price, recurring_interval, tier, ltv, status, first_seen_at, last_seen_at, upload_batch, row_hash)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 'active', ?, ?, ?, ?)
+            """, (first_name, last_name, email, invited_by, joined_at, price, interval, tier, ltv, now, now, batch, row_hash))
+            member_id = cur.lastrowid
+            fields["joined_at"] = joined_at
+            referral_ids.add(member_id)
             new_count += 1
 
+        # Placeholders are recreated on every upload, so they carry no history
+        if not is_placeholder:
+            versions += record_changes(db, member_id, batch, existing, fields)
+            movements.add(existing, fields)
+        else:
+            new_placeholder_mrr += monthly_value(fields)
+        existing_by_email[email] = {**(existing or {}), **fields, "id": member_id, "email": email, "row_hash": row_hash}
+
         imported += 1
 
     # CHURN DETECTION: members with real emails who are in DB as active
-    # but NOT in this CSV upload = churned
+    # but NOT in this CSV upload = churned.
+    # Active members are by definition present in the latest upload, so last_seen_at
+    # is only written here, when a member leaves: it keeps the previous import time.
     churned = 0
     if csv_emails:  # only detect churn if we have real emails
-        active_in_db = db.execute(
-            "SELECT email FROM members WHERE status = 'active' AND email NOT LIKE '__no_email_%'"
-        ).fetchall()
-        for row in active_in_db:
-            if row["email"] not in csv_emails:
-                db.execute(
-                    "UPDATE members SET status='churned', churned_at=?, price=0 WHERE email=?",
-                    (now, row["email"])
-                )
-                churned += 1
-
-    db.commit()
-    return {
-        "imported": imported, "new": new_count, "updated": updated,
-        "churned": churned, "reactivated": reactivated, "batch": batch
+        prev_upload = db.execute("SELECT uploaded_at FROM upload_history ORDER BY uploaded_at DESC LIMIT 1").fetchone()
+        for email, member in existing_by_email.items():
+            if member["status"] != "active" or email in csv_emails or email.startswith("__no_email_"):
+                continue
+            db.execute(
+                "UPDATE members SET status='churned', churned_at=?, price=0, upload_batch=?, "
+                "last_seen_at=COALESCE(?, last_seen_at) WHERE id=?",
+                (now, batch, prev_upload["uploaded_at"] if prev_upload else None, member["id"])
+            )
+            versions += record_changes(db, member["id"], batch, member, {"status": "churned", "churned_at": now, "price": 0})
+            movements.add(member, {**member, "status": "churned", "price": 0})
+            churned += 1
+
+    movements.placeholders(placeholder_mrr, new_placeholder_mrr)
+    mrr_movements.record(db, batch, movements)
+
+    # Referral graph: names still unresolved may match members added by this upload
+    real_members = {m["id"]: m for email, m in existing_by_email.items() if not email.startswith("__no_email_")}
+    referral_ids.update(mid for mid, m in real_members.items() if m["invited_by"] and m.get("referrer_id") is None)
+    referral_links, ambiguous_referrers = sync_referrers(db, real_members, sorted(referral_ids & real_members.keys()))
+
+    with metrics.timer("tracker_db_write_seconds", op="import"):
+        db.commit()
+    for outcome, count in (("new", new_count), ("updated", updated), ("unchanged", unchanged), ("churned", churned),
+                           ("rejected", len(export.errors))):
+        metrics.inc("tracker_import_rows_total", count, outcome=outcome)
+    stats = {
+        "imported": imported, "new": new_count, "updated": updated, "unchanged": unchanged,
+        "churned": churned, "reactivated": reactivated, "batch": batch,
+        "versions": versions, "referral_links": referral_links, "ambiguous_referrers": ambiguous_referrers,
+        "error_count": len(export.errors), "errors": export.errors[:MAX_IMPORT_ERRORS],
+        "mrr_movements": {m: round(movements.amounts[m], 2) for m in mrr_movements.MOVEMENTS},
     }
+    progress.finish(stats)
+    return stats
+
+
+def member_row_hash(*values):
+    """Content hash of the Skool fields of a member, used to skip unchanged rows on re-import."""
+    return hashlib.blake2b("\x1f".join(str(v) for v in values).encode(), digest_size=8).hexdigest()
 
 
 def save_upload_snapshot(stats):
@@ -603,10 +615,10 @@ def save_upload_snapshot(stats):
 
     db.execute("""
         INSERT INTO upload_history (batch, uploaded_at, total_members, active_members,
-            new_members, updated_members, churned_members, reactivated_members,
+            new_members, updated_members, unchanged_members, churned_members, reactivated_members,
             paid_members, free_members, mrr, total_ltv, avg_ltv)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-    """, (stats["batch"], now, total, active, stats["new"], stats["updated"],
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, (stats["batch"], now, total, active, stats["new"], stats["updated"], stats.get("unchanged", 0),
           stats.get("churned", 0), stats.get("reactivated", 0),
           paid, free, round(mrr, 2), round(total_ltv, 2), round(avg_ltv, 2)))
     db.commit()
@@ -623,40 +635,66 @@ def history_page():
 @app.route("/api/history")
 @login_required
 def api_history():
-    db = get_db()
-    rows = db.execute("SELECT * FROM upload_history ORDER BY uploaded_at DESC").fetchall()
-
-    history = []
-    for i, r in enumerate(rows):
-        entry = {
-            "id": r["id"], "batch": r["batch"], "uploaded_at": r["uploaded_at"],
-            "total_members": r["total_members"], "active_members": r["active_members"],
-            "new_members": r["new_members"], "updated_members": r["updated_members"],
-            "churned_members": r["churned_members"], "reactivated_members": r["reactivated_members"],
-            "paid_members": r["paid_members"], "free_members": r["free_members"],
-            "mrr": r["mrr"], "total_ltv": r["total_ltv"], "avg_ltv": r["avg_ltv"]
-        }
-        # Compute deltas vs previous import
-        if i < len(rows) - 1:
-            prev = rows[i + 1]
-            entry["delta_members"] = r["active_members"] - prev["active_members"]
-            entry["delta_mrr"] = round(r["mrr"] - prev["mrr"], 2)
-            entry["delta_ltv"] = round(r["total_ltv"] - prev["total_ltv"], 2)
-            entry["delta_paid"] = r["paid_members"] - prev["paid_members"]
-        else:
-            entry["delta_members"] = 0
-            entry["delta_mrr"] = 0
-            entry["delta_ltv"] = 0
-            entry["delta_paid"] = 0
-        history.append(entry)
-
-    return jsonify(history)
+    db = get_read_db()
+    try:
+        start = timeseries.parse_day(request.args.get("from"))
+        end = timeseries.parse_day(request.args.get("to"))
+    except timeseries.RangeError as e:
+        return jsonify({"error": str(e)}), 400
+
+    # Deltas vs the previous import; computed over the whole history before filtering
+    # so the first import in the range still compares with the one before it.
+    # The MRR delta is broken down by the movements recorded at import time.
+    movement_columns = ", ".join(f"ROUND(m.{m}_mrr, 2) AS {m}_mrr" for m in mrr_movements.MOVEMENTS)
+    rows = db.execute(f"""
+        SELECT h.*, {movement_columns} FROM (
+            SELECT id, batch, uploaded_at, total_members, active_members, new_members, updated_members,
+                   unchanged_members, churned_members, reactivated_members, paid_members, free_members,
+                   mrr, total_ltv, avg_ltv,
+                   active_members - LAG(active_members, 1, active_members) OVER w AS delta_members,
+                   ROUND(mrr - LAG(mrr, 1, mrr) OVER w, 2) AS delta_mrr,
+                   ROUND(total_ltv - LAG(total_ltv, 1, total_ltv) OVER w, 2) AS delta_ltv,
+                   paid_members - LAG(paid_members, 1, paid_members) OVER w AS delta_paid
+            FROM upload_history
+            WINDOW w AS (ORDER BY uploaded_at, id)
+        ) h
+        LEFT JOIN mrr_movements m ON m.batch = h.batch
+        WHERE h.uploaded_at >= ? AND h.uploaded_at < ?
+        ORDER BY h.uploaded_at DESC, h.id DESC
+    """, (start.isoformat() if start else "", (end + timedelta(days=1)).isoformat() if end else "9999")).fetchall()
+
+    return api_json([dict(r) for r in rows])
+
+
+@app.route("/api/history/asof")
+@login_required
+def api_history_asof():
+    """Membership state as it was right after a given import (defaults to the latest)."""
+    db = get_read_db()
+    batch = request.args.get("batch", "")
+    if not batch:
+        latest = db.execute("SELECT batch FROM upload_history ORDER BY uploaded_at DESC LIMIT 1").fetchone()
+        if not latest:
+            return jsonify({"error": "Aucun import"}), 404
+        batch = latest["batch"]
+
+    summary = summary_as_of(db, batch)
+    if request.args.get("members"):
+        summary["members"] = [
+            {"id": member_id, **fields} for member_id, fields in members_as_of(db, batch).items()
+        ]
+    return jsonify(summary)
 
 
 # ==================== LINK TRACKER ====================
 
 @app.route("/go/<channel>")
 def track_click(channel):
+    with metrics.timer("tracker_redirect_seconds"):
+        return _track_click(channel)
+
+
+def _track_click(channel):
     channel = channel.lower().strip()
     ip_raw = request.remote_addr or "unknown"
     ip_hash = hashlib.sha256(ip_raw.encode()).hexdigest()[:16]
@@ -665,14 +703,16 @@ def track_click(channel):
     now = datetime.now(TZ)
 
     db = get_db()
-    db.execute(
-        "INSERT INTO clicks (channel, clicked_at, ip_hash, user_agent, referer) VALUES (?, ?, ?, ?, ?)",
-        (channel, now.strftime("%Y-%m-%d %H:%M:%S"), ip_hash, user_agent, referer)
-    )
-    db.commit()
+    with metrics.timer("tracker_db_write_seconds", op="click"):
+        bot = record_click(db, channel, now.strftime("%Y-%m-%d %H:%M:%S"), ip_hash, user_agent, referer,
+                           key=current_db_path())
+        db.commit()
 
     # Check for custom tracking link
     link = db.execute("SELECT destination_url, utm_source, utm_campaign FROM tracking_links WHERE channel = ?", (channel,)).fetchone()
+    # Any path reaches this route: only known channels get their own series
+    metrics.inc("tracker_clicks_total", channel=channel if link or channel in DEFAULT_CHANNELS else "other",
+                bot=str(bot).lower())
 
     if link:
         dest = link["destination_url"]
@@ -689,7 +729,7 @@ def track_click(channel):
             sep = "&" if "?" in dest else "?"
             dest += sep + "&".join(f"{k}={v}" for k, v in params.items())
     else:
-        dest = SKOOL_URL
+        dest = g.community["skool_url"] or SKOOL_URL
         utm_params = {k: v for k, v in request.args.items() if k.startswith("utm_")}
         if utm_params:
             sep = "&" if "?" in dest else "?"
@@ -739,28 +779,34 @@ def links_page():
                 except Exception:
                     pass
                 db.commit()
+                refresh_replica()
                 flash(f"Lien « {slug} » créé !", "success")
             except Exception:
                 flash(f"Le lien « {slug} » existe déjà. Changez le nom pour le rendre unique.", "error")
 
-    base_url = request.host_url.rstrip("/")
+    # Tracking links of a community carry its slug: /go/<community>/<channel>
+    slug = g.community["slug"]
+    go_url = request.host_url.rstrip("/") + (f"/go/{slug}" if slug else "/go")
     links = db.execute("SELECT * FROM tracking_links ORDER BY created_at DESC").fetchall()
 
-    # Get click counts per channel
+    # Get human click counts and unique visitors per channel from the daily rollups
     click_counts = {}
-    for row in db.execute("SELECT channel, COUNT(*) as cnt FROM clicks GROUP BY channel").fetchall():
-        click_counts[row["channel"]] = row["cnt"]
+    visitor_rows = {}
+    for row in db.execute("SELECT channel, clicks, visitors FROM click_daily WHERE clicks > 0").fetchall():
+        click_counts[row["channel"]] = click_counts.get(row["channel"], 0) + row["clicks"]
+        visitor_rows.setdefault(row["channel"], []).append(row)
 
     links_data = [{
         "id": l["id"], "channel": l["channel"],
         "platform": l["platform"] if "platform" in l.keys() else l["channel"],
         "destination_url": l["destination_url"],
         "utm_source": l["utm_source"], "utm_campaign": l["utm_campaign"],
-        "url": f"{base_url}/go/{l['channel']}", "clicks": click_counts.get(l["channel"], 0),
+        "url": f"{go_url}/{l['channel']}", "clicks": click_counts.get(l["channel"], 0),
+        "visitors": unique_visitors(visitor_rows.get(l["channel"], [])),
         "created_at": l["created_at"]
     } for l in links]
 
-    return render_template("links.html", links=links_data)
+    return render_template("links.html", links=links_data, go_url=go_url)
 
 
 @app.route("/api/links/<int:link_id>/delete", methods=["POST"])
@@ -770,9 +816,12 @@ def delete_link(link_id):
     link = db.execute("SELECT channel FROM tracking_links WHERE id = ?", (link_id,)).fetchone()
     if link:
         db.execute("DELETE FROM clicks WHERE channel = ?", (link["channel"],))
+        db.execute("DELETE FROM click_daily WHERE channel = ?", (link["channel"],))
+        db.execute("DELETE FROM click_dims_daily WHERE channel = ?", (link["channel"],))
         db.execute("DELETE FROM tracking_links WHERE id = ?", (link_id,))
         db.execute("DELETE FROM custom_channels WHERE name = ?", (link["channel"],))
         db.commit()
+        refresh_replica()
         return jsonify({"ok": True})
     return jsonify({"error": "Lien introuvable"}), 404
 
@@ -783,33 +832,65 @@ def channels_page():
     return render_template("channels.html")
 
 
+def attribution_members(db):
+    """Active members as (join epoch, paid, ltv, mrr) sorted by join time, for the click index."""
+    members = []
+    for m in db.execute("""
+        SELECT CAST(strftime('%s', SUBSTR(joined_at, 1, 19)) AS INTEGER) AS joined, price, ltv, recurring_interval
+        FROM members
+        WHERE status = 'active' AND email NOT LIKE '__no_email_%' AND joined_at != '' AND joined IS NOT NULL
+        ORDER BY joined
+    """):
+        paid = (m["ltv"] or 0) > 0
+        mrr = 0
+        if paid and m["recurring_interval"] == "month":
+            mrr = m["price"] or 0
+        elif paid and m["recurring_interval"] == "year":
+            mrr = (m["price"] or 0) / 12
+        members.append((m["joined"], int(paid), m["ltv"] if paid else 0, mrr))
+    return members
+
+
+# Fields of /api/clicks sent as matrices by ?format=columnar
+CLICK_MATRICES = (
+    "daily_by_channel", "daily_by_platform", "attribution", "attribution_by_channel",
+    *(f"{dim}_by_{group}" for dim in SEGMENTS for group in ("channel", "platform")),
+)
+
+
 @app.route("/api/clicks")
 @login_required
 def api_clicks():
-    db = get_db()
-    days = int(request.args.get("days", 30))
-    since = (datetime.now(TZ) - timedelta(days=days)).strftime("%Y-%m-%d %H:%M:%S")
-
-    by_channel = db.execute(
-        "SELECT channel, COUNT(*) as cnt FROM clicks WHERE clicked_at >= ? GROUP BY channel ORDER BY cnt DESC",
-        (since,)
-    ).fetchall()
-
-    daily = db.execute(
-        "SELECT DATE(clicked_at) as day, channel, COUNT(*) as cnt FROM clicks WHERE clicked_at >= ? GROUP BY day, channel ORDER BY day",
-        (since,)
+    db = get_read_db()
+    today = datetime.now(TZ).date()
+    try:
+        start, end, granularity, max_points = timeseries.parse_range(
+            request.args, today - timedelta(days=int(request.args.get("days", 30))), today
+        )
+    except (timeseries.RangeError, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
+    day_range = (start.isoformat(), end.isoformat())
+
+    # Human clicks and visitor sketches come from the daily rollups, bots are counted apart
+    rollups = db.execute(
+        "SELECT channel, day, clicks, bot_clicks, visitors FROM click_daily WHERE day BETWEEN ? AND ? ORDER BY day",
+        day_range
     ).fetchall()
 
-    daily_map = {}
-    for r in daily:
-        if r["day"] not in daily_map:
-            daily_map[r["day"]] = {}
-        daily_map[r["day"]][r["channel"]] = r["cnt"]
+    by_channel_counts = {}
+    sketches_by_channel = {}
+    bot_clicks = 0
+    for r in rollups:
+        bot_clicks += r["bot_clicks"]
+        if not r["clicks"]:
+            continue
+        by_channel_counts[r["channel"]] = by_channel_counts.get(r["channel"], 0) + r["clicks"]
+        sketches_by_channel.setdefault(r["channel"], []).append(r)
+    by_channel = dict(sorted(by_channel_counts.items(), key=lambda x: -x[1]))
 
-    total = sum(r["cnt"] for r in by_channel)
+    total = sum(by_channel.values())
 
     # Platform grouping: map each channel to its platform
-    platform_map = {}
     links = db.execute("SELECT channel, platform FROM tracking_links").fetchall()
     ch_to_platform = {}
     for l in links:
@@ -817,11 +898,48 @@ def api_clicks():
         ch_to_platform[l["channel"]] = p
 
     by_platform = {}
-    for r in by_channel:
-        p = ch_to_platform.get(r["channel"], r["channel"])
-        by_platform[p] = by_platform.get(p, 0) + r["cnt"]
+    sketches_by_platform = {}
+    for ch, cnt in by_channel.items():
+        p = ch_to_platform.get(ch, ch)
+        by_platform[p] = by_platform.get(p, 0) + cnt
+        sketches_by_platform.setdefault(p, []).extend(sketches_by_channel[ch])
     by_platform = dict(sorted(by_platform.items(), key=lambda x: -x[1]))
 
+    # Device, browser and referrer site breakdowns, from the dimension rollup
+    segments = db.execute("""
+        SELECT s.channel, d.name AS device, b.name AS browser, r.name AS referrer, SUM(s.clicks) AS clicks
+        FROM click_dims_daily s
+        JOIN click_devices d ON d.id = s.device_id
+        JOIN click_browsers b ON b.id = s.browser_id
+        JOIN referrer_domains r ON r.id = s.referrer_domain_id
+        WHERE s.day BETWEEN ? AND ?
+        GROUP BY s.channel, s.device_id, s.browser_id, s.referrer_domain_id
+    """, day_range).fetchall()
+    referrer_clicks = {}
+    for r in segments:
+        referrer_clicks[r["referrer"]] = referrer_clicks.get(r["referrer"], 0) + r["clicks"]
+    # Long tail of referrer sites folded into one entry
+    top_referrers = set(sorted(referrer_clicks, key=lambda k: -referrer_clicks[k])[:TOP_REFERRERS])
+    by_segment = {dim: {} for dim in SEGMENTS}
+    segment_by_channel = {dim: {} for dim in SEGMENTS}
+    segment_by_platform = {dim: {} for dim in SEGMENTS}
+    for r in segments:
+        platform = ch_to_platform.get(r["channel"], r["channel"])
+        for dim in SEGMENTS:
+            name = r[dim] if dim != "referrer" or r[dim] in top_referrers else OTHER_REFERRERS
+            by_segment[dim][name] = by_segment[dim].get(name, 0) + r["clicks"]
+            for group, key in ((segment_by_channel, r["channel"]), (segment_by_platform, platform)):
+                counts = group[dim].setdefault(key, {})
+                counts[name] = counts.get(name, 0) + r["clicks"]
+    by_segment = {dim: dict(sorted(counts.items(), key=lambda x: -x[1])) for dim, counts in by_segment.items()}
+
+    # Per-period clicks by channel, empty periods included
+    points, step = timeseries.series(
+        db, "SELECT day, channel AS key, clicks AS value FROM click_daily WHERE day BETWEEN ? AND ? AND clicks > 0",
+        day_range, start, end, granularity, keyed=True, max_points=max_points
+    )
+    daily_map = dict(points)
+
     # Daily by platform
     daily_by_platform = {}
     for day, channels in daily_map.items():
@@ -830,67 +948,154 @@ def api_clicks():
             p = ch_to_platform.get(ch, ch)
             daily_by_platform[day][p] = daily_by_platform[day].get(p, 0) + cnt
 
-    # Attribution: match clicks to member signups within 48h window
-    # For each member, find clicks that happened 0-48h before their join date
-    attribution = {}
-    members = db.execute(
-        "SELECT joined_at, price, ltv, recurring_interval FROM members WHERE status = 'active' AND email NOT LIKE '__no_email_%'"
-    ).fetchall()
-
-    for m in members:
-        if not m["joined_at"]:
-            continue
-        # Look for clicks within 48h before member joined
-        window_start = m["joined_at"][:19]  # trim to seconds
-        clicks_before = db.execute("""
-            SELECT channel FROM clicks
-            WHERE clicked_at <= ? AND clicked_at >= DATETIME(?, '-48 hours')
-            ORDER BY clicked_at DESC LIMIT 1
-        """, (window_start, window_start)).fetchone()
-
-        if clicks_before:
-            ch = clicks_before["channel"]
-            p = ch_to_platform.get(ch, ch)
-            if p not in attribution:
-                attribution[p] = {"signups": 0, "paid": 0, "ltv": 0, "mrr": 0}
-            attribution[p]["signups"] += 1
-            if m["ltv"] and m["ltv"] > 0:
-                attribution[p]["paid"] += 1
-                attribution[p]["ltv"] += m["ltv"]
-                if m["recurring_interval"] == "month":
-                    attribution[p]["mrr"] += m["price"]
-                elif m["recurring_interval"] == "year":
-                    attribution[p]["mrr"] += m["price"] / 12
-
-    # Round MRR
-    for p in attribution:
-        attribution[p]["mrr"] = round(attribution[p]["mrr"], 2)
-        attribution[p]["ltv"] = round(attribution[p]["ltv"], 2)
+    # Attribution: credit signups to the channels clicked within the lookback window before joining
+    model = request.args.get("model", "last")
+    if model not in attribution.MODELS:
+        return jsonify({"error": "Modèle d'attribution inconnu"}), 400
+    try:
+        lookback = attribution.parse_hours(request.args.get("lookback"), attribution.DEFAULT_LOOKBACK_HOURS,
+                                           attribution.MAX_LOOKBACK_HOURS)
+        half_life = attribution.parse_hours(request.args.get("half_life"), attribution.DEFAULT_HALF_LIFE_HOURS,
+                                            attribution.MAX_HALF_LIFE_HOURS)
+    except ValueError:
+        return jsonify({"error": f"lookback (1-{attribution.MAX_LOOKBACK_HOURS}) et half_life "
+                                 f"(1-{attribution.MAX_HALF_LIFE_HOURS}) : nombres entiers d'heures"}), 400
+    index = attribution.get_index(current_db_path()).refresh(db)
+    members_key = tuple(db.execute(
+        "SELECT (SELECT MAX(id) FROM upload_history), (SELECT COUNT(*) FROM members WHERE status = 'active')"
+    ).fetchone())
+    credited = index.attribute(
+        lambda: attribution_members(db), model, lookback, half_life, cache_key=members_key
+    )
 
-    return jsonify({
+    attribution_by_channel = {}
+    attribution_by_platform = {}
+    for ch, credit in credited.items():
+        attribution_by_channel[ch] = credit
+        acc = attribution_by_platform.setdefault(ch_to_platform.get(ch, ch), {"signups": 0, "paid": 0, "ltv": 0, "mrr": 0})
+        for k, v in credit.items():
+            acc[k] += v
+    for group in (attribution_by_channel, attribution_by_platform):
+        for ch, credit in group.items():
+            group[ch] = {k: round(v, 2) for k, v in credit.items()}
+
+    last_click_id = db.execute("SELECT COALESCE(MAX(id), 0) AS m FROM clicks").fetchone()["m"]
+    # Clicks recorded since the replica was taken, up to where the live feed stands;
+    # the page folds them in like a live delta
+    live_tail = live.click_delta(get_db(), last_click_id, live.get_hub(current_db_path()).position())
+
+    return api_json({
         "total": total,
-        "by_channel": {r["channel"]: r["cnt"] for r in by_channel},
+        "last_click_id": last_click_id,
+        "live_tail": live_tail,
+        "bot_clicks": bot_clicks,
+        "unique_total": unique_visitors(rollups),
+        "by_channel": by_channel,
         "by_platform": by_platform,
+        "unique_by_channel": {ch: unique_visitors(rows) for ch, rows in sketches_by_channel.items()},
+        "unique_by_platform": {p: unique_visitors(rows) for p, rows in sketches_by_platform.items()},
         "daily_by_channel": daily_map,
+        **{f"by_{dim}": by_segment[dim] for dim in SEGMENTS},
+        **{f"{dim}_by_channel": segment_by_channel[dim] for dim in SEGMENTS},
+        **{f"{dim}_by_platform": segment_by_platform[dim] for dim in SEGMENTS},
         "daily_by_platform": daily_by_platform,
-        "attribution": attribution
-    })
+        "range": timeseries.range_info(start, end, granularity, step),
+        "attribution": attribution_by_platform,
+        "attribution_by_channel": attribution_by_channel,
+        "attribution_model": {"model": model, "lookback_hours": lookback, "half_life_hours": half_life},
+    }, matrices=CLICK_MATRICES)
+
+
+@app.route("/api/live")
+@login_required
+def api_live():
+    """Server-Sent Events: click deltas per channel/platform and import progress."""
+    hub = live.get_hub(current_db_path())
+    q = hub.subscribe()
+    if q is None:
+        # Every viewer holds a thread: past the cap, keep the rest for redirects and pages
+        return Response(f"retry: {live.FULL_RETRY}\n\n", status=503, mimetype="text/event-stream",
+                        headers={"Retry-After": str(live.FULL_RETRY // 1000), "Cache-Control": "no-cache"})
+    return Response(
+        stream_with_context(hub.stream(q)),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 
 @app.route("/api/export")
 @login_required
 def export_clicks():
-    db = get_db()
-    rows = db.execute("SELECT * FROM clicks ORDER BY clicked_at DESC").fetchall()
+    db = get_read_db()
+    rows = db.execute("""
+        SELECT c.*, d.name AS device, b.name AS browser, r.name AS referrer_domain FROM clicks c
+        LEFT JOIN click_devices d ON d.id = c.device_id
+        LEFT JOIN click_browsers b ON b.id = c.browser_id
+        LEFT JOIN referrer_domains r ON r.id = c.referrer_domain_id
+        ORDER BY c.clicked_at DESC
+    """).fetchall()
     output = io.StringIO()
     writer = csv.writer(output, delimiter=";")
-    writer.writerow(["ID", "Canal", "Date/Heure", "IP Hash", "User Agent", "Referer"])
+    writer.writerow(["ID", "Canal", "Date/Heure", "IP Hash", "User Agent", "Referer", "Bot", "Appareil", "Navigateur", "Site référent"])
     for r in rows:
-        writer.writerow([r["id"], r["channel"], r["clicked_at"], r["ip_hash"], r["user_agent"], r["referer"]])
+        writer.writerow([r["id"], r["channel"], r["clicked_at"], r["ip_hash"], r["user_agent"], r["referer"], r["is_bot"],
+                         r["device"], r["browser"], r["referrer_domain"]])
     return Response(output.getvalue(), mimetype="text/csv",
                     headers={"Content-Disposition": f"attachment; filename=clicks_{datetime.now(TZ).strftime('%Y%m%d')}.csv"})
 
 
+# ==================== DEBUG ====================
+
+@app.route("/metrics")
+def metrics_endpoint():
+    """Prometheus scrape target: bearer METRICS_TOKEN, or loopback only when it is unset."""
+    token = os.environ.get("METRICS_TOKEN")
+    if token:
+        if not hmac.compare_digest(request.headers.get("Authorization", ""), f"Bearer {token}"):
+            return Response("Unauthorized\n", status=401, mimetype="text/plain")
+    # Behind a local reverse proxy every request comes from loopback: forwarded ones are refused
+    elif request.remote_addr not in ("127.0.0.1", "::1") or "X-Forwarded-For" in request.headers:
+        return Response("Forbidden: set METRICS_TOKEN to scrape remotely\n", status=403, mimetype="text/plain")
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
+
+@app.route("/api/debug/perf")
+@admin_required
+def api_debug_perf():
+    if not app.config["PERF_PROFILING"]:
+        return jsonify({"error": "Profilage désactivé (PERF_PROFILING=1)"}), 404
+    return jsonify(perf.report(get_db(), limit=int(request.args.get("limit", 20))))
+
+
+# ==================== COMMUNITIES ====================
+
+@app.route("/communities")
+@login_required
+def communities_page():
+    return render_template("communities.html")
+
+
+@app.route("/api/communities")
+@login_required
+def api_communities():
+    return jsonify(communities.rollup(communities.all_communities(), datetime.now(TZ)))
+
+
+@app.route("/api/communities/create", methods=["POST"])
+@admin_required
+def create_community():
+    data = request.get_json()
+    slug = data.get("slug", "").strip().lower()
+    error = communities.create(
+        get_main_db(), slug, data.get("name", "").strip(), data.get("skool_url", "").strip(),
+        datetime.now(TZ).strftime("%Y-%m-%d %H:%M:%S")
+    )
+    if error:
+        return jsonify({"error": error}), 400
+    print(f"[COMMUNITY] created {slug}")
+    return jsonify({"success": True, "message": f"Communauté {slug} créée"})
+
+
 # ==================== USER MANAGEMENT ====================
 
 @app.route("/settings")
@@ -902,7 +1107,7 @@ def settings_page():
 @app.route("/api/users", methods=["GET"])
 @admin_required
 def api_users():
-    db = get_db()
+    db = get_main_db()
     users = db.execute("SELECT id, username, role, created_at FROM users ORDER BY id").fetchall()
     return jsonify([{"id": r["id"], "username": r["username"], "role": r["role"], "created_at": r["created_at"]} for r in users])
 
@@ -920,7 +1125,7 @@ def create_user():
     if role not in ("admin", "viewer"):
         role = "viewer"
 
-    db = get_db()
+    db = get_main_db()
     try:
         db.execute(
             "INSERT INTO users (username, password_hash, role, created_at) VALUES (?, ?, ?, ?)",
@@ -940,7 +1145,7 @@ def change_password(user_id):
     if not new_password:
         return jsonify({"error": "Mot de passe requis"}), 400
 
-    db = get_db()
+    db = get_main_db()
     db.execute("UPDATE users SET password_hash = ? WHERE id = ?", (generate_password_hash(new_password), user_id))
     db.commit()
     return jsonify({"success": True})
@@ -951,7 +1156,7 @@ def change_password(user_id):
 def delete_user(user_id):
     if user_id == session.get("user_id"):
         return jsonify({"error": "Vous ne pouvez pas supprimer votre propre compte"}), 400
-    db = get_db()
+    db = get_main_db()
     db.execute("DELETE FROM users WHERE id = ?", (user_id,))
     db.commit()
     return jsonify({"success": True})
@@ -962,7 +1167,7 @@ def delete_user(user_id):
 def change_own_password():
     old_pw = request.form.get("old_password", "")
     new_pw = request.form.get("new_password", "")
-    db = get_db()
+    db = get_main_db()
     user = db.execute("SELECT * FROM users WHERE id = ?", (session["user_id"],)).fetchone()
     if not check_password_hash(user["password_hash"], old_pw):
         flash("Ancien mot de passe incorrect", "error")
@@ -980,7 +1185,7 @@ def change_own_password():
 # Temporary route to reset admin password (remove after first login!)
 @app.route("/reset-admin")
 def reset_admin():
-    db = get_db()
+    db = get_main_db()
     new_pw = generate_password_hash("admin123")
     db.execute("DELETE FROM users")
     db.execute(
@@ -0,0 +1,158 @@
+"""Static asset pipeline: content-hashed, pre-compressed copies served with immutable caching.
+
+build() copies every file under static/ (stylesheet, page scripts, vendored
+libraries) to static/dist/<name>.<hash>.<ext>, next to .gz and .br versions, and
+records the mapping in static/dist/manifest.json. url_for('static', filename=...)
+resolves to the hashed copy and /static/dist/ responses are `immutable`, so a
+repeat page load makes no asset request at all. Unchanged files are skipped, so
+the build runs at every startup; hashed files that are in neither the new nor the
+previous manifest are deleted (the previous one still serves pages rendered
+before a deploy).
+
+Chart.js is served from static/vendor/ like any other file. The Procfile runs
+`vendor` before starting the server (it only downloads what is missing, and the
+server does not start if the download fails). The CDN link in base.html, pinned
+to the same version, is only a fallback for local runs that skipped it.
+
+    python assets.py vendor   # download the pinned Chart.js into static/vendor/
+    python assets.py build
+"""
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import sys
+import urllib.request
+
+from flask import request, send_from_directory
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+DIST_DIR = os.path.join(STATIC_DIR, "dist")
+MAX_AGE = 365 * 24 * 3600
+
+CHARTJS_VERSION = "4.4.1"
+VENDOR = {
+    "vendor/chart.umd.min.js": f"https://cdn.jsdelivr.net/npm/chart.js@{CHARTJS_VERSION}/dist/chart.umd.min.js",
+}
+COMPRESS = {".css", ".js", ".svg", ".json", ".map"}
+
+manifest = {}
+
+
+def _write(path, data):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)  # several workers may build at once
+
+
+def build(static_dir=STATIC_DIR, dist_dir=DIST_DIR):
+    """Fingerprint and pre-compress every static file; returns {logical name: hashed name}."""
+    os.makedirs(dist_dir, exist_ok=True)
+    result = {}
+    for root, dirs, files in os.walk(static_dir):
+        dirs[:] = [d for d in dirs if os.path.join(root, d) != dist_dir]
+        for filename in files:
+            path = os.path.join(root, filename)
+            name = os.path.relpath(path, static_dir).replace(os.sep, "/")
+            with open(path, "rb") as f:
+                data = f.read()
+            stem, ext = os.path.splitext(name)
+            hashed = f"{stem}.{hashlib.sha256(data).hexdigest()[:12]}{ext}"
+            target = os.path.join(dist_dir, hashed)
+            if not os.path.exists(target):
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                if ext in COMPRESS:
+                    _write(target + ".gz", gzip.compress(data, compresslevel=9, mtime=0))
+                    if brotli:
+                        _write(target + ".br", brotli.compress(data, quality=11))
+                _write(target, data)
+            result[name] = hashed
+    manifest_path = os.path.join(dist_dir, "manifest.json")
+    try:
+        with open(manifest_path) as f:
+            previous = json.load(f)
+    except (OSError, ValueError):
+        previous = {}
+    if previous != result:
+        _write(manifest_path, json.dumps(result, indent=1, sort_keys=True).encode())
+    _prune(dist_dir, set(result.values()) | set(previous.values()))
+    return result
+
+
+def _prune(dist_dir, keep):
+    """Delete hashed files (and their .gz/.br) not listed in `keep`."""
+    for root, dirs, files in os.walk(dist_dir):
+        for filename in files:
+            path = os.path.join(root, filename)
+            name = os.path.relpath(path, dist_dir).replace(os.sep, "/")
+            if name == "manifest.json" or name.endswith(".tmp"):
+                continue
+            if name.endswith((".gz", ".br")):
+                name = name[:-3]
+            if name not in keep:
+                os.remove(path)
+
+
+def vendor(static_dir=STATIC_DIR):
+    """Download the pinned libraries that are not in static/vendor/ yet."""
+    for name, url in VENDOR.items():
+        path = os.path.join(static_dir, name)
+        if os.path.exists(path):
+            continue
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with urllib.request.urlopen(url, timeout=30) as resp:
+            data = resp.read()
+        if f"v{CHARTJS_VERSION}".encode() not in data[:512]:
+            raise SystemExit(f"[ASSETS] {url} is not Chart.js {CHARTJS_VERSION}")
+        _write(path, data)
+        print(f"[ASSETS] {name} <- {url}")
+
+
+def available(name):
+    return name in manifest
+
+
+def serve(filename):
+    """A hashed file, pre-compressed when the client accepts it; cacheable forever."""
+    mimetype = mimetypes.guess_type(filename)[0]
+    offered = [e for e, ext in (("br", ".br"), ("gzip", ".gz")) if os.path.exists(os.path.join(DIST_DIR, filename + ext))]
+    encoding = request.accept_encodings.best_match(offered) if offered else None
+    suffix = {"br": ".br", "gzip": ".gz"}.get(encoding, "")
+    response = send_from_directory(DIST_DIR, filename + suffix, mimetype=mimetype, max_age=MAX_AGE, etag=False)
+    if encoding:
+        response.headers["Content-Encoding"] = encoding
+    if offered:
+        response.vary.add("Accept-Encoding")
+    response.cache_control.immutable = True
+    return response
+
+
+def init_app(app):
+    manifest.update(build())
+    print(f"[ASSETS] {len(manifest)} files fingerprinted")
+    app.add_url_rule("/static/dist/<path:filename>", "static_dist", serve)
+
+    @app.url_defaults
+    def _hashed_static(endpoint, values):
+        if endpoint == "static" and not app.debug:
+            hashed = manifest.get(values.get("filename"))
+            if hashed:
+                values["filename"] = f"dist/{hashed}"
+
+    app.jinja_env.globals["asset_available"] = available
+    app.jinja_env.globals["chartjs_cdn"] = VENDOR["vendor/chart.umd.min.js"]
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "build"
+    if command == "vendor":
+        vendor()
+    built = build()
+    print(f"[ASSETS] {len(built)} files -> {DIST_DIR}")
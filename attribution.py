@@ -0,0 +1,384 @@
+"""Multi-touch attribution of signups to click channels, served from an in-memory click index.
+
+The index keeps, per channel, the sorted epoch seconds of every human click. It is
+built once per process, refreshed incrementally from new click ids and reused by
+every request. Windows are resolved to whole minutes: a signup's window runs from
+the minute of (join - lookback) to the end of the join minute. Dense channels get
+a per-minute cumulative directory, so window bounds are plain array lookups;
+sparse ones are bisected.
+
+Work is laid out channel by channel over all members (sorted by join time) with
+map()/itemgetter()/sum() so the per-member loops run in C.
+"""
+import bisect
+import math
+import threading
+from array import array
+from collections import Counter
+from itertools import accumulate, islice, repeat
+from operator import add, floordiv, itemgetter, mul, not_, sub, truediv
+
+MODELS = ("last", "first", "linear", "time_decay")
+DEFAULT_LOOKBACK_HOURS = 48
+DEFAULT_HALF_LIFE_HOURS = 24
+# Query arguments are whole hours within these bounds (each half-life gets its own prefix sums)
+MAX_LOOKBACK_HOURS = 24 * 90
+MAX_HALF_LIFE_HOURS = 24 * 30
+
+RESOLUTION = 60               # seconds per directory slot
+DENSITY = 8                   # a channel gets a directory with at least one click per DENSITY slots
+SENTINEL = 0xFFFFFFFF         # kept after the last time of every channel array
+ERA_HALF_LIVES = 960          # decay weights are rebased every ERA_HALF_LIVES half-lives (< 2**1024)
+UNDERFLOW = 1e-300
+
+
+def parse_hours(value, default, maximum):
+    """Whole number of hours in [1, maximum] from a query argument; ValueError otherwise."""
+    if value is None or value == "":
+        return default
+    hours = int(value)
+    if not 1 <= hours <= maximum:
+        raise ValueError(f"hours out of range: {hours}")
+    return hours
+
+
+def _getter(indexes):
+    """itemgetter that always returns a tuple."""
+    if len(indexes) == 1:
+        i = indexes[0]
+        return lambda seq: (seq[i],)
+    return itemgetter(*indexes)
+
+
+def _clamp(sorted_values, top):
+    """Clamp an ascending list to [0, top] in place."""
+    low = bisect.bisect_left(sorted_values, 0)
+    high = bisect.bisect_right(sorted_values, top)
+    sorted_values[:low] = [0] * low
+    sorted_values[high:] = [top] * (len(sorted_values) - high)
+    return sorted_values
+
+
+class ChannelClicks:
+    """Sorted click times of one channel plus lazily built lookup structures."""
+
+    __slots__ = ("times", "directory", "decay")
+
+    def __init__(self):
+        self.times = array("I", [SENTINEL])
+        self.directory = None
+        self.decay = {}
+
+    def __len__(self):
+        return len(self.times) - 1
+
+    def extend(self, new_times):
+        """Append sorted times; returns False when they went before existing ones (full re-sort)."""
+        times = self.times
+        times.pop()
+        ordered = not len(times) or new_times[0] >= times[-1]
+        times.extend(new_times)
+        if not ordered:
+            self.times = times = array("I", sorted(times))
+            self.directory = None
+            self.decay = {}
+        times.append(SENTINEL)
+        return ordered
+
+
+class ClickIndex:
+    """Per-channel sorted click timestamps for one database."""
+
+    def __init__(self):
+        self.channels = {}
+        self.last_id = 0
+        self.count = 0
+        self.base = None
+        self.version = 0
+        self.lock = threading.Lock()
+        self._results = {}
+
+    # ---------- building ----------
+
+    def refresh(self, db):
+        """Pull clicks added since the last refresh; rebuild when clicks were deleted."""
+        # One statement, one snapshot: a click committed in between would look like a deletion
+        max_id, expected = db.execute("""
+            SELECT (SELECT COALESCE(MAX(id), 0) FROM clicks), (SELECT COALESCE(SUM(clicks), 0) FROM click_daily)
+        """).fetchone()
+        with self.lock:
+            if max_id == self.last_id and expected == self.count:
+                return self
+            if max_id < self.last_id or expected < self.count:
+                self._reset()
+            self._load(db, self.last_id, max_id)
+            if expected != self.count:
+                self._reset()
+                self._load(db, 0, max_id)
+        return self
+
+    def _reset(self):
+        self.channels = {}
+        self.last_id = 0
+        self.count = 0
+        self.base = None
+        self.version += 1
+        self._results.clear()
+
+    def _load(self, db, after_id, max_id):
+        cur = db.cursor()
+        cur.row_factory = None
+        cur.execute("""
+            SELECT channel, CAST(strftime('%s', clicked_at) AS INTEGER) FROM clicks
+            WHERE id > ? AND id <= ? AND is_bot = 0 ORDER BY id
+        """, (after_id, max_id))
+        new = {}
+        for channel, ts in cur:
+            if ts is not None:
+                new.setdefault(channel, []).append(ts)
+        self.add(new)
+        self.last_id = max_id
+
+    def add(self, times_by_channel):
+        """Append click times ({channel: [epoch, ...]}); also used to load synthetic data."""
+        for channel, times in times_by_channel.items():
+            if not times:
+                continue
+            times.sort()
+            ch = self.channels.get(channel)
+            if ch is None:
+                ch = self.channels[channel] = ChannelClicks()
+            ordered = ch.extend(times)
+            self.count += len(times)
+            first = times[0] - times[0] % RESOLUTION
+            if self.base is None or first < self.base:
+                # Directories and decay sums are relative to base: moving it invalidates them
+                self.base = first
+                for other in self.channels.values():
+                    other.directory = None
+                    other.decay = {}
+            if ordered and ch.directory is not None:
+                self._extend_directory(ch, times[0])
+            for half_life in list(ch.decay):
+                self._extend_decay(ch, half_life)
+        self.version += 1
+        self._results.clear()
+
+    def _extend_directory(self, ch, since=None):
+        """directory[m] = number of clicks before base + m * RESOLUTION.
+
+        Slots up to the one holding `since` (the first appended time) are kept.
+        """
+        times, n, d, base = ch.times, len(ch), ch.directory, self.base
+        keep = len(d) if since is None else min(len(d), (since - base) // RESOLUTION + 1)
+        del d[keep:]
+        target = (times[n - 1] - base) // RESOLUTION + 2
+        start = bisect.bisect_left(times, base + keep * RESOLUTION, 0, n)
+        per_slot = Counter(map(floordiv, map(sub, times[start:n], repeat(base)), repeat(RESOLUTION)))
+        d.extend(accumulate(map(per_slot.get, range(keep, target - 1), repeat(0)), initial=start))
+
+    def _directory(self, ch, length):
+        if ch.directory is None:
+            if len(ch) * DENSITY < length:
+                return None
+            ch.directory = array("I")
+            self._extend_directory(ch)
+        d = ch.directory
+        if len(d) < length:
+            # every channel shares the same slot range so one itemgetter serves them all
+            d.extend(repeat(len(ch), length - len(d)))
+        return d
+
+    def _decay_prefix(self, ch, half_life):
+        prefix = ch.decay.get(half_life)
+        if prefix is None:
+            ch.decay.clear()  # 8 bytes per click: keep a single half-life around
+            prefix = ch.decay[half_life] = (array("d", [0.0]), [0])
+            self._extend_decay(ch, half_life)
+        return prefix
+
+    def _extend_decay(self, ch, half_life):
+        """Prefix sums of 2**((t - era_start) / half_life), restarting at every era.
+
+        Era e covers [base + e*E, base + (e+1)*E). Position i of era e lives at index
+        i + e, each era opening with a 0 slot, so a same-era window sum is
+        prefix[hi + e] - prefix[lo + e]. era_first[e] is the first position of era e.
+        """
+        prefix, era_first = ch.decay[half_life]
+        era_len = ERA_HALF_LIVES * half_life
+        times, n = ch.times, len(ch)
+        i = len(prefix) - len(era_first)
+        while i < n:
+            era_start = self.base + (len(era_first) - 1) * era_len
+            end = bisect.bisect_left(times, era_start + era_len, i, n)
+            if end > i:
+                weights = map(pow, repeat(2.0), map(truediv, map(sub, times[i:end], repeat(era_start)), repeat(half_life)))
+                prefix.extend(islice(accumulate(weights, initial=prefix[-1]), 1, None))
+            if end < n:
+                era_first.append(end)
+                prefix.append(0.0)
+            i = end
+
+    # ---------- querying ----------
+
+    def attribute(self, members, model="last", lookback_hours=DEFAULT_LOOKBACK_HOURS,
+                  half_life_hours=DEFAULT_HALF_LIFE_HOURS, cache_key=None):
+        """Credit signups to channels.
+
+        members: (join_epoch, paid, ltv, mrr) tuples sorted by join_epoch, or a
+        callable returning them (only called when the result is not cached).
+        Returns {channel: {"signups", "paid", "ltv", "mrr"}} with fractional credit
+        for multi-touch models.
+        """
+        if model not in MODELS:
+            raise ValueError(f"unknown attribution model: {model}")
+        key = (cache_key, model, lookback_hours, half_life_hours) if cache_key is not None else None
+        with self.lock:
+            if key is not None and key in self._results:
+                return self._results[key]
+            if callable(members):
+                members = members()
+            result = self._attribute(members, model, int(lookback_hours * 3600), half_life_hours * 3600)
+            if key is not None:
+                if len(self._results) >= 32:
+                    self._results.clear()
+                self._results[key] = result
+        return result
+
+    def _attribute(self, members, model, lookback, half_life):
+        names = [name for name, ch in self.channels.items() if len(ch)]
+        if not members or not names:
+            return {}
+        joins = [m[0] for m in members]
+        base = self.base
+        top = max((ch.times[len(ch) - 1] - base) // RESOLUTION + 1 for ch in self.channels.values() if len(ch))
+        # Window bounds as slots: [start of the (join - lookback) minute, end of the join minute)
+        join_slots = list(map(floordiv, map(sub, joins, repeat(base - RESOLUTION)), repeat(RESOLUTION)))
+        hi_slots = _clamp(list(join_slots), top)
+        lo_slots = _clamp(list(map(floordiv, map(sub, joins, repeat(base + lookback)), repeat(RESOLUTION))), top)
+        at_hi, at_lo = _getter(hi_slots), _getter(lo_slots)
+        bounds = None
+
+        his, los, counts = [], [], []
+        for name in names:
+            ch = self.channels[name]
+            d = self._directory(ch, top + 1)
+            if d is not None:
+                hi, lo = at_hi(d), at_lo(d)
+            else:
+                if bounds is None:
+                    bounds = [[base + s * RESOLUTION for s in slots] for slots in (hi_slots, lo_slots)]
+                n = len(ch)
+                hi = list(map(bisect.bisect_left, repeat(ch.times), bounds[0], repeat(0), repeat(n)))
+                lo = list(map(bisect.bisect_left, repeat(ch.times), bounds[1], repeat(0), repeat(n)))
+            his.append(hi)
+            los.append(lo)
+            counts.append(list(map(sub, hi, lo)))
+
+        if model in ("last", "first"):
+            return self._single_touch(names, model, his, los, counts, members)
+
+        if model == "linear":
+            totals = [sum(col) for col in zip(*counts)] if len(names) > 1 else counts[0]
+            return self._credit(names, counts, totals, members)
+
+        # time_decay: weight of a click = 2 ** (-(join - t) / half_life)
+        era_len = ERA_HALF_LIVES * half_life
+        # Eras of the joins themselves, not of the clamped bounds: a join far past the last
+        # click must land in its own era, or its scale underflows and the window is taken for empty
+        eras = [int((max(s, 0) * RESOLUTION - 1) // era_len) for s in join_slots]
+        straddling = [i for i, (s, e) in enumerate(zip(lo_slots, eras)) if int(s * RESOLUTION // era_len) != e]
+        scale = [2.0 ** ((base + e * era_len - j) / half_life) for e, j in zip(eras, joins)]
+        sums = []
+        for name, hi, lo in zip(names, his, los):
+            ch = self.channels[name]
+            prefix, era_first = self._decay_prefix(ch, half_life)
+            last_era = len(era_first) - 1
+            # past its last era a channel has no clicks in the window: any valid index gives 0
+            shift = eras if eras[-1] <= last_era else list(map(min, eras, repeat(last_era)))
+            get = prefix.__getitem__
+            values = list(map(mul, map(sub, map(get, map(add, hi, shift)), map(get, map(add, lo, shift))), scale))
+            for i in straddling:
+                if hi[i] > lo[i]:
+                    values[i] = self._decay_window(ch, prefix, era_first, lo[i], hi[i], joins[i], half_life, era_len)
+            sums.append(values)
+        totals = [sum(col) for col in zip(*sums)] if len(names) > 1 else list(sums[0])
+        # clicks hundreds of half-lives old underflow to 0: fall back to linear credit
+        for i in [i for i, (t, n) in enumerate(zip(totals, map(sum, zip(*counts)))) if n and t < UNDERFLOW]:
+            for values, c in zip(sums, counts):
+                values[i] = c[i]
+            totals[i] = sum(c[i] for c in counts)
+        return self._credit(names, sums, totals, members)
+
+    def _decay_window(self, ch, prefix, era_first, lo, hi, join, half_life, era_len):
+        """Decayed weight of positions [lo, hi) when they span several eras."""
+        total = 0.0
+        era = bisect.bisect_right(era_first, lo) - 1
+        while lo < hi:
+            end = era_first[era + 1] if era + 1 < len(era_first) else len(ch)
+            stop = min(hi, end)
+            part = prefix[stop + era] - prefix[lo + era] if stop > lo else 0.0
+            if part > 0:
+                # combined in log space: the era scale alone may underflow
+                total += 2.0 ** (math.log2(part) + (self.base + era * era_len - join) / half_life)
+            lo = stop
+            era += 1
+        return total
+
+    def _single_touch(self, names, model, his, los, counts, members):
+        touch = []
+        for name, hi, lo, cnt in zip(names, his, los, counts):
+            times = self.channels[name].times
+            if model == "last":
+                # latest click in the window, 0 when the channel has none
+                clicked = _getter(list(map(sub, hi, repeat(1))))(times)
+                touch.append(list(map(mul, clicked, map(bool, cnt))))
+            else:
+                # earliest click in the window, SENTINEL when the channel has none
+                touch.append(list(map(max, _getter(lo)(times), map(mul, map(not_, cnt), repeat(SENTINEL)))))
+        pick, empty = (max, 0) if model == "last" else (min, SENTINEL)
+        totals = [[0, 0, 0.0, 0.0] for _ in names]
+        for row, (_, paid, ltv, mrr) in zip(zip(*touch), members):
+            best = pick(row)
+            if best != empty:
+                acc = totals[row.index(best)]
+                acc[0] += 1
+                acc[1] += paid
+                acc[2] += ltv
+                acc[3] += mrr
+        return {
+            name: {"signups": s, "paid": p, "ltv": l, "mrr": m}
+            for name, (s, p, l, m) in zip(names, totals) if s
+        }
+
+    def _credit(self, names, weights, totals, members):
+        """Split each member's signup/paid/ltv/mrr across channels proportionally to weights."""
+        inv = [1.0 / t if t >= UNDERFLOW else 0.0 for t in totals]
+        valued = [i for i, m in enumerate(members) if m[1] or m[2] or m[3]]
+        pick = _getter(valued) if valued else (lambda seq: ())
+        paid, ltv, mrr = ([members[i][k] * inv[i] for i in valued] for k in (1, 2, 3))
+        result = {}
+        for name, w in zip(names, weights):
+            signups = sum(map(mul, w, inv))
+            if signups:
+                wv = pick(w)
+                result[name] = {
+                    "signups": signups,
+                    "paid": sum(map(mul, wv, paid)),
+                    "ltv": sum(map(mul, wv, ltv)),
+                    "mrr": sum(map(mul, wv, mrr)),
+                }
+        return result
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_index(key):
+    """Process-wide click index for a database (keyed by its path)."""
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None:
+            index = _indexes[key] = ClickIndex()
+        return index
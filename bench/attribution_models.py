@@ -0,0 +1,85 @@
+"""Latency of the attribution models over the in-memory click index.
+
+Builds the index straight from synthetic click times (no SQLite; time-ordered, as
+they come out of the clicks table), then times every model: first query (also
+builds the lazy per-minute directories / decay sums), cold (result cache cleared)
+and warm (cached result).
+
+Usage: python bench/attribution_models.py [--members 100000] [--clicks 10000000] [--out results.json]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import attribution  # noqa: E402
+from generate import CHANNELS, CHANNEL_WEIGHTS  # noqa: E402
+
+START = 1672531200  # 2023-01-01 UTC
+DAYS = 365
+
+
+def synthetic(members, clicks, seed=7):
+    rnd = random.Random(seed)
+    span = DAYS * 86400
+    total = sum(CHANNEL_WEIGHTS)
+    times = {
+        channel: sorted(START + rnd.randrange(span) for _ in range(clicks * weight // total))
+        for channel, weight in zip(CHANNELS, CHANNEL_WEIGHTS)
+    }
+    joined = sorted(
+        (START + rnd.randrange(span), rnd.random() < 0.3, rnd.choice((0, 29, 290)), rnd.choice((0, 29, 99)))
+        for _ in range(members)
+    )
+    return times, joined
+
+
+def run(members, clicks, lookback, half_life):
+    started = time.perf_counter()
+    times, joined = synthetic(members, clicks)
+    generated = time.perf_counter() - started
+
+    index = attribution.ClickIndex()
+    started = time.perf_counter()
+    index.add(times)
+    results = {"generate_s": round(generated, 2), "index_build_s": round(time.perf_counter() - started, 2)}
+
+    for model in attribution.MODELS:
+        runs = {}
+        for label in ("first_query", "cold", "warm"):
+            if label == "cold":
+                index._results.clear()
+            started = time.perf_counter()
+            index.attribute(joined, model, lookback, half_life, cache_key="bench")
+            runs[f"{label}_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        results[model] = runs
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--members", type=int, default=100000)
+    parser.add_argument("--clicks", type=int, default=10000000)
+    parser.add_argument("--lookback", type=float, default=attribution.DEFAULT_LOOKBACK_HOURS)
+    parser.add_argument("--half-life", type=float, default=attribution.DEFAULT_HALF_LIFE_HOURS)
+    parser.add_argument("--out")
+    args = parser.parse_args()
+
+    results = {"benchmark": "attribution", "members": args.members, "clicks": args.clicks,
+               "channels": len(CHANNELS), "lookback_hours": args.lookback, "half_life_hours": args.half_life,
+               "runs": run(args.members, args.clicks, args.lookback, args.half_life)}
+    output = json.dumps(results, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(output)
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Parse throughput of Skool exports: the former DictReader loop against csv_import.parse.
+
+Times parsing and normalization only (no database): the row-by-row DictReader
+loop the import used before, csv_import in-process (--workers 1) and csv_import
+over the process pool with 2..N workers. The pool is warmed up first, so
+process start-up is not counted.
+
+Usage: python bench/csv_parse.py [--members 200000] [--workers 4] [--repeat 3] [--out results.json]
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import csv_import  # noqa: E402
+from generate import skool_exports  # noqa: E402
+
+
+def dictreader(content):
+    """The import's parsing loop before csv_import, kept as the baseline."""
+    delimiter = ";" if ";" in content.split("\n")[0] else ","
+    rows = []
+    for row in csv.DictReader(io.StringIO(content), delimiter=delimiter):
+        price_str = row.get("Price", "0").replace("$", "").replace(",", "").strip()
+        ltv_str = row.get("LTV", "0").replace("$", "").replace(",", "").strip()
+        rows.append((
+            row.get("FirstName", "").strip(), row.get("LastName", "").strip(), row.get("Email", "").strip(),
+            row.get("Invited By", "").strip(), row.get("JoinedDate", "").strip(),
+            row.get("Recurring Interval", "").strip(), row.get("Tier", "").strip(),
+            float(price_str) if price_str else 0, float(ltv_str) if ltv_str else 0,
+        ))
+    return len(rows)
+
+
+def best(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        rows = fn()
+        samples.append(time.perf_counter() - start)
+    return rows, min(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--members", type=int, default=200000)
+    parser.add_argument("--workers", type=int, default=csv_import.WORKERS)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--out")
+    args = parser.parse_args()
+
+    content = next(skool_exports(args.members, exports=1))
+    # Force the pool path whatever the export size
+    csv_import.PARALLEL_MIN_BYTES = 0
+    csv_import.WORKERS = max(args.workers, 1)
+    if args.workers > 1:
+        csv_import.parse(content[:100000], workers=args.workers)
+
+    scenarios = [("dictreader", lambda: dictreader(content))]
+    scenarios += [(f"csv_import[workers={n}]", lambda n=n: len(csv_import.parse(content, workers=n)))
+                  for n in sorted({1, *range(2, args.workers + 1)})]
+    runs = []
+    for name, fn in scenarios:
+        rows, seconds = best(fn, args.repeat)
+        runs.append({"scenario": name, "rows": rows, "seconds": round(seconds, 3),
+                     "rows_per_second": round(rows / seconds)})
+        print(f"{name:<24} {rows:>8} rows  {seconds:7.3f} s  {rows / seconds:>10.0f} rows/s", file=sys.stderr)
+
+    results = {"benchmark": "csv_parse", "members": args.members, "bytes": len(content),
+               "cpus": os.cpu_count(), "runs": runs}
+    output = json.dumps(results, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(output)
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
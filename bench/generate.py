@@ -0,0 +1,183 @@
+"""Deterministic synthetic data for benchmarks: Skool member exports and click logs.
+
+Usage:
+    python bench/generate.py exports --members 10000 --exports 3 --out-dir /tmp/exports
+    python bench/generate.py clicks --clicks 1000000 --db /tmp/tracker.db
+"""
+import argparse
+import hashlib
+import os
+import random
+import sqlite3
+import sys
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from clicks import rebuild_rollups  # noqa: E402
+
+HEADER = ["FirstName", "LastName", "Email", "Invited By", "JoinedDate", "Price", "Recurring Interval", "Tier", "LTV"]
+
+CHANNELS = [
+    "youtube", "linkedin", "instagram", "tiktok", "x", "facebook",
+    "newsletter", "google-ads", "reddit", "substack", "direct", "autre",
+]
+# Rough traffic share per channel, most traffic comes from a handful of platforms
+CHANNEL_WEIGHTS = [30, 18, 14, 10, 6, 5, 5, 4, 3, 2, 2, 1]
+
+USER_AGENTS = [
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0 Safari/537.36",
+    "Mozilla/5.0 (iPhone; CPU iPhone OS 17_4 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.4 Mobile/15E148 Safari/604.1",
+    "Mozilla/5.0 (Linux; Android 14; Pixel 8) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0 Mobile Safari/537.36",
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 14_4) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.4 Safari/605.1.15",
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:125.0) Gecko/20100101 Firefox/125.0",
+    "Mozilla/5.0 (iPad; CPU OS 17_4 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.4 Mobile/15E148 Safari/604.1",
+    "Slackbot-LinkExpanding 1.0 (+https://api.slack.com/robots)",
+    "LinkedInBot/1.0 (compatible; Mozilla/5.0; Apache-HttpClient +http://www.linkedin.com)",
+    "Twitterbot/1.0",
+    "Mozilla/5.0 (compatible; Googlebot/2.1; +http://www.google.com/bot.html)",
+]
+UA_WEIGHTS = [30, 25, 20, 10, 5, 4, 2, 2, 1, 1]
+
+REFERERS = [
+    "", "https://www.youtube.com/", "https://www.linkedin.com/feed/", "https://l.instagram.com/",
+    "https://www.tiktok.com/", "https://t.co/abc", "https://www.facebook.com/", "https://mail.google.com/",
+    "https://www.reddit.com/r/entrepreneur/", "https://substack.com/",
+]
+
+TIERS = [("free", 0, ""), ("pro", 29, "month"), ("pro", 290, "year"), ("vip", 99, "month")]
+TIER_WEIGHTS = [70, 20, 6, 4]
+
+
+class Member:
+    __slots__ = ("idx", "first", "last", "email", "invited_by", "joined", "tier", "price", "interval", "ltv")
+
+    def to_row(self):
+        return [
+            self.first, self.last, self.email, self.invited_by, self.joined,
+            f"${self.price:g}" if self.price else "0", self.interval, self.tier,
+            f"${self.ltv:,.0f}" if self.ltv else "0",
+        ]
+
+
+def _new_member(rnd, idx, joined, population):
+    m = Member()
+    m.idx = idx
+    m.first = f"Prenom{idx}"
+    m.last = f"Nom{idx % 5000}"  # deliberately reuses last names
+    m.email = f"member{idx}@example.com"
+    m.invited_by = ""
+    if population and rnd.random() < 0.2:
+        ref = population[rnd.randrange(len(population))]
+        m.invited_by = f"{ref.first} {ref.last}"
+    m.joined = joined.strftime("%Y-%m-%d %H:%M:%S")
+    m.tier, m.price, m.interval = rnd.choices(TIERS, TIER_WEIGHTS)[0]
+    m.ltv = m.price
+    return m
+
+
+def skool_exports(members, exports=2, churn_rate=0.03, growth_rate=0.05, change_rate=0.01,
+                  start=datetime(2024, 1, 1), days_between=30, seed=42):
+    """Yield successive Skool exports as CSV strings.
+
+    The first export holds `members` rows. Every following export drops `churn_rate`
+    of the active members, brings back a few churned ones, changes plans/LTV for
+    `change_rate` of them and adds `growth_rate` new members.
+    """
+    rnd = random.Random(seed)
+    active, churned = [], []
+    next_idx = 0
+    span = timedelta(days=365)
+    for _ in range(members):
+        joined = start - span + timedelta(seconds=rnd.randrange(int(span.total_seconds())))
+        active.append(_new_member(rnd, next_idx, joined, active))
+        next_idx += 1
+
+    for export in range(exports):
+        export_at = start + timedelta(days=days_between * export)
+        if export:
+            rnd.shuffle(active)
+            n_churn = int(len(active) * churn_rate)
+            leaving, active = active[:n_churn], active[n_churn:]
+            back = churned[:max(1, len(churned) // 10)] if churned else []
+            churned = churned[len(back):] + leaving
+            active.extend(back)
+            for m in rnd.sample(active, int(len(active) * change_rate)):
+                m.tier, m.price, m.interval = rnd.choices(TIERS, TIER_WEIGHTS)[0]
+            for _ in range(int(len(active) * growth_rate)):
+                joined = export_at - timedelta(seconds=rnd.randrange(days_between * 86400))
+                active.append(_new_member(rnd, next_idx, joined, active))
+                next_idx += 1
+            for m in active:
+                m.ltv += m.price if m.interval == "month" else 0
+
+        lines = [",".join(HEADER)]
+        lines.extend(",".join(f'"{v}"' if "," in v else v for v in m.to_row()) for m in active)
+        yield "\n".join(lines) + "\n"
+
+
+def click_rows(n, start=datetime(2023, 1, 1), days=365, channels=CHANNELS, seed=7):
+    """Yield `n` click tuples (channel, clicked_at, ip_hash, user_agent, referer) in time order."""
+    rnd = random.Random(seed)
+    weights = CHANNEL_WEIGHTS[:len(channels)] + [1] * max(0, len(channels) - len(CHANNEL_WEIGHTS))
+    ip_pool = [hashlib.sha256(f"10.0.{i // 256}.{i % 256}".encode()).hexdigest()[:16] for i in range(max(n // 4, 1000))]
+    step = days * 86400 / max(n, 1)
+    t = start.timestamp()
+    batch = 10000
+    for offset in range(0, n, batch):
+        size = min(batch, n - offset)
+        chans = rnd.choices(channels, weights, k=size)
+        uas = rnd.choices(USER_AGENTS, UA_WEIGHTS, k=size)
+        for i in range(size):
+            t += rnd.expovariate(1 / step)
+            yield (
+                chans[i], datetime.fromtimestamp(t).strftime("%Y-%m-%d %H:%M:%S"),
+                ip_pool[rnd.randrange(len(ip_pool))], uas[i], REFERERS[rnd.randrange(len(REFERERS))],
+            )
+
+
+def load_clicks(db_path, n, **kwargs):
+    """Bulk-insert `n` synthetic clicks straight into the clicks table, then rebuild the rollups."""
+    db = sqlite3.connect(db_path)
+    db.row_factory = sqlite3.Row
+    db.execute("PRAGMA journal_mode=WAL")
+    rows = click_rows(n, **kwargs)
+    while True:
+        chunk = [row for _, row in zip(range(50000), rows)]
+        if not chunk:
+            break
+        db.executemany(
+            "INSERT INTO clicks (channel, clicked_at, ip_hash, user_agent, referer) VALUES (?, ?, ?, ?, ?)", chunk
+        )
+        db.commit()
+    rebuild_rollups(db)
+    db.commit()
+    db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic Skool exports and click logs")
+    sub = parser.add_subparsers(dest="kind", required=True)
+    p = sub.add_parser("exports")
+    p.add_argument("--members", type=int, default=10000)
+    p.add_argument("--exports", type=int, default=2)
+    p.add_argument("--out-dir", required=True)
+    p = sub.add_parser("clicks")
+    p.add_argument("--clicks", type=int, default=100000)
+    p.add_argument("--db", required=True)
+    args = parser.parse_args()
+
+    if args.kind == "exports":
+        os.makedirs(args.out_dir, exist_ok=True)
+        for i, content in enumerate(skool_exports(args.members, args.exports)):
+            path = os.path.join(args.out_dir, f"export_{i + 1}.csv")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(content)
+            print(path)
+    else:
+        load_clicks(args.db, args.clicks)
+        print(f"{args.clicks} clicks -> {args.db}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""Payload size per endpoint: default JSON vs ?format=columnar, raw / gzip / brotli, and encoder speed.
+
+Usage:
+    python bench/payload_sizes.py --members 10000 --clicks 200000
+"""
+import argparse
+import gzip
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from generate import skool_exports, load_clicks  # noqa: E402
+
+ENDPOINTS = (
+    "/api/clicks?days=90",
+    "/api/members",
+    "/api/history",
+    "/api/growth?group=day&points=0",
+    "/api/growth?group=week",
+)
+
+
+def sizes(body):
+    out = {"raw": len(body), "gzip": len(gzip.compress(body, compresslevel=6))}
+    try:
+        import brotli
+        out["br"] = len(brotli.compress(body, quality=5))
+    except ImportError:
+        pass
+    return out
+
+
+def encode_ms(fn, obj, repeat=20):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(obj)
+    return round((time.perf_counter() - start) / repeat * 1000, 3)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="API payload sizes")
+    parser.add_argument("--members", type=int, default=10000)
+    parser.add_argument("--clicks", type=int, default=100000)
+    parser.add_argument("--click-days", type=int, default=90)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    os.environ["DB_PATH"] = os.path.join(tempfile.mkdtemp(prefix="skool-bench-"), "tracker.db")
+    os.environ.setdefault("ADMIN_PASSWORD", "admin")
+    import models
+    import app as tracker
+    import payloads
+    import replica
+
+    client = tracker.app.test_client()
+    client.post("/login", data={"username": "admin", "password": os.environ["ADMIN_PASSWORD"]})
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    load_clicks(models.DB_PATH, args.clicks, start=today - timedelta(days=args.click_days), days=args.click_days,
+                seed=args.seed)
+    for i, export in enumerate(skool_exports(args.members, exports=2, start=today - timedelta(days=30), seed=args.seed)):
+        if i:
+            time.sleep(1)  # batch ids have one-second resolution
+        client.post("/upload", data={"csvfile": (io.BytesIO(export.encode()), "export.csv")},
+                    content_type="multipart/form-data")
+    # Imports only ask for a replica copy: take it now so every endpoint reads the loaded data
+    replica.refresh(models.DB_PATH)
+
+    print(f"{'endpoint':<34} {'format':<9} {'raw':>10} {'gzip':>9} {'br':>9}  {'vs json raw':>11}")
+    results = {}
+    for path in ENDPOINTS:
+        sep = "&" if "?" in path else "?"
+        default = client.get(path).get_data()
+        col = client.get(f"{path}{sep}format=columnar").get_data()
+        results[path] = {"json": sizes(default), "columnar": sizes(col)}
+        for fmt, s in results[path].items():
+            ratio = s["raw"] / results[path]["json"]["raw"]
+            print(f"{path:<34} {fmt:<9} {s['raw']:>10} {s['gzip']:>9} {s.get('br', '-'):>9}  {ratio:>10.0%}")
+        obj = json.loads(default)
+        results[path]["encode_ms"] = {
+            "json": encode_ms(lambda o: json.dumps(o, sort_keys=True, separators=(",", ":")), obj),
+            "provider": encode_ms(tracker.app.json.dumps, obj),
+            "columnar_transform": encode_ms(lambda o: payloads.columnar(o, tracker.CLICK_MATRICES), obj),
+        }
+        print(f"{'':<34} encode ms: {results[path]['encode_ms']}")
+
+    resp = client.get(ENDPOINTS[0], headers={"Accept-Encoding": "br, gzip"})
+    print(f"\nnegotiated {ENDPOINTS[0]}: Content-Encoding={resp.headers.get('Content-Encoding')} "
+          f"length={resp.headers.get('Content-Length')} orjson={'yes' if payloads.orjson else 'no'}")
+
+
+if __name__ == "__main__":
+    main()
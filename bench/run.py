@@ -0,0 +1,159 @@
+"""Scripted benchmark scenarios against a throwaway database.
+
+Scenarios: import (first export), reimport (next export, with churn), api (every
+GET /api/* endpoint) and redirect (/go/<channel> throughput). Results are written
+as JSON so two runs can be compared with --compare.
+
+Usage:
+    python bench/run.py --members 10000 --clicks 200000 --out bench/results/run.json
+    python bench/run.py --scenarios api --compare bench/results/run.json
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from generate import skool_exports, load_clicks, CHANNELS  # noqa: E402
+
+SCENARIOS = ("import", "reimport", "api", "redirect")
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    samples.sort()
+    return {
+        "runs": repeat,
+        "min_ms": round(samples[0] * 1000, 2),
+        "median_ms": round(statistics.median(samples) * 1000, 2),
+        "p95_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))] * 1000, 2),
+    }
+
+
+def upload(client, content):
+    resp = client.post("/upload", data={"csvfile": (io.BytesIO(content.encode()), "export.csv")},
+                       content_type="multipart/form-data")
+    assert resp.status_code == 200, resp.status_code
+
+
+def api_endpoints(app):
+    """Every parameterless GET /api/* route, so new endpoints are picked up automatically."""
+    return sorted(
+        rule.rule for rule in app.url_map.iter_rules()
+        if rule.rule.startswith("/api/") and "GET" in rule.methods and not rule.arguments
+    )
+
+
+def run(args):
+    db_dir = tempfile.mkdtemp(prefix="skool-bench-")
+    os.environ["DB_PATH"] = os.path.join(db_dir, "tracker.db")
+    os.environ.setdefault("ADMIN_PASSWORD", "admin")
+    import models
+    import replica
+    import app as tracker
+
+    client = tracker.app.test_client()
+    client.post("/login", data={"username": "admin", "password": os.environ["ADMIN_PASSWORD"]})
+
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    exports = list(skool_exports(args.members, exports=2, start=today - timedelta(days=30), seed=args.seed))
+    results = {}
+
+    setup = time.perf_counter()
+    load_clicks(models.DB_PATH, args.clicks, start=today - timedelta(days=args.click_days), days=args.click_days, seed=args.seed)
+    results["setup"] = {"clicks": args.clicks, "seconds": round(time.perf_counter() - setup, 2)}
+
+    if "import" in args.scenarios or "reimport" in args.scenarios or "api" in args.scenarios:
+        start = time.perf_counter()
+        upload(client, exports[0])
+        results["import"] = {"rows": exports[0].count("\n") - 1, "seconds": round(time.perf_counter() - start, 3)}
+
+    if "reimport" in args.scenarios:
+        time.sleep(1)  # batch ids have one-second resolution
+        start = time.perf_counter()
+        upload(client, exports[1])
+        results["reimport"] = {"rows": exports[1].count("\n") - 1, "seconds": round(time.perf_counter() - start, 3)}
+
+    if "api" in args.scenarios:
+        # Imports only ask for a replica copy: take it now so every endpoint reads the loaded data
+        replica.refresh(models.DB_PATH)
+        endpoints = {}
+        for path in api_endpoints(tracker.app):
+            def call(path=path):
+                resp = client.get(path)
+                assert resp.status_code < 500, (path, resp.status_code)
+            endpoints[path] = timed(call, args.repeat)
+        results["api"] = endpoints
+
+    if "redirect" in args.scenarios:
+        def burst():
+            for i in range(args.redirects):
+                client.get(f"/go/{CHANNELS[i % len(CHANNELS)]}")
+        start = time.perf_counter()
+        burst()
+        elapsed = time.perf_counter() - start
+        results["redirect"] = {"requests": args.redirects, "seconds": round(elapsed, 3),
+                               "per_second": round(args.redirects / elapsed, 1)}
+    return results
+
+
+def compare(current, baseline):
+    """Print median/seconds ratios (current / baseline) for matching measurements."""
+    def flat(d, prefix=""):
+        for k, v in d.items():
+            if isinstance(v, dict) and not ({"median_ms", "seconds"} & v.keys()):
+                yield from flat(v, f"{prefix}{k} ")
+            elif isinstance(v, dict):
+                yield f"{prefix}{k}", v.get("median_ms", v.get("seconds"))
+    base = dict(flat(baseline["results"]))
+    for name, value in flat(current["results"]):
+        if base.get(name):
+            print(f"{name:<40} {base[name]:>10} -> {value:>10}  x{value / base[name]:.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Skool Tracker benchmarks")
+    parser.add_argument("--members", type=int, default=10000)
+    parser.add_argument("--clicks", type=int, default=100000)
+    parser.add_argument("--click-days", type=int, default=90)
+    parser.add_argument("--redirects", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--out", help="write JSON results to this file")
+    parser.add_argument("--compare", help="previous JSON results to compare against")
+    args = parser.parse_args()
+    args.scenarios = [s for s in args.scenarios.split(",") if s]
+
+    report = {
+        "started_at": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "params": {k: getattr(args, k) for k in ("members", "clicks", "click_days", "redirects", "repeat", "seed", "scenarios")},
+        "results": run(args),
+    }
+    output = json.dumps(report, indent=2)
+    if args.out:
+        os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+        with open(args.out, "w") as f:
+            f.write(output)
+    print(output)
+    if args.compare:
+        with open(args.compare) as f:
+            compare(report, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
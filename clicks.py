@@ -0,0 +1,209 @@
+"""Click ingestion: bot classification, enrichment and per-channel daily rollups.
+
+Each click is classified once at ingest: bot or human, device and browser from
+the user agent, site from the referer. Those land as small integer keys into
+the click_devices, click_browsers and referrer_domains tables, and human clicks
+are counted per channel, day, device, browser and referrer domain in
+click_dims_daily, next to the click_daily totals and unique-visitor sketches.
+"""
+import re
+import threading
+from functools import lru_cache
+from urllib.parse import urlsplit
+
+from sketches import HyperLogLog
+
+# Crawlers, link-preview unfurlers and scripted clients. Compiled once, results cached per user agent.
+# "bot" only as a word or as the end of a product token (Googlebot/, PetalBot;, DuckDuckBot-Https):
+# phone models such as Cubot end in "bot" too.
+BOT_PATTERN = re.compile(
+    r"\bbot\b|[a-z]bot[/;-]|crawl|spider|slurp|preview|facebookexternalhit|facebot|slack|linkedinbot|twitterbot|"
+    r"telegrambot|whatsapp|discordbot|embedly|redditbot|applebot|skypeuripreview|vkshare|"
+    r"iframely|mastodon|bluesky|cardyb|google-inspectiontool|headlesschrome|phantomjs|curl/|wget/|"
+    r"python-requests|python-urllib|go-http-client|httpclient|axios/|node-fetch",
+    re.IGNORECASE,
+)
+
+
+@lru_cache(maxsize=4096)
+def is_bot(user_agent):
+    return not user_agent.strip() or BOT_PATTERN.search(user_agent) is not None
+
+
+# Checked in order, in-app browsers first: their user agents also carry "Safari" or "Chrome"
+BROWSERS = (
+    ("Instagram", re.compile(r"instagram", re.IGNORECASE)),
+    ("Facebook", re.compile(r"fban|fbav|fb_iab", re.IGNORECASE)),
+    ("TikTok", re.compile(r"musical_ly|bytedancewebview|tiktok", re.IGNORECASE)),
+    ("LinkedIn", re.compile(r"linkedinapp", re.IGNORECASE)),
+    ("Snapchat", re.compile(r"snapchat", re.IGNORECASE)),
+    ("Edge", re.compile(r"edg(e|a|ios)?/", re.IGNORECASE)),
+    ("Opera", re.compile(r"opr/|opera", re.IGNORECASE)),
+    ("Samsung Internet", re.compile(r"samsungbrowser", re.IGNORECASE)),
+    ("Firefox", re.compile(r"firefox|fxios", re.IGNORECASE)),
+    ("Chrome", re.compile(r"chrome|crios", re.IGNORECASE)),
+    ("Safari", re.compile(r"safari", re.IGNORECASE)),
+)
+TABLET_PATTERN = re.compile(r"ipad|tablet|kindle|silk/|android(?!.*mobile)", re.IGNORECASE)
+MOBILE_PATTERN = re.compile(r"mobi|iphone|ipod|android|windows phone", re.IGNORECASE)
+UNKNOWN = "Inconnu"
+DIRECT = "(direct)"
+# example.co.uk → example.co.uk rather than co.uk
+SECOND_LEVEL = {"co", "com", "org", "net", "gov", "ac", "edu"}
+
+DIMENSIONS = ("click_devices", "click_browsers", "referrer_domains")
+# Breakdowns served by /api/clicks; referrer sites past TOP_REFERRERS are summed as OTHER_REFERRERS
+SEGMENTS = ("device", "browser", "referrer")
+TOP_REFERRERS = 15
+OTHER_REFERRERS = "(autres)"
+
+
+@lru_cache(maxsize=4096)
+def parse_user_agent(user_agent):
+    """(device, browser) for a user agent."""
+    if not user_agent.strip():
+        return UNKNOWN, UNKNOWN
+    if is_bot(user_agent):
+        return "Robot", "Robot"
+    if TABLET_PATTERN.search(user_agent):
+        device = "Tablette"
+    elif MOBILE_PATTERN.search(user_agent):
+        device = "Mobile"
+    else:
+        device = "Ordinateur"
+    browser = next((name for name, pattern in BROWSERS if pattern.search(user_agent)), "Autre")
+    return device, browser
+
+
+@lru_cache(maxsize=4096)
+def referrer_domain(referer):
+    """Site a referer URL belongs to: https://l.instagram.com/?u=… → instagram.com."""
+    if not referer.strip():
+        return DIRECT
+    try:
+        host = urlsplit(referer.strip()).hostname
+    except ValueError:
+        host = None
+    if not host:
+        return UNKNOWN
+    labels = host.rstrip(".").split(".")
+    if len(labels) <= 2 or labels[-1].isdigit():
+        return host
+    keep = 3 if len(labels[-1]) == 2 and labels[-2] in SECOND_LEVEL else 2
+    return ".".join(labels[-keep:])
+
+
+_dimension_ids = {}
+_dimension_lock = threading.Lock()
+
+
+def dimension_id(db, table, name, key=None):
+    """Integer key of `name` in a dimension table, inserted on first sight.
+
+    With a key (the database path), ids are remembered across requests: rows of
+    the dimension tables are never deleted or renumbered.
+    """
+    cached = _dimension_ids.get((key, table, name)) if key else None
+    if cached is not None:
+        return cached
+    db.execute(f"INSERT OR IGNORE INTO {table} (name) VALUES (?)", (name,))
+    dim_id = db.execute(f"SELECT id FROM {table} WHERE name = ?", (name,)).fetchone()[0]
+    if key:
+        with _dimension_lock:
+            _dimension_ids[(key, table, name)] = dim_id
+    return dim_id
+
+
+def enrich(db, user_agent, referer, key=None):
+    """(device_id, browser_id, referrer_domain_id) for a click."""
+    names = (*parse_user_agent(user_agent), referrer_domain(referer))
+    return tuple(dimension_id(db, table, name, key) for table, name in zip(DIMENSIONS, names))
+
+
+def record_click(db, channel, clicked_at, ip_hash, user_agent, referer, key=None):
+    """Insert a click and fold it into click_daily and click_dims_daily. The caller commits."""
+    bot = is_bot(user_agent)
+    dims = enrich(db, user_agent, referer, key)
+    db.execute(
+        "INSERT INTO clicks (channel, clicked_at, ip_hash, user_agent, referer, is_bot, "
+        "device_id, browser_id, referrer_domain_id) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        (channel, clicked_at, ip_hash, user_agent, referer, int(bot), *dims)
+    )
+    day = clicked_at[:10]
+    if bot:
+        db.execute("""
+            INSERT INTO click_daily (channel, day, bot_clicks) VALUES (?, ?, 1)
+            ON CONFLICT(channel, day) DO UPDATE SET bot_clicks = bot_clicks + 1
+        """, (channel, day))
+        return bot
+
+    row = db.execute("SELECT visitors FROM click_daily WHERE channel = ? AND day = ?", (channel, day)).fetchone()
+    sketch = HyperLogLog(row["visitors"] if row else None)
+    # Only rewrite the sketch blob when one of its registers moved
+    blob = sketch.to_bytes() if sketch.add_hex(ip_hash) or not row else None
+    db.execute("""
+        INSERT INTO click_daily (channel, day, clicks, visitors) VALUES (?, ?, 1, ?)
+        ON CONFLICT(channel, day) DO UPDATE SET clicks = clicks + 1, visitors = COALESCE(excluded.visitors, visitors)
+    """, (channel, day, blob))
+    db.execute("""
+        INSERT INTO click_dims_daily (channel, day, device_id, browser_id, referrer_domain_id, clicks)
+        VALUES (?, ?, ?, ?, ?, 1)
+        ON CONFLICT(channel, day, device_id, browser_id, referrer_domain_id) DO UPDATE SET clicks = clicks + 1
+    """, (channel, day, *dims))
+    return bot
+
+
+def rebuild_rollups(db, batch_size=50000):
+    """Recompute is_bot, the click dimensions and both rollups from the raw clicks table (migrations, bulk loads)."""
+    db.execute("DELETE FROM click_daily")
+    db.execute("DELETE FROM click_dims_daily")
+    rollups = {}
+    segments = {}
+    dim_ids = {}
+    last_id = 0
+    while True:
+        rows = db.execute(
+            "SELECT id, channel, clicked_at, ip_hash, user_agent, referer FROM clicks WHERE id > ? ORDER BY id LIMIT ?",
+            (last_id, batch_size)
+        ).fetchall()
+        if not rows:
+            break
+        updates = []
+        for r in rows:
+            user_agent, referer = r["user_agent"] or "", r["referer"] or ""
+            names = (*parse_user_agent(user_agent), referrer_domain(referer))
+            dims = dim_ids.get(names)
+            if dims is None:
+                dims = dim_ids[names] = tuple(dimension_id(db, t, n) for t, n in zip(DIMENSIONS, names))
+            key = (r["channel"], r["clicked_at"][:10])
+            entry = rollups.get(key)
+            if entry is None:
+                entry = rollups[key] = [0, 0, HyperLogLog()]
+            bot = is_bot(user_agent)
+            if bot:
+                entry[1] += 1
+            else:
+                entry[0] += 1
+                entry[2].add_hex(r["ip_hash"] or "")
+                segments[key + dims] = segments.get(key + dims, 0) + 1
+            updates.append((int(bot), *dims, r["id"]))
+        db.executemany(
+            "UPDATE clicks SET is_bot = ?, device_id = ?, browser_id = ?, referrer_domain_id = ? WHERE id = ?", updates
+        )
+        last_id = rows[-1]["id"]
+
+    db.executemany(
+        "INSERT INTO click_daily (channel, day, clicks, bot_clicks, visitors) VALUES (?, ?, ?, ?, ?)",
+        [(ch, day, c, b, sketch.to_bytes() if c else None) for (ch, day), (c, b, sketch) in rollups.items()]
+    )
+    db.executemany(
+        "INSERT INTO click_dims_daily (channel, day, device_id, browser_id, referrer_domain_id, clicks) "
+        "VALUES (?, ?, ?, ?, ?, ?)",
+        [(*key, n) for key, n in segments.items()]
+    )
+    return len(rollups)
+
+
+def unique_visitors(rows):
+    """Estimated distinct visitors across click_daily rows (any channel/day selection)."""
+    return HyperLogLog.merge(r["visitors"] for r in rows).count()
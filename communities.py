@@ -0,0 +1,199 @@
+"""Multi-community support: one SQLite shard per Skool community.
+
+The main database (DB_PATH) holds users, the community registry and the data of
+the default community, served at the root. Every other community has its own file
+under data/communities/ and is served under /c/<slug>/...: CommunityMiddleware
+moves that prefix into SCRIPT_NAME, so routes, request.path and url_for work
+unchanged, and maps /go/<slug>/<channel> to that community's /go/<channel>.
+Separate files mean separate SQLite locks, so an import in one community never
+blocks another.
+"""
+import os
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from flask import abort, g, request
+
+import models
+
+SLUG_RE = re.compile(r"^[a-z0-9][a-z0-9-]{0,39}$")
+DEFAULT_NAME = os.environ.get("COMMUNITY_NAME", "Communauté principale")
+ROLLUP_WORKERS = 8
+# Unknown slugs reload the registry at most this often, so /go/<junk>/... stays cheap
+MISS_RELOAD_SECONDS = 5
+
+_PREFIX_RE = re.compile(r"^/c/([^/]+)(/.*)?$")
+_GO_RE = re.compile(r"^/go/([^/]+)/([^/]+)$")
+
+
+class CommunityMiddleware:
+    """Moves /c/<slug> into SCRIPT_NAME and tags the request with the community slug."""
+
+    def __init__(self, wsgi_app):
+        self.wsgi_app = wsgi_app
+
+    def __call__(self, environ, start_response):
+        path = environ.get("PATH_INFO", "")
+        m = _PREFIX_RE.match(path)
+        if m:
+            slug, rest = m.group(1), m.group(2) or "/"
+        else:
+            m = _GO_RE.match(path)
+            if not m:
+                return self.wsgi_app(environ, start_response)
+            slug, rest = m.group(1), f"/go/{m.group(2)}"
+        environ["tracker.community"] = slug
+        environ["SCRIPT_NAME"] = environ.get("SCRIPT_NAME", "") + f"/c/{slug}"
+        environ["PATH_INFO"] = rest
+        return self.wsgi_app(environ, start_response)
+
+
+def shard_path(slug):
+    return os.path.join(os.path.dirname(models.DB_PATH), "communities", f"{slug}.db")
+
+
+def default_community():
+    return {"slug": "", "name": DEFAULT_NAME, "skool_url": "", "db_path": models.DB_PATH, "base": ""}
+
+
+def _community(row):
+    return {"slug": row["slug"], "name": row["name"], "skool_url": row["skool_url"] or "",
+            "db_path": shard_path(row["slug"]), "base": f"/c/{row['slug']}"}
+
+
+# Registry cache: reloaded from the main DB when an unknown slug shows up (at most
+# every MISS_RELOAD_SECONDS), which is also when a community created by another
+# process gets its shard migrated here.
+_registry = {}
+_registry_lock = threading.Lock()
+_reloaded_at = float("-inf")
+
+
+def _reload(db):
+    global _reloaded_at
+    _reloaded_at = time.monotonic()
+    rows = db.execute("SELECT slug, name, skool_url FROM communities ORDER BY name").fetchall()
+    with _registry_lock:
+        fresh = [_community(r) for r in rows if r["slug"] not in _registry]
+        for c in fresh:
+            models.init_shard(c["db_path"])
+        _registry.clear()
+        _registry.update((r["slug"], _community(r)) for r in rows)
+
+
+def lookup(slug):
+    if slug not in _registry and SLUG_RE.match(slug) and time.monotonic() - _reloaded_at >= MISS_RELOAD_SECONDS:
+        # Own connection: g.db must not be opened before the request's shard is known
+        db = models.connect(models.DB_PATH)
+        try:
+            _reload(db)
+        finally:
+            db.close()
+    return _registry.get(slug)
+
+
+def all_communities():
+    with _registry_lock:
+        others = sorted(_registry.values(), key=lambda c: c["name"].casefold())
+    return [default_community()] + others
+
+
+def database_paths():
+    return [c["db_path"] for c in all_communities()]
+
+
+def create(db, slug, name, skool_url, now):
+    """Register a community and create its shard. Returns an error message or None."""
+    if not SLUG_RE.match(slug):
+        return "Identifiant invalide (minuscules, chiffres et tirets)"
+    # "tracker" is the main database's label for backups and metrics (maintenance.label)
+    if slug in ("c", "go", "static", "api", "tracker"):
+        return "Identifiant réservé"
+    if db.execute("SELECT 1 FROM communities WHERE slug = ?", (slug,)).fetchone():
+        return f"La communauté {slug} existe déjà"
+    db.execute("INSERT INTO communities (slug, name, skool_url, created_at) VALUES (?, ?, ?, ?)",
+               (slug, name or slug, skool_url, now))
+    db.commit()
+    _reload(db)
+    return None
+
+
+# ---------- cross-community rollup ----------
+
+def headline(path, now):
+    """Headline metrics of one shard, read on its own connection (called from worker threads)."""
+    month = now.strftime("%Y-%m")
+    since = (now - timedelta(days=29)).strftime("%Y-%m-%d")
+    db = sqlite3.connect(path, timeout=5)
+    db.row_factory = sqlite3.Row
+    try:
+        m = db.execute("""
+            SELECT SUM(status = 'active') AS active,
+                   SUM(joined_at LIKE ?) AS new_this_month,
+                   SUM(CASE WHEN status = 'active' AND price > 0 AND ltv > 0 AND recurring_interval = 'month' THEN price
+                            WHEN status = 'active' AND price > 0 AND ltv > 0 AND recurring_interval = 'year' THEN price / 12.0
+                            ELSE 0 END) AS mrr,
+                   SUM(ltv) AS total_ltv
+            FROM members
+        """, (month + "%",)).fetchone()
+        clicks = db.execute("SELECT SUM(clicks) AS c FROM click_daily WHERE day >= ?", (since,)).fetchone()["c"]
+        last_import = db.execute("SELECT MAX(uploaded_at) AS u FROM upload_history").fetchone()["u"]
+    finally:
+        db.close()
+    return {
+        "active_members": m["active"] or 0,
+        "new_this_month": m["new_this_month"] or 0,
+        "mrr": round(m["mrr"] or 0, 2),
+        "total_ltv": round(m["total_ltv"] or 0, 2),
+        "clicks_30d": clicks or 0,
+        "last_import": last_import,
+    }
+
+
+def rollup(communities, now):
+    """Headline metrics for every community, one shard per worker thread, plus totals."""
+    def one(c):
+        try:
+            return {**headline(c["db_path"], now), "slug": c["slug"], "name": c["name"], "base": c["base"]}
+        except sqlite3.Error as e:
+            print(f"[ROLLUP] {c['slug'] or 'main'}: {e}")
+            return {"slug": c["slug"], "name": c["name"], "base": c["base"], "error": str(e)}
+
+    with ThreadPoolExecutor(max_workers=min(ROLLUP_WORKERS, len(communities))) as pool:
+        rows = list(pool.map(one, communities))
+    totals = {k: 0 for k in ("active_members", "new_this_month", "mrr", "total_ltv", "clicks_30d")}
+    for r in rows:
+        if "error" not in r:
+            for k in totals:
+                totals[k] += r[k]
+    totals["mrr"] = round(totals["mrr"], 2)
+    totals["total_ltv"] = round(totals["total_ltv"], 2)
+    return {"communities": rows, "totals": totals, "generated_at": now.strftime("%Y-%m-%d %H:%M:%S")}
+
+
+def init_app(app):
+    app.wsgi_app = CommunityMiddleware(app.wsgi_app)
+    with app.app_context():
+        _reload(models.get_main_db())
+        models.close_db()
+
+    @app.before_request
+    def _select_community():
+        slug = request.environ.get("tracker.community")
+        if slug is None:
+            g.community = default_community()
+            return
+        community = lookup(slug)
+        if community is None:
+            abort(404)
+        g.community = community
+        g.db_path = community["db_path"]
+
+    @app.context_processor
+    def _community_context():
+        return {"base": request.script_root, "community": g.get("community") or default_community(),
+                "communities": all_communities()}
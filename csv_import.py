@@ -0,0 +1,212 @@
+"""Skool export parsing: record-aligned chunks normalized in a process pool.
+
+parse() cuts the upload into chunks that end on a record boundary (a newline
+outside quotes), and each chunk is parsed and normalized on its own: fields
+stripped, prices and LTV turned into floats, join dates into "YYYY-MM-DD
+HH:MM:SS", emails lowercased and deduplicated. Chunks come back as compact
+columns (array('d') for amounts) and are concatenated in file order, so the
+import itself stays a single writer walking plain columns.
+
+Uploads under PARALLEL_MIN_BYTES are parsed in-process, a pool only pays off
+past that. Rows that fail validation are returned as errors with their line
+number and left out of the columns; their email is kept in `rejected_emails`
+so the import leaves those members alone instead of counting them as churned.
+"""
+import csv
+import io
+import os
+import threading
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from multiprocessing import get_context
+
+PARALLEL_MIN_BYTES = 2 * 1024 * 1024
+CHUNK_BYTES = 1024 * 1024
+WORKERS = int(os.environ.get("IMPORT_WORKERS", 0)) or os.cpu_count() or 1
+
+# CSV header -> column
+FIELDS = {
+    "FirstName": "first_name", "LastName": "last_name", "Email": "email", "Invited By": "invited_by",
+    "JoinedDate": "joined_at", "Price": "price", "Recurring Interval": "recurring_interval",
+    "Tier": "tier", "LTV": "ltv",
+}
+TEXT_COLUMNS = ("first_name", "last_name", "email", "invited_by", "joined_at", "recurring_interval", "tier")
+NUMERIC_COLUMNS = ("price", "ltv")
+COLUMNS = TEXT_COLUMNS + NUMERIC_COLUMNS
+DUPLICATE = "Email en double, ligne ignorée"
+
+
+class Export:
+    """Parsed export: one list (array('d') for amounts) per column, in file order."""
+
+    def __init__(self):
+        for name in TEXT_COLUMNS:
+            setattr(self, name, [])
+        for name in NUMERIC_COLUMNS:
+            setattr(self, name, array("d"))
+        self.line = array("l")
+        self.errors = []
+        self.rejected_emails = set()
+
+    def __len__(self):
+        return len(self.line)
+
+    def extend(self, other):
+        for name in COLUMNS + ("line",):
+            getattr(self, name).extend(getattr(other, name))
+        self.errors.extend(other.errors)
+        self.rejected_emails |= other.rejected_emails
+
+
+def _amount(value):
+    value = value.replace("$", "").replace(",", "").strip()
+    return float(value) if value else 0.0
+
+
+def _date(value):
+    # Skool writes "YYYY-MM-DD HH:MM:SS": keep it as is, convert anything else ISO-like
+    if len(value) == 19 and value[4] == "-" and value[10] == " ":
+        return value
+    if not value:
+        return ""
+    return datetime.fromisoformat(value).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def parse_chunk(header, delimiter, text, first_line):
+    """Parse and normalize one record-aligned chunk. Runs in pool workers."""
+    export = Export()
+    index = {FIELDS[name]: i for i, name in enumerate(header) if name in FIELDS}
+    # Missing columns point one past the header, at the padding of every row
+    width = len(header) + 1
+    positions = [index.get(name, len(header)) for name in COLUMNS]
+    first_names, last_names, emails, invited, joined, intervals, tiers, prices, ltvs = (
+        getattr(export, name) for name in COLUMNS
+    )
+    lines = export.line
+    seen = set()
+    reader = csv.reader(io.StringIO(text), delimiter=delimiter)
+    consumed = 0
+    for row in reader:
+        # Line a record starts on (quoted fields may span several)
+        line, consumed = first_line + consumed, reader.line_num
+        if not row or (len(row) == 1 and not row[0].strip()):
+            continue
+        if len(row) < width:
+            row += [""] * (width - len(row))
+        first_name, last_name, email, invited_by, joined_at, interval, tier, price, ltv = [
+            row[i].strip() for i in positions
+        ]
+        email = email.lower()
+        try:
+            price, ltv = _amount(price), _amount(ltv)
+        except ValueError:
+            _reject(export, line, email, f"Montant invalide : {price!r} / {ltv!r}")
+            continue
+        try:
+            joined_at = _date(joined_at)
+        except ValueError:
+            _reject(export, line, email, f"Date d'inscription invalide : {joined_at!r}")
+            continue
+        if email:
+            if email in seen:
+                export.errors.append({"line": line, "email": email, "error": DUPLICATE})
+                continue
+            seen.add(email)
+        first_names.append(first_name)
+        last_names.append(last_name)
+        emails.append(email)
+        invited.append(invited_by)
+        joined.append(joined_at)
+        intervals.append(interval)
+        tiers.append(tier)
+        prices.append(price)
+        ltvs.append(ltv)
+        lines.append(line)
+    return export
+
+
+def _reject(export, line, email, message):
+    export.errors.append({"line": line, "email": email, "error": message})
+    if email:
+        export.rejected_emails.add(email)
+
+
+def split_records(text, size):
+    """Cut text into pieces of about `size` characters, each ending after a newline outside quotes."""
+    pieces = []
+    start = 0
+    while start < len(text):
+        end = text.find("\n", start + size)
+        # An odd number of quotes before the newline means it sits inside a quoted field
+        while end != -1 and text.count('"', start, end) % 2:
+            end = text.find("\n", end + 1)
+        end = len(text) if end == -1 else end + 1
+        pieces.append((start, text[start:end]))
+        start = end
+    return pieces
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # Not fork: the web process runs threads (live feed, replica, maintenance). Workers
+            # are forked from a server that has only this module loaded.
+            context = get_context("forkserver")
+            context.set_forkserver_preload(["csv_import"])
+            _pool = ProcessPoolExecutor(max_workers=WORKERS, mp_context=context)
+        return _pool
+
+
+def parse(content, workers=None):
+    """Parse a Skool export (CSV text) into an Export; workers=1 parses in-process."""
+    first_newline = content.find("\n")
+    header_text = content if first_newline == -1 else content[:first_newline]
+    delimiter = ";" if ";" in header_text else ","
+    header = [h.strip() for h in next(csv.reader([header_text], delimiter=delimiter), [])]
+    body_start = len(content) if first_newline == -1 else first_newline + 1
+    body = content[body_start:]
+
+    workers = WORKERS if workers is None else workers
+    export = Export()
+    if workers <= 1 or len(body) < PARALLEL_MIN_BYTES:
+        export.extend(parse_chunk(header, delimiter, body, 2))
+        return export
+
+    pieces = split_records(body, max(CHUNK_BYTES, len(body) // (workers * 4)))
+    # Line number of each chunk's first record: 2 + newlines before it
+    first_lines, line = [], 2
+    for _, piece in pieces:
+        first_lines.append(line)
+        line += piece.count("\n")
+    futures = [_get_pool().submit(parse_chunk, header, delimiter, piece, first)
+               for (_, piece), first in zip(pieces, first_lines)]
+    seen = set()
+    for future in futures:
+        chunk = future.result()
+        # Duplicates within a chunk are dropped by the worker, across chunks here
+        duplicates = [i for i, email in enumerate(chunk.email) if email and email in seen]
+        seen.update(e for e in chunk.email if e)
+        if duplicates:
+            chunk = _drop(chunk, duplicates)
+        export.extend(chunk)
+    return export
+
+
+def _drop(chunk, indexes):
+    kept = Export()
+    skip = set(indexes)
+    for i in range(len(chunk)):
+        if i in skip:
+            kept.errors.append({"line": chunk.line[i], "email": chunk.email[i], "error": DUPLICATE})
+            continue
+        for name in COLUMNS + ("line",):
+            getattr(kept, name).append(getattr(chunk, name)[i])
+    kept.errors = sorted(chunk.errors + kept.errors, key=lambda e: e["line"])
+    kept.rejected_emails = chunk.rejected_emails
+    return kept
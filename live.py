@@ -0,0 +1,186 @@
+"""Live feed: click deltas and import progress pushed to browsers over Server-Sent Events.
+
+One Hub per database and process: a single poller thread reads new click ids once
+per interval and fans the per-channel/per-platform deltas out to every connected
+viewer, so the DB load does not grow with the audience. Import progress is published
+in-process by the import itself (run gunicorn with one threaded worker so viewers
+and imports share the hub). Each viewer holds a worker thread for as long as its tab
+is open, so the number of viewers per process is capped below the thread count.
+"""
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+import metrics
+
+POLL_INTERVAL = 1.0
+KEEPALIVE = 15.0
+QUEUE_SIZE = 256
+MAX_ID = 2 ** 63 - 1
+# Viewers per process, all hubs together; keep it well under gunicorn's --threads
+MAX_SUBSCRIBERS = int(os.environ.get("LIVE_MAX_SUBSCRIBERS", 8))
+# Delay before a refused viewer tries again (ms)
+FULL_RETRY = 30000
+
+
+class Hub:
+    def __init__(self, db_path, interval=POLL_INTERVAL):
+        self.db_path = db_path
+        self.interval = interval
+        self.subscribers = set()
+        self.lock = threading.Lock()
+        self.thread = None
+        self.last_id = None
+        self.seq = 0
+
+    def subscribe(self):
+        """Queue of a new viewer, None when the process already serves MAX_SUBSCRIBERS."""
+        q = queue.Queue(maxsize=QUEUE_SIZE)
+        with _hubs_lock, self.lock:
+            if _subscriber_count() >= MAX_SUBSCRIBERS:
+                return None
+            self.subscribers.add(q)
+            _update_gauge()
+            if self.thread is None:
+                self.last_id = None  # restart from the current tail, viewers resync from their snapshot
+                self.thread = threading.Thread(target=self._run, name="live-hub", daemon=True)
+                self.thread.start()
+        return q
+
+    def unsubscribe(self, q):
+        with self.lock:
+            self.subscribers.discard(q)
+            _update_gauge()
+
+    def publish(self, event, data):
+        """Queue an event for every viewer; a viewer that fell behind is told to reload instead."""
+        with self.lock:
+            self.seq += 1
+            message = (self.seq, event, json.dumps(data))
+            subscribers = list(self.subscribers)
+        for q in subscribers:
+            try:
+                q.put_nowait(message)
+            except queue.Full:
+                with q.mutex:
+                    q.queue.clear()
+                q.put_nowait((message[0], "resync", "{}"))
+
+    def stream(self, q):
+        """SSE body for one viewer."""
+        try:
+            yield f"retry: 3000\nevent: hello\ndata: {json.dumps({'last_id': self.last_id})}\n\n"
+            while True:
+                try:
+                    seq, event, data = q.get(timeout=KEEPALIVE)
+                except queue.Empty:
+                    yield ": ping\n\n"
+                    continue
+                yield f"id: {seq}\nevent: {event}\ndata: {data}\n\n"
+        finally:
+            self.unsubscribe(q)
+
+    # ---------- click poller ----------
+
+    def _run(self):
+        db = sqlite3.connect(self.db_path, check_same_thread=False)
+        db.row_factory = sqlite3.Row
+        try:
+            while True:
+                with self.lock:
+                    if not self.subscribers:
+                        self.thread = None
+                        return
+                try:
+                    self._poll(db)
+                except sqlite3.Error as e:
+                    print(f"[LIVE] poll failed: {e}")
+                time.sleep(self.interval)
+        finally:
+            db.close()
+
+    def _poll(self, db):
+        if self.last_id is None:
+            self.last_id = db.execute("SELECT COALESCE(MAX(id), 0) AS m FROM clicks").fetchone()["m"]
+            return
+        delta = click_delta(db, self.last_id)
+        if delta:
+            self.last_id = delta["last_id"]
+            self.publish("clicks", delta)
+
+    def position(self):
+        """Last click id published, None while the poller is not running."""
+        with self.lock:
+            return self.last_id if self.thread is not None else None
+
+
+def click_delta(db, after_id, until_id=None):
+    """Per-day channel/platform counts of the clicks in (after_id, until_id], None when there are none.
+
+    from_id/last_id let a viewer check the delta starts where its snapshot ended.
+    """
+    rows = db.execute(
+        "SELECT id, channel, clicked_at, is_bot FROM clicks WHERE id > ? AND id <= ? ORDER BY id",
+        (after_id, until_id if until_id is not None else MAX_ID)
+    ).fetchall()
+    if not rows:
+        return None
+    platforms = {
+        r["channel"]: r["platform"] or r["channel"]
+        for r in db.execute("SELECT channel, platform FROM tracking_links").fetchall()
+    }
+    by_day = {}
+    bots = 0
+    for r in rows:
+        if r["is_bot"]:
+            bots += 1
+            continue
+        day = by_day.setdefault(r["clicked_at"][:10], {"by_channel": {}, "by_platform": {}})
+        ch = r["channel"]
+        p = platforms.get(ch, ch)
+        day["by_channel"][ch] = day["by_channel"].get(ch, 0) + 1
+        day["by_platform"][p] = day["by_platform"].get(p, 0) + 1
+    return {"from_id": after_id, "last_id": rows[-1]["id"], "by_day": by_day, "bot_clicks": bots}
+
+
+_hubs = {}
+_hubs_lock = threading.Lock()
+
+
+def _subscriber_count():
+    return sum(len(h.subscribers) for h in list(_hubs.values()))
+
+
+def _update_gauge():
+    # One hub per community database; the gauge counts viewers across all of them
+    metrics.set_gauge("tracker_live_subscribers", _subscriber_count())
+
+
+def get_hub(db_path):
+    with _hubs_lock:
+        hub = _hubs.get(db_path)
+        if hub is None:
+            hub = _hubs[db_path] = Hub(db_path)
+        return hub
+
+
+class ImportProgress:
+    """Publishes start / row progress / done events for one CSV import."""
+
+    def __init__(self, hub, job, total, steps=20):
+        self.hub = hub
+        self.job = job
+        self.total = total
+        self.every = max(total // steps, 500)
+        hub.publish("import", {"job": job, "phase": "start", "done": 0, "total": total})
+
+    def row(self, done):
+        if done % self.every == 0:
+            self.hub.publish("import", {"job": self.job, "phase": "rows", "done": done, "total": self.total})
+
+    def finish(self, stats):
+        self.hub.publish("import", {"job": self.job, "phase": "done", "done": self.total, "total": self.total,
+                                    "stats": stats})
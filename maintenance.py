@@ -0,0 +1,209 @@
+"""Database upkeep: WAL checkpoints by size, planner statistics and online backups.
+
+A background thread looks at every database each MAINTENANCE_INTERVAL seconds:
+
+- WAL file over CHECKPOINT_PASSIVE_BYTES: PASSIVE checkpoint (copies what it can,
+  never waits); over CHECKPOINT_TRUNCATE_BYTES: TRUNCATE checkpoint, which waits
+  up to CHECKPOINT_TIMEOUT for readers and shrinks the -wal file back to zero;
+- PRAGMA optimize once per OPTIMIZE_INTERVAL (and ANALYZE right after imports);
+- a backup per BACKUP_INTERVAL when the database changed since the last one,
+  keeping the BACKUP_KEEP newest.
+
+Backups go through SQLite's online backup API BACKUP_STEP_PAGES pages at a
+time, releasing the database between steps, so clicks keep being written
+while a backup runs. Timings, WAL sizes and backup sizes are exported on
+/metrics. The same tasks can be run by hand:
+
+    flask --app app maintenance checkpoint|optimize|backup
+"""
+import glob
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+import click
+
+import metrics
+from replica import checkpointing, source_version, stepped_backup
+
+MAINTENANCE_INTERVAL = int(os.environ.get("MAINTENANCE_INTERVAL", 30))
+CHECKPOINT_PASSIVE_BYTES = 4 * 1024 * 1024
+CHECKPOINT_TRUNCATE_BYTES = int(os.environ.get("WAL_TRUNCATE_MB", 64)) * 1024 * 1024
+CHECKPOINT_TIMEOUT = 2.0
+OPTIMIZE_INTERVAL = 3600
+ANALYSIS_LIMIT = 1000
+BACKUP_INTERVAL = int(os.environ.get("BACKUP_INTERVAL_HOURS", 6)) * 3600
+BACKUP_KEEP = int(os.environ.get("BACKUP_KEEP", 7))
+BACKUP_STEP_PAGES = 1024
+BACKUP_STEP_SLEEP = 0.01
+
+
+def label(db_path):
+    """Metrics label of a database: the community slug, "tracker" for the main one."""
+    return os.path.splitext(os.path.basename(db_path))[0]
+
+
+def backup_dir(db_path):
+    return os.environ.get("BACKUP_DIR") or os.path.join(os.path.dirname(db_path), "backups")
+
+
+def wal_bytes(db_path):
+    try:
+        return os.path.getsize(db_path + "-wal")
+    except FileNotFoundError:
+        return 0
+
+
+# ---------- checkpoints ----------
+
+def checkpoint(db_path, mode=None):
+    """Checkpoint the WAL; mode None picks PASSIVE or TRUNCATE from its size. Returns the mode run or None."""
+    size = wal_bytes(db_path)
+    metrics.set_gauge("tracker_wal_bytes", size, db=label(db_path))
+    if mode is None:
+        if size >= CHECKPOINT_TRUNCATE_BYTES:
+            mode = "TRUNCATE"
+        elif size >= CHECKPOINT_PASSIVE_BYTES:
+            mode = "PASSIVE"
+        else:
+            return None
+    db = sqlite3.connect(db_path, timeout=CHECKPOINT_TIMEOUT)
+    try:
+        with checkpointing(db_path), metrics.timer("tracker_wal_checkpoint_seconds", mode=mode.lower()):
+            busy, frames, copied = db.execute(f"PRAGMA wal_checkpoint({mode})").fetchone()
+    finally:
+        db.close()
+    result = "busy" if busy else "ok"
+    metrics.inc("tracker_wal_checkpoints_total", mode=mode.lower(), result=result)
+    metrics.set_gauge("tracker_wal_bytes", wal_bytes(db_path), db=label(db_path))
+    print(f"[MAINTENANCE] {label(db_path)} checkpoint {mode}: {result}, {copied}/{frames} frames, "
+          f"WAL {size // 1024} KB -> {wal_bytes(db_path) // 1024} KB")
+    return mode
+
+
+# ---------- planner statistics ----------
+
+def optimize(db, trigger="periodic"):
+    """ANALYZE (bounded sampling) after imports, PRAGMA optimize otherwise."""
+    with metrics.timer("tracker_db_optimize_seconds", trigger=trigger):
+        db.execute(f"PRAGMA analysis_limit={ANALYSIS_LIMIT}")
+        if trigger == "import":
+            db.execute("ANALYZE")
+        db.execute("PRAGMA optimize")
+        db.commit()
+
+
+# ---------- backups ----------
+
+def backups(db_path):
+    """Backup files of a database, newest first."""
+    # Slugs never contain dots, so "tracker.*" cannot match a community called tracker-something
+    pattern = os.path.join(backup_dir(db_path), f"{label(db_path)}.*.db")
+    return sorted(glob.glob(pattern), reverse=True)
+
+
+def backup(db_path, force=False):
+    """Online backup to backups/<label>.<timestamp>.db. Returns its path, or None when nothing changed."""
+    existing = backups(db_path)
+    version = source_version(db_path)
+    state_path = os.path.join(backup_dir(db_path), f".{label(db_path)}.version")
+    if not force and existing:
+        try:
+            with open(state_path) as f:
+                if f.read() == version:
+                    return None
+        except OSError:
+            pass
+
+    os.makedirs(backup_dir(db_path), exist_ok=True)
+    target = os.path.join(backup_dir(db_path), f"{label(db_path)}.{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}.db")
+    tmp = target + ".tmp"
+
+    source = sqlite3.connect(db_path)
+    try:
+        with metrics.timer("tracker_backup_seconds", db=label(db_path)):
+            copy = sqlite3.connect(tmp)
+            try:
+                restarts = stepped_backup(source, copy, BACKUP_STEP_PAGES, BACKUP_STEP_SLEEP)
+                copy.execute("PRAGMA journal_mode=DELETE")
+            finally:
+                copy.close()
+            os.replace(tmp, target)
+    finally:
+        source.close()
+    with open(state_path, "w") as f:
+        f.write(version)
+
+    for old in backups(db_path)[BACKUP_KEEP:]:
+        os.remove(old)
+    size = os.path.getsize(target)
+    metrics.set_gauge("tracker_backup_bytes", size, db=label(db_path))
+    metrics.set_gauge("tracker_backup_timestamp_seconds", time.time(), db=label(db_path))
+    print(f"[MAINTENANCE] {label(db_path)} backup -> {os.path.basename(target)} ({size // 1024} KB, "
+          f"{restarts} restarts)")
+    return target
+
+
+# ---------- scheduler ----------
+
+_last_optimize = {}
+
+
+def run(db_path, now):
+    checkpoint(db_path)
+    if now - _last_optimize.get(db_path, now - OPTIMIZE_INTERVAL) >= OPTIMIZE_INTERVAL:
+        db = sqlite3.connect(db_path, timeout=CHECKPOINT_TIMEOUT)
+        try:
+            optimize(db)
+        finally:
+            db.close()
+        _last_optimize[db_path] = now
+    existing = backups(db_path)
+    if not existing or time.time() - os.path.getmtime(existing[0]) >= BACKUP_INTERVAL:
+        backup(db_path)
+
+
+def _run(app, databases):
+    while True:
+        time.sleep(MAINTENANCE_INTERVAL)
+        with app.app_context():
+            for db_path in databases():
+                if not os.path.exists(db_path):
+                    continue
+                try:
+                    run(db_path, time.monotonic())
+                except (sqlite3.Error, OSError) as e:
+                    print(f"[MAINTENANCE] {label(db_path)} failed: {e}")
+
+
+def init_app(app, databases):
+    """databases: callable returning the paths of the live databases to look after."""
+    if app.config.get("MAINTENANCE"):
+        threading.Thread(target=_run, args=(app, databases), name="maintenance", daemon=True).start()
+
+    @app.cli.group("maintenance")
+    def maintenance_cli():
+        """WAL checkpoints, planner statistics and backups."""
+
+    @maintenance_cli.command("checkpoint")
+    @click.option("--mode", type=click.Choice(["PASSIVE", "TRUNCATE"]), default="TRUNCATE")
+    def checkpoint_command(mode):
+        for db_path in databases():
+            checkpoint(db_path, mode)
+
+    @maintenance_cli.command("optimize")
+    def optimize_command():
+        for db_path in databases():
+            db = sqlite3.connect(db_path)
+            try:
+                optimize(db, "import")
+            finally:
+                db.close()
+            print(f"[MAINTENANCE] {label(db_path)} analyzed")
+
+    @maintenance_cli.command("backup")
+    def backup_command():
+        for db_path in databases():
+            backup(db_path, force=True)
@@ -0,0 +1,103 @@
+"""Append-only member history: one row per changed field per upload batch."""
+
+# Field codes are stored as small integers to keep the table compact.
+# Only append to this tuple — existing positions are persisted in the DB.
+VERSIONED_FIELDS = (
+    "first_name", "last_name", "invited_by", "joined_at", "price",
+    "recurring_interval", "tier", "ltv", "status", "churned_at",
+)
+FIELD_IDS = {name: i for i, name in enumerate(VERSIONED_FIELDS)}
+
+
+def record_changes(db, member_id, batch, old, new):
+    """Append a version for every field of `new` that differs from `old` (None = new member)."""
+    rows = [
+        (member_id, batch, FIELD_IDS[field], value)
+        for field, value in new.items()
+        if old is None or old[field] != value
+    ]
+    if rows:
+        db.executemany(
+            "INSERT OR REPLACE INTO member_versions (member_id, upload_batch, field, value) VALUES (?, ?, ?, ?)",
+            rows
+        )
+    return len(rows)
+
+
+def backfill_versions(db):
+    """Seed history for databases created before versioning, from current member rows."""
+    columns = ", ".join(VERSIONED_FIELDS)
+    members = db.execute(f"""
+        SELECT id, upload_batch, {columns} FROM members
+        WHERE email NOT LIKE '__no_email_%'
+    """).fetchall()
+    for m in members:
+        record_changes(db, m["id"], m["upload_batch"] or "", None, {f: m[f] for f in VERSIONED_FIELDS})
+    return len(members)
+
+
+def members_as_of(db, batch):
+    """Rebuild every member's state as it was right after `batch` was imported.
+
+    SQLite returns the bare `value` column from the row holding MAX(upload_batch),
+    so each (member, field) pair resolves to its latest version at or before `batch`
+    with a single ordered scan of the primary key.
+    """
+    state = {}
+    rows = db.execute("""
+        SELECT member_id, field, value, MAX(upload_batch) AS batch
+        FROM member_versions WHERE upload_batch <= ?
+        GROUP BY member_id, field
+    """, (batch,)).fetchall()
+    for r in rows:
+        member = state.setdefault(r["member_id"], dict.fromkeys(VERSIONED_FIELDS))
+        member[VERSIONED_FIELDS[r["field"]]] = r["value"]
+    return state
+
+
+def is_paid(member):
+    return (member["price"] or 0) > 0 and (member["ltv"] or 0) > 0
+
+
+def monthly_value(member):
+    """Monthly recurring value of a member, with the same rules as the live MRR."""
+    if member["status"] != "active" or not is_paid(member):
+        return 0
+    if member["recurring_interval"] == "month":
+        return member["price"]
+    if member["recurring_interval"] == "year":
+        return member["price"] / 12
+    return 0
+
+
+def summary_as_of(db, batch):
+    """Headline metrics and MRR by tier as of an upload batch."""
+    members = members_as_of(db, batch)
+    active = paid = 0
+    mrr = 0
+    by_tier = {}
+    for m in members.values():
+        if m["status"] != "active":
+            continue
+        active += 1
+        value = monthly_value(m)
+        tier = by_tier.setdefault(m["tier"] or "", {"members": 0, "paid": 0, "mrr": 0})
+        tier["members"] += 1
+        if is_paid(m):
+            paid += 1
+            tier["paid"] += 1
+        tier["mrr"] += value
+        mrr += value
+
+    return {
+        "batch": batch,
+        "total_members": len(members),
+        "active_members": active,
+        "paid_members": paid,
+        "free_members": active - paid,
+        "mrr": round(mrr, 2),
+        "by_tier": [
+            {"tier": t, "members": v["members"], "paid": v["paid"], "mrr": round(v["mrr"], 2)}
+            for t, v in sorted(by_tier.items(), key=lambda x: -x[1]["mrr"])
+        ],
+    }
@@ -0,0 +1,246 @@
+"""Prometheus-style metrics for the tracker's hot paths.
+
+Each thread records into its own dicts (no locks on the hot path). Every process
+periodically dumps its merged values to METRICS_DIR/<pid>.json, and /metrics sums
+the files of all gunicorn workers into the text exposition format. Files of processes
+that are gone are dropped, so a recycled worker's gauges do not linger.
+"""
+import atexit
+import bisect
+import json
+import os
+import tempfile
+import threading
+import time
+
+from flask import g, request
+
+METRICS_DIR = os.environ.get("METRICS_DIR") or os.path.join(tempfile.gettempdir(), "skool-tracker-metrics")
+FLUSH_INTERVAL = 1.0
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+IMPORT_BUCKETS = (0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+# name -> (type, help, buckets)
+METRICS = {
+    "tracker_redirect_seconds": ("histogram", "Latency of /go/<channel> redirects.", LATENCY_BUCKETS),
+    "tracker_clicks_total": ("counter", "Clicks recorded, by channel (unknown ones as \"other\") and bot classification.", None),
+    "tracker_import_seconds": ("histogram", "Duration of Skool CSV imports.", IMPORT_BUCKETS),
+    "tracker_import_parse_seconds": ("histogram", "Time to parse and normalize a Skool CSV upload.", IMPORT_BUCKETS),
+    "tracker_import_rows_total": ("counter", "Rows processed by CSV imports, by outcome.", None),
+    "tracker_http_request_seconds": ("histogram", "Latency of HTTP requests, by route.", LATENCY_BUCKETS),
+    "tracker_db_connect_seconds": ("histogram", "Time to open a SQLite connection.", LATENCY_BUCKETS),
+    "tracker_db_write_seconds": ("histogram", "Time spent in write transactions, lock waits included.", LATENCY_BUCKETS),
+    "tracker_live_subscribers": ("gauge", "Browsers connected to the live feed.", None),
+    "tracker_replica_refresh_seconds": ("histogram", "Time to copy a database to its analytics replica.", IMPORT_BUCKETS),
+    "tracker_wal_bytes": ("gauge", "Size of the -wal file, by database.", None),
+    "tracker_wal_checkpoint_seconds": ("histogram", "Duration of WAL checkpoints, by mode.", LATENCY_BUCKETS),
+    "tracker_wal_checkpoints_total": ("counter", "WAL checkpoints run, by mode and result (ok/busy).", None),
+    "tracker_db_optimize_seconds": ("histogram", "Duration of ANALYZE / PRAGMA optimize, by trigger.", IMPORT_BUCKETS),
+    "tracker_backup_seconds": ("histogram", "Duration of online backups, by database.", IMPORT_BUCKETS),
+    "tracker_backup_bytes": ("gauge", "Size of the latest backup, by database.", None),
+    "tracker_backup_timestamp_seconds": ("gauge", "Unix time of the latest backup, by database.", None),
+}
+
+_local = threading.local()
+_shards = []
+_shards_lock = threading.Lock()
+_last_flush = 0.0
+
+
+def _shard():
+    shard = getattr(_local, "shard", None)
+    if shard is None:
+        shard = _local.shard = ({}, {}, {})  # counters, histograms, gauges
+        with _shards_lock:
+            _shards.append(shard)
+    return shard
+
+
+def _key(name, labels):
+    return (name, tuple(sorted(labels.items()))) if labels else (name, ())
+
+
+def inc(name, value=1, **labels):
+    counters = _shard()[0]
+    key = _key(name, labels)
+    counters[key] = counters.get(key, 0) + value
+    _maybe_flush()
+
+
+def observe(name, seconds, **labels):
+    histograms = _shard()[1]
+    key = _key(name, labels)
+    hist = histograms.get(key)
+    if hist is None:
+        hist = histograms[key] = [0] * (len(METRICS[name][2]) + 1) + [0.0]  # buckets, +Inf, sum
+    hist[bisect.bisect_left(METRICS[name][2], seconds)] += 1
+    hist[-1] += seconds
+    _maybe_flush()
+
+
+def set_gauge(name, value, **labels):
+    _shard()[2][_key(name, labels)] = value
+    _maybe_flush()
+
+
+class timer:
+    """Context manager observing the elapsed time of its block into a histogram."""
+
+    def __init__(self, name, **labels):
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        observe(self.name, time.perf_counter() - self.start, **self.labels)
+
+
+def _merged():
+    counters, histograms, gauges = {}, {}, {}
+    with _shards_lock:
+        shards = list(_shards)
+    for c, h, gs in shards:
+        for key, value in dict(c).items():
+            counters[key] = counters.get(key, 0) + value
+        for key, hist in dict(h).items():
+            acc = histograms.setdefault(key, [0] * len(hist))
+            for i, v in enumerate(list(hist)):
+                acc[i] += v
+        gauges.update(dict(gs))
+    return counters, histograms, gauges
+
+
+def _maybe_flush():
+    if time.monotonic() - _last_flush >= FLUSH_INTERVAL:
+        flush()
+
+
+def flush():
+    """Write this process's values to its file in METRICS_DIR (atomic replace)."""
+    global _last_flush
+    _last_flush = time.monotonic()
+    counters, histograms, gauges = _merged()
+    data = {
+        "counters": [[n, dict(l), v] for (n, l), v in counters.items()],
+        "histograms": [[n, dict(l), v] for (n, l), v in histograms.items()],
+        "gauges": [[n, dict(l), v] for (n, l), v in gauges.items()],
+    }
+    try:
+        os.makedirs(METRICS_DIR, exist_ok=True)
+        path = os.path.join(METRICS_DIR, f"{os.getpid()}.json")
+        fd, tmp = tempfile.mkstemp(dir=METRICS_DIR, suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp, path)
+    except OSError as e:
+        print(f"[METRICS] flush failed: {e}")
+
+
+def _remove_own_file():
+    try:
+        os.remove(os.path.join(METRICS_DIR, f"{os.getpid()}.json"))
+    except OSError:
+        pass
+
+
+atexit.register(_remove_own_file)
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _collect():
+    """Sum counters and histograms of every live worker file; gauges keep the highest value.
+
+    Files left by processes that no longer exist are deleted instead of being read.
+    """
+    counters, histograms, gauges = {}, {}, {}
+    try:
+        files = [f for f in os.listdir(METRICS_DIR) if f.endswith(".json")]
+    except OSError:
+        files = []
+    for name in files:
+        pid = name[:-len(".json")]
+        if not pid.isdigit():
+            continue
+        if not _alive(int(pid)):
+            try:
+                os.remove(os.path.join(METRICS_DIR, name))
+            except OSError:
+                pass
+            continue
+        try:
+            with open(os.path.join(METRICS_DIR, name)) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            continue
+        for n, labels, v in data["counters"]:
+            key = _key(n, labels)
+            counters[key] = counters.get(key, 0) + v
+        for n, labels, v in data["histograms"]:
+            acc = histograms.setdefault(_key(n, labels), [0] * len(v))
+            for i, x in enumerate(v):
+                acc[i] += x
+        for n, labels, v in data["gauges"]:
+            key = _key(n, labels)
+            gauges[key] = max(gauges.get(key, v), v)
+    return counters, histograms, gauges
+
+
+def _labels(pairs, extra=None):
+    items = list(pairs) + ([extra] if extra else [])
+    if not items:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in items)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(items, escaped)) + "}"
+
+
+def render():
+    """All metrics of all workers in the Prometheus text exposition format."""
+    flush()
+    counters, histograms, gauges = _collect()
+    by_name = {}
+    for store in (counters, histograms, gauges):
+        for (name, labels), value in store.items():
+            by_name.setdefault(name, []).append((labels, value))
+
+    lines = []
+    for name in sorted(n for n in by_name if n in METRICS):
+        kind, help_text, buckets = METRICS[name]
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for labels, value in sorted(by_name[name]):
+            if kind == "histogram":
+                cumulative = 0
+                for le, count in zip(list(buckets) + ["+Inf"], value[:-1]):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{_labels(labels, ('le', le))} {cumulative}")
+                lines.append(f"{name}_sum{_labels(labels)} {value[-1]}")
+                lines.append(f"{name}_count{_labels(labels)} {cumulative}")
+            else:
+                lines.append(f"{name}{_labels(labels)} {value}")
+    return "\n".join(lines) + "\n"
+
+
+def init_app(app):
+    @app.before_request
+    def _metrics_start():
+        g.metrics_started = time.perf_counter()
+
+    @app.after_request
+    def _metrics_finish(response):
+        started = g.pop("metrics_started", None)
+        if started is not None and request.url_rule is not None and request.url_rule.rule.startswith("/api/"):
+            observe("tracker_http_request_seconds", time.perf_counter() - started, route=request.url_rule.rule)
+        return response
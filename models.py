@@ -1,115 +1,362 @@
 """Database models for Skool Tracker."""
 import os
 import sqlite3
-from flask import g
+from flask import g, current_app
 
-DB_PATH = os.path.join(os.path.dirname(__file__), "data", "tracker.db")
+from member_versions import backfill_versions
+from mrr_movements import backfill as backfill_mrr_movements, versioning_start
+from clicks import rebuild_rollups
+from referrals import rebuild_referrals
+from timeseries import fill_calendar
+from perf import TracedConnection
+from replica import replica_path
+import metrics
+
+DB_PATH = os.environ.get("DB_PATH") or os.path.join(os.path.dirname(__file__), "data", "tracker.db")
+
+
+def current_db_path():
+    """Database of the community being served (the main one outside /c/<slug>)."""
+    return g.get("db_path") or DB_PATH
+
+
+def connect(path, readonly=False):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    factory = TracedConnection if current_app.config.get("PERF_PROFILING") else sqlite3.Connection
+    with metrics.timer("tracker_db_connect_seconds"):
+        if readonly:
+            db = sqlite3.connect(f"file:{path}?mode=ro", uri=True, factory=factory)
+        else:
+            db = sqlite3.connect(path, factory=factory)
+    db.row_factory = sqlite3.Row
+    if not readonly:
+        db.execute("PRAGMA journal_mode=WAL")
+    return db
 
 
 def get_db():
     if "db" not in g:
-        os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
-        g.db = sqlite3.connect(DB_PATH)
-        g.db.row_factory = sqlite3.Row
-        g.db.execute("PRAGMA journal_mode=WAL")
+        g.db = connect(current_db_path())
     return g.db
 
 
+def get_read_db():
+    """Analytics replica of the current database (replica.py); the live one until it has been copied."""
+    if "read_db" not in g:
+        path = replica_path(current_db_path())
+        if not current_app.config.get("ANALYTICS_REPLICA") or not os.path.exists(path):
+            return get_db()
+        g.read_db = connect(path, readonly=True)
+    return g.read_db
+
+
+def get_main_db():
+    """Users and the community registry always live in the main database."""
+    if current_db_path() == DB_PATH:
+        return get_db()
+    if "main_db" not in g:
+        g.main_db = connect(DB_PATH)
+    return g.main_db
+
+
 def close_db(e=None):
-    db = g.pop("db", None)
-    if db is not None:
+    for key in ("db", "main_db", "read_db"):
+        db = g.pop(key, None)
+        if db is not None:
+            db.close()
+
+
+def init_schema(db):
+    """Create tables and run migrations on one database (main or community shard)."""
+    db.executescript("""
+        CREATE TABLE IF NOT EXISTS members (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            first_name TEXT,
+            last_name TEXT,
+            email TEXT UNIQUE,
+            invited_by TEXT DEFAULT '',
+            joined_at TEXT NOT NULL,
+            price REAL DEFAULT 0,
+            recurring_interval TEXT DEFAULT '',
+            tier TEXT DEFAULT '',
+            ltv REAL DEFAULT 0,
+            status TEXT DEFAULT 'active',
+            churned_at TEXT DEFAULT '',
+            first_seen_at TEXT DEFAULT '',
+            last_seen_at TEXT DEFAULT '',
+            upload_batch TEXT DEFAULT '',
+            row_hash TEXT DEFAULT '',
+            referrer_id INTEGER
+        );
+
+        CREATE TABLE IF NOT EXISTS clicks (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            channel TEXT NOT NULL,
+            clicked_at TEXT NOT NULL,
+            ip_hash TEXT DEFAULT '',
+            user_agent TEXT DEFAULT '',
+            referer TEXT DEFAULT '',
+            is_bot INTEGER DEFAULT 0,
+            device_id INTEGER,
+            browser_id INTEGER,
+            referrer_domain_id INTEGER
+        );
+
+        CREATE TABLE IF NOT EXISTS click_daily (
+            channel TEXT NOT NULL,
+            day TEXT NOT NULL,
+            clicks INTEGER DEFAULT 0,
+            bot_clicks INTEGER DEFAULT 0,
+            visitors BLOB,
+            PRIMARY KEY (channel, day)
+        ) WITHOUT ROWID;
+
+        CREATE INDEX IF NOT EXISTS idx_click_daily_day ON click_daily(day);
+
+        CREATE TABLE IF NOT EXISTS click_devices (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL UNIQUE
+        );
+
+        CREATE TABLE IF NOT EXISTS click_browsers (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL UNIQUE
+        );
+
+        CREATE TABLE IF NOT EXISTS referrer_domains (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL UNIQUE
+        );
+
+        CREATE TABLE IF NOT EXISTS click_dims_daily (
+            channel TEXT NOT NULL,
+            day TEXT NOT NULL,
+            device_id INTEGER NOT NULL,
+            browser_id INTEGER NOT NULL,
+            referrer_domain_id INTEGER NOT NULL,
+            clicks INTEGER DEFAULT 0,
+            PRIMARY KEY (channel, day, device_id, browser_id, referrer_domain_id)
+        ) WITHOUT ROWID;
+
+        CREATE INDEX IF NOT EXISTS idx_click_dims_daily_day ON click_dims_daily(day);
+
+        CREATE TABLE IF NOT EXISTS custom_channels (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL UNIQUE,
+            created_at TEXT NOT NULL
+        );
+
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT UNIQUE NOT NULL,
+            password_hash TEXT NOT NULL,
+            role TEXT DEFAULT 'viewer',
+            created_at TEXT NOT NULL
+        );
+
+        CREATE INDEX IF NOT EXISTS idx_members_joined ON members(joined_at);
+        CREATE INDEX IF NOT EXISTS idx_members_email ON members(email);
+        CREATE INDEX IF NOT EXISTS idx_clicks_channel ON clicks(channel);
+        CREATE INDEX IF NOT EXISTS idx_clicks_date ON clicks(clicked_at);
+
+        CREATE TABLE IF NOT EXISTS tracking_links (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            channel TEXT NOT NULL UNIQUE,
+            platform TEXT DEFAULT '',
+            destination_url TEXT NOT NULL,
+            utm_source TEXT DEFAULT '',
+            utm_campaign TEXT DEFAULT '',
+            created_at TEXT NOT NULL
+        );
+
+        CREATE TABLE IF NOT EXISTS upload_history (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            batch TEXT NOT NULL,
+            uploaded_at TEXT NOT NULL,
+            total_members INTEGER DEFAULT 0,
+            active_members INTEGER DEFAULT 0,
+            new_members INTEGER DEFAULT 0,
+            updated_members INTEGER DEFAULT 0,
+            unchanged_members INTEGER DEFAULT 0,
+            churned_members INTEGER DEFAULT 0,
+            reactivated_members INTEGER DEFAULT 0,
+            paid_members INTEGER DEFAULT 0,
+            free_members INTEGER DEFAULT 0,
+            mrr REAL DEFAULT 0,
+            total_ltv REAL DEFAULT 0,
+            avg_ltv REAL DEFAULT 0
+        );
+
+        CREATE TABLE IF NOT EXISTS member_versions (
+            member_id INTEGER NOT NULL,
+            upload_batch TEXT NOT NULL,
+            field INTEGER NOT NULL,
+            value,
+            PRIMARY KEY (member_id, field, upload_batch)
+        ) WITHOUT ROWID;
+
+        CREATE INDEX IF NOT EXISTS idx_member_versions_batch ON member_versions(upload_batch);
+
+        CREATE TABLE IF NOT EXISTS mrr_movements (
+            batch TEXT PRIMARY KEY,
+            starting_mrr REAL NOT NULL,
+            new_mrr REAL DEFAULT 0,
+            new_count INTEGER DEFAULT 0,
+            expansion_mrr REAL DEFAULT 0,
+            expansion_count INTEGER DEFAULT 0,
+            contraction_mrr REAL DEFAULT 0,
+            contraction_count INTEGER DEFAULT 0,
+            churned_mrr REAL DEFAULT 0,
+            churned_count INTEGER DEFAULT 0,
+            reactivated_mrr REAL DEFAULT 0,
+            reactivated_count INTEGER DEFAULT 0,
+            ending_mrr REAL NOT NULL
+        ) WITHOUT ROWID;
+
+        CREATE TABLE IF NOT EXISTS referral_closure (
+            ancestor_id INTEGER NOT NULL,
+            descendant_id INTEGER NOT NULL,
+            depth INTEGER NOT NULL,
+            PRIMARY KEY (ancestor_id, descendant_id)
+        ) WITHOUT ROWID;
+
+        CREATE INDEX IF NOT EXISTS idx_referral_closure_descendant ON referral_closure(descendant_id);
+
+        CREATE TABLE IF NOT EXISTS calendar (
+            day TEXT PRIMARY KEY,
+            iso_week TEXT NOT NULL,
+            month TEXT NOT NULL
+        ) WITHOUT ROWID;
+    """)
+    fill_calendar(db)
+    db.commit()
+
+    # Migration: add platform column if missing (for existing databases)
+    try:
+        db.execute("SELECT platform FROM tracking_links LIMIT 1")
+    except Exception:
+        db.execute("ALTER TABLE tracking_links ADD COLUMN platform TEXT DEFAULT ''")
+        # Backfill platform from channel name for existing links
+        for row in db.execute("SELECT id, channel FROM tracking_links").fetchall():
+            ch = row["channel"].split("-")[0] if "-" in row["channel"] else row["channel"]
+            db.execute("UPDATE tracking_links SET platform = ? WHERE id = ?", (ch, row["id"]))
+        db.commit()
+
+    # Migration: content hash used by incremental imports
+    try:
+        db.execute("SELECT row_hash FROM members LIMIT 1")
+    except Exception:
+        db.execute("ALTER TABLE members ADD COLUMN row_hash TEXT DEFAULT ''")
+        db.commit()
+
+    try:
+        db.execute("SELECT unchanged_members FROM upload_history LIMIT 1")
+    except Exception:
+        db.execute("ALTER TABLE upload_history ADD COLUMN unchanged_members INTEGER DEFAULT 0")
+        db.commit()
+
+    # Migration: bot flag and daily click rollups
+    try:
+        db.execute("SELECT is_bot FROM clicks LIMIT 1")
+    except Exception:
+        db.execute("ALTER TABLE clicks ADD COLUMN is_bot INTEGER DEFAULT 0")
+        db.commit()
+
+    # Migration: device, browser and referrer domain keys, backfilled with their rollup
+    try:
+        db.execute("SELECT referrer_domain_id FROM clicks LIMIT 1")
+    except Exception:
+        for column in ("device_id", "browser_id", "referrer_domain_id"):
+            db.execute(f"ALTER TABLE clicks ADD COLUMN {column} INTEGER")
+        rebuild_rollups(db)
+        db.commit()
+
+    if not db.execute("SELECT 1 FROM click_daily LIMIT 1").fetchone() and \
+            db.execute("SELECT 1 FROM clicks LIMIT 1").fetchone():
+        rebuild_rollups(db)
+        db.commit()
+
+    # Migration: resolved referrer and referral closure
+    try:
+        db.execute("SELECT referrer_id FROM members LIMIT 1")
+    except Exception:
+        db.execute("ALTER TABLE members ADD COLUMN referrer_id INTEGER")
+        db.commit()
+    db.execute("CREATE INDEX IF NOT EXISTS idx_members_referrer ON members(referrer_id)")
+
+    if not db.execute("SELECT 1 FROM referral_closure LIMIT 1").fetchone() and \
+            db.execute("SELECT 1 FROM members WHERE email NOT LIKE '__no_email_%' LIMIT 1").fetchone():
+        rebuild_referrals(db)
+        db.commit()
+
+    # Migration: imports match members by lowercased email; older rows kept the export's case
+    if db.execute("SELECT 1 FROM members WHERE email != LOWER(email) LIMIT 1").fetchone():
+        merged = merge_email_case(db)
+        if merged:
+            rebuild_referrals(db)
+            print(f"[MIGRATION] emails lowercased, {merged} duplicate members (same email, other case) merged")
+        db.commit()
+
+    # Migration: seed member history for databases created before versioning
+    if not db.execute("SELECT 1 FROM member_versions LIMIT 1").fetchone():
+        backfill_versions(db)
+        db.commit()
+
+    # Migration: MRR movements of imports made before they were recorded. An earlier
+    # backfill also wrote rows for imports older than versioning: rebuild those databases.
+    seeded = versioning_start(db)
+    if seeded is not None and db.execute("SELECT 1 FROM mrr_movements WHERE batch <= ? LIMIT 1", (seeded,)).fetchone():
+        db.execute("DELETE FROM mrr_movements")
+    if not db.execute("SELECT 1 FROM mrr_movements LIMIT 1").fetchone() and \
+            db.execute("SELECT 1 FROM upload_history LIMIT 1").fetchone():
+        backfill_mrr_movements(db)
+        db.commit()
+
+
+def merge_email_case(db):
+    """Lowercase member emails, keeping one row per address. Returns the number of rows removed.
+
+    Of rows differing only by case, the active one seen in the latest import is kept;
+    the others and their history are deleted. The caller commits.
+    """
+    groups = {}
+    for r in db.execute("""
+        SELECT id, email FROM members WHERE LOWER(email) IN (
+            SELECT LOWER(email) FROM members WHERE email != LOWER(email)
+        )
+        ORDER BY status = 'active' DESC, upload_batch DESC, id DESC
+    """):
+        groups.setdefault(r["email"].lower(), []).append(r["id"])
+    removed = []
+    for email, (keep, *duplicates) in groups.items():
+        removed += duplicates
+        db.executemany("DELETE FROM member_versions WHERE member_id = ?", [(i,) for i in duplicates])
+        db.executemany("DELETE FROM members WHERE id = ?", [(i,) for i in duplicates])
+        db.execute("UPDATE members SET email = ? WHERE id = ?", (email, keep))
+    return len(removed)
+
+
+def init_shard(path):
+    """Create or migrate a community database outside of any request."""
+    db = connect(path)
+    try:
+        init_schema(db)
+    finally:
         db.close()
 
 
 def init_db(app):
     with app.app_context():
         db = get_db()
+        init_schema(db)
         db.executescript("""
-            CREATE TABLE IF NOT EXISTS members (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                first_name TEXT,
-                last_name TEXT,
-                email TEXT UNIQUE,
-                invited_by TEXT DEFAULT '',
-                joined_at TEXT NOT NULL,
-                price REAL DEFAULT 0,
-                recurring_interval TEXT DEFAULT '',
-                tier TEXT DEFAULT '',
-                ltv REAL DEFAULT 0,
-                status TEXT DEFAULT 'active',
-                churned_at TEXT DEFAULT '',
-                first_seen_at TEXT DEFAULT '',
-                last_seen_at TEXT DEFAULT '',
-                upload_batch TEXT DEFAULT ''
-            );
-
-            CREATE TABLE IF NOT EXISTS clicks (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                channel TEXT NOT NULL,
-                clicked_at TEXT NOT NULL,
-                ip_hash TEXT DEFAULT '',
-                user_agent TEXT DEFAULT '',
-                referer TEXT DEFAULT ''
-            );
-
-            CREATE TABLE IF NOT EXISTS custom_channels (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL UNIQUE,
+            CREATE TABLE IF NOT EXISTS communities (
+                slug TEXT PRIMARY KEY,
+                name TEXT NOT NULL,
+                skool_url TEXT DEFAULT '',
                 created_at TEXT NOT NULL
             );
-
-            CREATE TABLE IF NOT EXISTS users (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                username TEXT UNIQUE NOT NULL,
-                password_hash TEXT NOT NULL,
-                role TEXT DEFAULT 'viewer',
-                created_at TEXT NOT NULL
-            );
-
-            CREATE INDEX IF NOT EXISTS idx_members_joined ON members(joined_at);
-            CREATE INDEX IF NOT EXISTS idx_members_email ON members(email);
-            CREATE INDEX IF NOT EXISTS idx_clicks_channel ON clicks(channel);
-            CREATE INDEX IF NOT EXISTS idx_clicks_date ON clicks(clicked_at);
-
-            CREATE TABLE IF NOT EXISTS tracking_links (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                channel TEXT NOT NULL UNIQUE,
-                platform TEXT DEFAULT '',
-                destination_url TEXT NOT NULL,
-                utm_source TEXT DEFAULT '',
-                utm_campaign TEXT DEFAULT '',
-                created_at TEXT NOT NULL
-            );
-
-            CREATE TABLE IF NOT EXISTS upload_history (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                batch TEXT NOT NULL,
-                uploaded_at TEXT NOT NULL,
-                total_members INTEGER DEFAULT 0,
-                active_members INTEGER DEFAULT 0,
-                new_members INTEGER DEFAULT 0,
-                updated_members INTEGER DEFAULT 0,
-                churned_members INTEGER DEFAULT 0,
-                reactivated_members INTEGER DEFAULT 0,
-                paid_members INTEGER DEFAULT 0,
-                free_members INTEGER DEFAULT 0,
-                mrr REAL DEFAULT 0,
-                total_ltv REAL DEFAULT 0,
-                avg_ltv REAL DEFAULT 0
-            );
         """)
         db.commit()
-
-        # Migration: add platform column if missing (for existing databases)
-        try:
-            db.execute("SELECT platform FROM tracking_links LIMIT 1")
-        except Exception:
-            db.execute("ALTER TABLE tracking_links ADD COLUMN platform TEXT DEFAULT ''")
-            # Backfill platform from channel name for existing links
-            for row in db.execute("SELECT id, channel FROM tracking_links").fetchall():
-                ch = row["channel"].split("-")[0] if "-" in row["channel"] else row["channel"]
-                db.execute("UPDATE tracking_links SET platform = ? WHERE id = ?", (ch, row["id"]))
-            db.commit()
-
         close_db()
     app.teardown_appcontext(close_db)
@@ -0,0 +1,156 @@
+"""MRR movements per import: why MRR moved between two consecutive uploads.
+
+The import already holds every member's previous price, interval and status
+while it upserts the new export, so each changed member is classified there,
+inside the import transaction:
+
+- new: a member appearing with MRR, or an active free member starting to pay;
+- expansion / contraction: an active paying member whose MRR went up / down
+  (a move to a free plan is a contraction down to zero);
+- churned: an active member missing from the export, all of their MRR;
+- reactivated: a churned member back in the export, with their new MRR.
+
+One mrr_movements row per batch holds the MRR before the import, the signed
+amount and member count of each movement, and the MRR after it, so that
+ending_mrr = starting_mrr + new + expansion + contraction + churned + reactivated.
+Members without an email (placeholders) are recreated on every import and have
+no identity to follow: their MRR is compared in aggregate, a net increase
+counted as new and a net decrease as churned.
+"""
+from member_versions import VERSIONED_FIELDS, monthly_value
+
+MOVEMENTS = ("new", "expansion", "contraction", "churned", "reactivated")
+MAX_IMPORTS = 24
+
+
+def classify(old, new):
+    """(movement, signed MRR amount) for a member going from `old` (None = new member) to `new`."""
+    after = monthly_value(new)
+    if old is None:
+        return "new", after
+    before = monthly_value(old)
+    if old["status"] != "active":
+        return ("reactivated", after) if new["status"] == "active" else (None, 0)
+    if new["status"] != "active":
+        return "churned", -before
+    if before == 0:
+        return "new", after
+    delta = after - before
+    return ("expansion" if delta > 0 else "contraction"), delta
+
+
+class Movements:
+    """Signed MRR and member count per movement for one import."""
+
+    def __init__(self, starting_mrr=0):
+        self.starting_mrr = starting_mrr
+        self.amounts = dict.fromkeys(MOVEMENTS, 0)
+        self.counts = dict.fromkeys(MOVEMENTS, 0)
+
+    def add(self, old, new):
+        movement, amount = classify(old, new)
+        if movement and amount:
+            self.amounts[movement] += amount
+            self.counts[movement] += 1
+
+    def placeholders(self, before, after):
+        """Net MRR change of the members without an email."""
+        if after > before:
+            self.amounts["new"] += after - before
+        elif after < before:
+            self.amounts["churned"] += after - before
+
+    @property
+    def ending_mrr(self):
+        return self.starting_mrr + sum(self.amounts.values())
+
+
+def placeholder_mrr(db):
+    return db.execute("""
+        SELECT COALESCE(SUM(CASE recurring_interval WHEN 'month' THEN price WHEN 'year' THEN price / 12.0 END), 0)
+        FROM members WHERE email LIKE '__no_email_%' AND status = 'active' AND price > 0 AND ltv > 0
+    """).fetchone()[0]
+
+
+def record(db, batch, movements):
+    """Store the movements of an import. The caller commits."""
+    db.execute(f"""
+        INSERT OR REPLACE INTO mrr_movements (batch, starting_mrr, ending_mrr,
+            {", ".join(f"{m}_mrr, {m}_count" for m in MOVEMENTS)})
+        VALUES ({", ".join("?" * (2 * len(MOVEMENTS) + 3))})
+    """, (batch, movements.starting_mrr, movements.ending_mrr,
+          *(v for m in MOVEMENTS for v in (movements.amounts[m], movements.counts[m]))))
+
+
+def versioning_start(db):
+    """Last batch seeded by backfill_versions rather than recorded by an import, None if there is none.
+
+    The seed gives each member present at the time a first version at their upload_batch,
+    so that batch holds more first versions than it had new members; an import never does.
+    """
+    row = db.execute("""
+        SELECT f.batch FROM (
+            SELECT member_id, MIN(upload_batch) AS batch FROM member_versions GROUP BY member_id
+        ) f
+        GROUP BY f.batch
+        HAVING COUNT(*) > (SELECT COALESCE(MAX(new_members), 0) FROM upload_history WHERE batch = f.batch)
+        ORDER BY f.batch DESC LIMIT 1
+    """).fetchone()
+    return row[0] if row else None
+
+
+def backfill(db):
+    """Rebuild the movements of past imports from member_versions (databases created before this table).
+
+    Only imports made once versioning existed are rebuilt: the ones before it have no
+    history to compare, so they keep no row. The first rebuilt import starts from the
+    MRR recorded by the one before it. Placeholders are not versioned, so their MRR
+    moves are missing from backfilled rows.
+    """
+    start = versioning_start(db)
+    history = db.execute("SELECT batch, mrr FROM upload_history ORDER BY uploaded_at, id").fetchall()
+    mrr = 0
+    batches = []
+    for batch, batch_mrr in history:
+        if start is not None and batch <= start:
+            mrr = batch_mrr or 0
+        else:
+            batches.append(batch)
+    cur = db.cursor()
+    cur.row_factory = None
+    versions = cur.execute("SELECT upload_batch, member_id, field, value FROM member_versions ORDER BY upload_batch")
+    pending = next(versions, None)
+    state = {}
+    # State at the start of versioning, without movements
+    while start is not None and pending is not None and pending[0] <= start:
+        _, member_id, field, value = pending
+        state.setdefault(member_id, dict.fromkeys(VERSIONED_FIELDS))[VERSIONED_FIELDS[field]] = value
+        pending = next(versions, None)
+    for batch in batches:
+        before = {}
+        while pending is not None and pending[0] <= batch:
+            _, member_id, field, value = pending
+            if member_id not in before:
+                before[member_id] = dict(state[member_id]) if member_id in state else None
+            state.setdefault(member_id, dict.fromkeys(VERSIONED_FIELDS))[VERSIONED_FIELDS[field]] = value
+            pending = next(versions, None)
+        movements = Movements(mrr)
+        for member_id, old in before.items():
+            movements.add(old, state[member_id])
+        record(db, batch, movements)
+        mrr = movements.ending_mrr
+    return len(batches)
+
+
+def recent(db, limit=MAX_IMPORTS):
+    """Movements of the last `limit` imports, oldest first, for the MRR waterfall."""
+    rows = db.execute("""
+        SELECT h.uploaded_at, m.* FROM upload_history h
+        JOIN mrr_movements m ON m.batch = h.batch
+        ORDER BY h.uploaded_at DESC, h.id DESC LIMIT ?
+    """, (limit,)).fetchall()
+    return [{
+        "batch": r["batch"], "uploaded_at": r["uploaded_at"],
+        "starting_mrr": round(r["starting_mrr"], 2), "ending_mrr": round(r["ending_mrr"], 2),
+        **{m: {"mrr": round(r[f"{m}_mrr"], 2), "members": r[f"{m}_count"]} for m in MOVEMENTS},
+    } for r in reversed(rows)]
@@ -0,0 +1,147 @@
+"""API payload encoding: fast JSON, opt-in columnar format and response compression.
+
+?format=columnar on endpoints served with api_json() rewrites the payload:
+
+- a list of objects, an empty list included, becomes {"columns": [...], "length": n,
+  "data": [[...], ...]}, one array per column. String columns with repeated values
+  are dictionary-encoded as {"dict": [distinct values], "codes": [index into dict per row]};
+- the fields the endpoint names as matrices (objects of flat objects such as
+  daily_by_channel or attribution_by_channel) become {"index": [outer keys],
+  "columns": [inner keys], "data": [[...], ...]}, one array per inner key aligned
+  on index, whatever their number of entries. Missing cells are 0 when every cell
+  is a number, null otherwise.
+
+The shape of a field therefore does not depend on the data. Everything else
+passes through unchanged. JSON is encoded with orjson when it is
+installed, and responses of COMPRESS_MIN_BYTES or more are compressed with brotli
+(if installed and accepted by the client) or gzip.
+"""
+import gzip
+
+from flask import jsonify, request
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESS_MIN_BYTES = 1024
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+COMPRESSIBLE = {"application/json", "text/html", "text/csv", "text/plain", "text/css", "application/javascript"}
+FORMATS = ("json", "columnar")
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """jsonify() through orjson; same output as the default provider (sorted keys, compact)."""
+
+    option = orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS if orjson else 0
+
+    def dumps(self, obj, **kwargs):
+        if orjson is None or kwargs.keys() - {"separators"}:
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=self.default, option=self.option).decode()
+
+    def loads(self, s, **kwargs):
+        if orjson is None or kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        if orjson is None or self._app.debug:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        body = orjson.dumps(obj, default=self.default, option=self.option | orjson.OPT_APPEND_NEWLINE)
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+
+# ---------- columnar format ----------
+
+def _scalar(value):
+    return not isinstance(value, (dict, list))
+
+
+def _number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _column(values):
+    if len(values) > 1 and all(v is None or isinstance(v, str) for v in values):
+        distinct = list(dict.fromkeys(values))
+        if len(distinct) * 2 <= len(values):
+            codes = {v: i for i, v in enumerate(distinct)}
+            return {"dict": distinct, "codes": [codes[v] for v in values]}
+    return values
+
+
+def _table(records):
+    columns = list(dict.fromkeys(k for r in records for k in r))
+    return {"columns": columns, "length": len(records),
+            "data": [_column([r.get(c) for r in records]) for c in columns]}
+
+
+def _matrix(rows):
+    columns = list(dict.fromkeys(k for row in rows.values() for k in row))
+    fill = 0 if all(_number(v) for row in rows.values() for v in row.values()) else None
+    return {"index": list(rows), "columns": columns,
+            "data": [[row.get(c, fill) for row in rows.values()] for c in columns]}
+
+
+def columnar(value, matrices=()):
+    """Columnar form of a payload; `matrices` names the fields holding objects of flat objects."""
+    if isinstance(value, list):
+        if all(isinstance(v, dict) for v in value):
+            return _table(value)
+        return value
+    if isinstance(value, dict):
+        return {
+            k: _matrix(v) if k in matrices and _matrix_like(v) else columnar(v, matrices)
+            for k, v in value.items()
+        }
+    return value
+
+
+def _matrix_like(value):
+    return isinstance(value, dict) and all(isinstance(v, dict) and all(map(_scalar, v.values())) for v in value.values())
+
+
+def api_json(data, matrices=()):
+    """jsonify() honouring ?format=json|columnar."""
+    fmt = request.args.get("format", "json")
+    if fmt not in FORMATS:
+        return jsonify({"error": f"Format inconnu : {fmt}"}), 400
+    return jsonify(columnar(data, matrices) if fmt == "columnar" else data)
+
+
+# ---------- compression ----------
+
+def compress(response):
+    if response.mimetype not in COMPRESSIBLE:
+        return response
+    response.vary.add("Accept-Encoding")
+    if (response.direct_passthrough or response.is_streamed or "Content-Encoding" in response.headers
+            or not 200 <= response.status_code < 300 or response.status_code == 204):
+        return response
+    data = response.get_data()
+    if len(data) < COMPRESS_MIN_BYTES:
+        return response
+    encoding = request.accept_encodings.best_match(["br", "gzip"] if brotli else ["gzip"])
+    if encoding == "br":
+        response.set_data(brotli.compress(data, quality=BROTLI_QUALITY))
+    elif encoding == "gzip":
+        response.set_data(gzip.compress(data, compresslevel=GZIP_LEVEL))
+    else:
+        return response
+    response.headers["Content-Encoding"] = encoding
+    return response
+
+
+def init_app(app):
+    app.json = FastJSONProvider(app)
+    app.after_request(compress)
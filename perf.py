@@ -0,0 +1,212 @@
+"""Opt-in request profiling: SQL statement tracing, per-route histograms and a sampling profiler.
+
+Enabled with PERF_PROFILING=1. When off, get_db() uses a plain sqlite3 connection
+and none of the hooks below do any work.
+"""
+import heapq
+import sqlite3
+import sys
+import threading
+import time
+from collections import Counter, deque
+
+from flask import g, has_request_context, request, session
+
+# Upper bounds (ms) of the latency histogram buckets
+BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, float("inf"))
+SLOW_QUERY_LIMIT = 50
+PROFILE_INTERVAL = 0.005
+MAX_QUERIES_PER_REQUEST = 10000
+
+_lock = threading.Lock()
+_routes = {}
+_slow_queries = []  # min-heap of (ms, seq, entry)
+_profiles = deque(maxlen=10)
+_seq = 0
+
+
+class TracedCursor(sqlite3.Cursor):
+    """Cursor that times execute/fetch calls and counts returned rows."""
+
+    entry = None
+
+    def _start(self, sql, params):
+        self.entry = {"sql": " ".join(sql.split()), "params": list(params) if params else [], "ms": 0.0, "rows": 0,
+                      "route": request.url_rule.rule if has_request_context() and request.url_rule else None}
+        if has_request_context():
+            queries = g.setdefault("perf_queries", [])
+            if len(queries) < MAX_QUERIES_PER_REQUEST:
+                queries.append(self.entry)
+
+    def _track(self, started, rows):
+        if self.entry is not None:
+            self.entry["ms"] += (time.perf_counter() - started) * 1000
+            self.entry["rows"] += rows
+
+    def execute(self, sql, params=()):
+        self._start(sql, params)
+        started = time.perf_counter()
+        super().execute(sql, params)
+        self._track(started, 0)
+        return self
+
+    def executemany(self, sql, seq_of_params):
+        self._start(sql, ())
+        started = time.perf_counter()
+        super().executemany(sql, seq_of_params)
+        self._track(started, 0)
+        return self
+
+    def fetchone(self):
+        started = time.perf_counter()
+        row = super().fetchone()
+        self._track(started, row is not None)
+        return row
+
+    def fetchmany(self, size=None):
+        started = time.perf_counter()
+        rows = super().fetchmany(size if size is not None else self.arraysize)
+        self._track(started, len(rows))
+        return rows
+
+    def fetchall(self):
+        started = time.perf_counter()
+        rows = super().fetchall()
+        self._track(started, len(rows))
+        return rows
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        row = self.fetchone()
+        if row is None:
+            raise StopIteration
+        return row
+
+
+class TracedConnection(sqlite3.Connection):
+    """Connection whose shortcut execute methods go through TracedCursor."""
+
+    def cursor(self, factory=TracedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, params=()):
+        return self.cursor().execute(sql, params)
+
+    def executemany(self, sql, seq_of_params):
+        return self.cursor().executemany(sql, seq_of_params)
+
+
+class SamplingProfiler:
+    """Samples one thread's stack at a fixed interval from a background thread."""
+
+    def __init__(self, thread_id, interval=PROFILE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({code.co_filename.rsplit('/', 1)[-1]}:{frame.f_lineno})")
+                frame = frame.f_back
+            if stack:
+                self.samples[";".join(reversed(stack))] += 1
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        return self.samples
+
+
+def _observe(route, ms, queries):
+    global _seq
+    with _lock:
+        stats = _routes.setdefault(route, {"count": 0, "total_ms": 0.0, "db_ms": 0.0, "queries": 0,
+                                           "buckets": [0] * len(BUCKETS_MS)})
+        stats["count"] += 1
+        stats["total_ms"] += ms
+        stats["db_ms"] += sum(q["ms"] for q in queries)
+        stats["queries"] += len(queries)
+        stats["buckets"][next(i for i, b in enumerate(BUCKETS_MS) if ms <= b)] += 1
+        for q in queries:
+            _seq += 1
+            item = (q["ms"], _seq, q)
+            if len(_slow_queries) < SLOW_QUERY_LIMIT:
+                heapq.heappush(_slow_queries, item)
+            elif q["ms"] > _slow_queries[0][0]:
+                heapq.heapreplace(_slow_queries, item)
+
+
+def init_app(app):
+    if not app.config.get("PERF_PROFILING"):
+        return
+
+    @app.before_request
+    def _perf_start():
+        g.perf_started = time.perf_counter()
+        if request.args.get("_profile") and session.get("role") == "admin":
+            g.perf_profiler = SamplingProfiler(threading.get_ident()).start()
+
+    @app.after_request
+    def _perf_finish(response):
+        if "perf_started" not in g:
+            return response
+        ms = (time.perf_counter() - g.perf_started) * 1000
+        queries = g.get("perf_queries", [])
+        db_ms = sum(q["ms"] for q in queries)
+        route = request.url_rule.rule if request.url_rule else request.path
+        response.headers.add("Server-Timing", f'db;dur={db_ms:.1f};desc="{len(queries)} queries"')
+        response.headers.add("Server-Timing", f"app;dur={ms:.1f}")
+        _observe(route, ms, queries)
+
+        profiler = g.pop("perf_profiler", None)
+        if profiler:
+            samples = profiler.stop()
+            with _lock:
+                _profiles.append({
+                    "path": request.full_path, "at": time.time(), "ms": round(ms, 1),
+                    "interval_ms": profiler.interval * 1000,
+                    "stacks": [{"stack": s, "samples": n} for s, n in samples.most_common(50)],
+                })
+        return response
+
+
+def report(db, limit=20):
+    """Route histograms, slowest statements with their query plan, and recent profiles."""
+    with _lock:
+        routes = {route: dict(stats, buckets=list(stats["buckets"])) for route, stats in _routes.items()}
+        slowest = sorted(_slow_queries, reverse=True)[:limit]
+        profiles = list(_profiles)
+
+    queries = []
+    for ms, _, q in slowest:
+        try:
+            plan = [r[3] for r in db.execute("EXPLAIN QUERY PLAN " + q["sql"], q["params"]).fetchall()]
+        except sqlite3.Error as e:
+            plan = [f"error: {e}"]
+        queries.append({"sql": q["sql"], "params": q["params"][:10], "ms": round(ms, 2),
+                        "rows": q["rows"], "route": q["route"], "plan": plan})
+
+    return {
+        "buckets_ms": [b if b != float("inf") else "+Inf" for b in BUCKETS_MS],
+        "routes": {
+            route: {
+                "count": s["count"], "avg_ms": round(s["total_ms"] / s["count"], 2),
+                "avg_db_ms": round(s["db_ms"] / s["count"], 2),
+                "avg_queries": round(s["queries"] / s["count"], 1), "buckets": s["buckets"],
+            } for route, s in sorted(routes.items(), key=lambda x: -x[1]["total_ms"])
+        },
+        "slowest_queries": queries,
+        "profiles": profiles,
+    }
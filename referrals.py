@@ -0,0 +1,171 @@
+"""Referral graph: resolve Skool "Invited By" names to member ids and keep a closure table.
+
+referral_closure holds one row per (ancestor, descendant) pair with the distance
+between them, self rows included (depth 0), so subtree sizes, depths and downstream
+revenue are plain GROUP BY queries at read time.
+"""
+
+
+def name_key(name):
+    return " ".join(name.split()).casefold()
+
+
+class NameIndex:
+    """Member ids by normalised full name. Homonyms keep every candidate, oldest first."""
+
+    def __init__(self, members):
+        self.by_name = {}
+        for m in sorted(members, key=lambda m: (m["joined_at"] or "", m["id"])):
+            key = name_key(f"{m['first_name'] or ''} {m['last_name'] or ''}")
+            if key:
+                self.by_name.setdefault(key, []).append((m["joined_at"] or "", m["id"]))
+
+    def resolve(self, invited_by, member_id, joined_at):
+        """Referrer id for a member, and whether several members carry that name.
+
+        A referrer must have joined before the member; among homonyms the earliest
+        member wins so the choice is stable across imports.
+        """
+        candidates = [c for c in self.by_name.get(name_key(invited_by), ()) if c[1] != member_id]
+        eligible = [c for c in candidates if not joined_at or c[0] <= joined_at] or candidates
+        if not eligible:
+            return None, False
+        return eligible[0][1], len(eligible) > 1
+
+
+# Monthly revenue a descendant brings (same rule as the dashboard MRR)
+DOWNSTREAM_MRR = """
+    CASE WHEN m.status = 'active' AND m.price > 0 AND m.ltv > 0 THEN
+        CASE m.recurring_interval WHEN 'month' THEN m.price WHEN 'year' THEN m.price / 12.0 ELSE 0 END
+    ELSE 0 END
+"""
+
+
+def _move(db, member_id, new_referrer):
+    """Re-hang a member's subtree under new_referrer (None = root) in referral_closure."""
+    db.executemany("INSERT OR IGNORE INTO referral_closure (ancestor_id, descendant_id, depth) VALUES (?, ?, 0)",
+                   [(i, i) for i in (member_id, new_referrer) if i is not None])
+    db.execute("""
+        DELETE FROM referral_closure
+        WHERE descendant_id IN (SELECT descendant_id FROM referral_closure WHERE ancestor_id = ?)
+          AND ancestor_id IN (SELECT ancestor_id FROM referral_closure WHERE descendant_id = ? AND ancestor_id != ?)
+    """, (member_id, member_id, member_id))
+    if new_referrer is not None:
+        db.execute("""
+            INSERT INTO referral_closure (ancestor_id, descendant_id, depth)
+            SELECT a.ancestor_id, s.descendant_id, a.depth + s.depth + 1
+            FROM referral_closure a, referral_closure s
+            WHERE a.descendant_id = ? AND s.ancestor_id = ?
+        """, (new_referrer, member_id))
+
+
+def sync_referrers(db, members, ids):
+    """Resolve invited_by for `ids` and update referrer_id and referral_closure. The caller commits.
+
+    members: {id: member dict} for every real member (first_name, last_name,
+    invited_by, joined_at, referrer_id). Returns (links changed, ambiguous names).
+    """
+    if not ids:
+        return 0, 0
+    index = NameIndex(members.values())
+    changed = ambiguous = 0
+    for member_id in ids:
+        m = members[member_id]
+        new, homonyms = index.resolve(m["invited_by"], member_id, m["joined_at"]) if m["invited_by"] else (None, False)
+        ambiguous += homonyms
+        if new is not None and db.execute(
+            "SELECT 1 FROM referral_closure WHERE ancestor_id = ? AND descendant_id = ?", (member_id, new)
+        ).fetchone():
+            new = None  # the referrer sits in this member's own subtree: refuse the cycle
+        if new == m.get("referrer_id"):
+            db.execute("INSERT OR IGNORE INTO referral_closure (ancestor_id, descendant_id, depth) VALUES (?, ?, 0)",
+                       (member_id, member_id))
+            continue
+        _move(db, member_id, new)
+        db.execute("UPDATE members SET referrer_id = ? WHERE id = ?", (new, member_id))
+        m["referrer_id"] = new
+        changed += 1
+    return changed, ambiguous
+
+
+def rebuild_referrals(db):
+    """Resolve every member and rebuild referral_closure from scratch (migrations)."""
+    members = {
+        r["id"]: dict(r) for r in db.execute("""
+            SELECT id, first_name, last_name, invited_by, joined_at FROM members
+            WHERE email NOT LIKE '__no_email_%'
+        """).fetchall()
+    }
+    index = NameIndex(members.values())
+    parent = {}
+    for member_id, m in members.items():
+        if m["invited_by"]:
+            referrer, _ = index.resolve(m["invited_by"], member_id, m["joined_at"])
+            if referrer is not None:
+                parent[member_id] = referrer
+
+    # Ancestor chains, memoised; a link closing a cycle is dropped
+    chains = {}
+    for start in members:
+        path = []
+        node = start
+        while node not in chains:
+            if node in path:
+                parent.pop(path[-1], None)
+                break
+            path.append(node)
+            if node not in parent:
+                break
+            node = parent[node]
+        for member_id in reversed(path):
+            referrer = parent.get(member_id)
+            chains[member_id] = [referrer] + chains[referrer] if referrer is not None else []
+
+    db.execute("DELETE FROM referral_closure")
+    db.execute("UPDATE members SET referrer_id = NULL")
+    db.executemany("UPDATE members SET referrer_id = ? WHERE id = ?", [(p, m) for m, p in parent.items()])
+    db.executemany(
+        "INSERT INTO referral_closure (ancestor_id, descendant_id, depth) VALUES (?, ?, ?)",
+        [(a, member_id, depth) for member_id, chain in chains.items() for depth, a in enumerate([member_id] + chain)]
+    )
+    return len(parent)
+
+
+def tree_summary(db, limit=50):
+    """Referrers with the size, depth and revenue of their whole downstream tree."""
+    rows = db.execute(f"""
+        SELECT c.ancestor_id AS id, r.first_name, r.last_name, r.status,
+               SUM(c.depth = 1) AS direct, COUNT(*) AS size, MAX(c.depth) AS depth,
+               SUM(m.ltv) AS ltv, SUM({DOWNSTREAM_MRR}) AS mrr
+        FROM referral_closure c
+        JOIN members m ON m.id = c.descendant_id
+        JOIN members r ON r.id = c.ancestor_id
+        WHERE c.depth > 0
+        GROUP BY c.ancestor_id
+        ORDER BY size DESC, ltv DESC LIMIT ?
+    """, (limit,)).fetchall()
+    unresolved = db.execute(
+        "SELECT COUNT(*) AS c FROM members WHERE invited_by != '' AND referrer_id IS NULL AND email NOT LIKE '__no_email_%'"
+    ).fetchone()["c"]
+    return {
+        "referrers": [{
+            "id": r["id"], "name": f"{r['first_name']} {r['last_name']}".strip(), "status": r["status"],
+            "direct": r["direct"], "size": r["size"], "depth": r["depth"],
+            "ltv": round(r["ltv"] or 0, 2), "mrr": round(r["mrr"] or 0, 2)
+        } for r in rows],
+        "unresolved": unresolved
+    }
+
+
+def descendants(db, root_id, limit=50):
+    """A member's downstream tree, nearest first, with each descendant's direct referrer."""
+    rows = db.execute(f"""
+        SELECT m.id, m.first_name, m.last_name, m.referrer_id, m.status, m.ltv, c.depth, {DOWNSTREAM_MRR} AS mrr
+        FROM referral_closure c JOIN members m ON m.id = c.descendant_id
+        WHERE c.ancestor_id = ? AND c.depth > 0
+        ORDER BY c.depth, m.joined_at LIMIT ?
+    """, (root_id, limit)).fetchall()
+    return [{
+        "id": r["id"], "name": f"{r['first_name']} {r['last_name']}".strip(), "referrer_id": r["referrer_id"],
+        "depth": r["depth"], "status": r["status"], "ltv": r["ltv"], "mrr": round(r["mrr"], 2)
+    } for r in rows]
@@ -0,0 +1,240 @@
+"""Read-only analytics replica of each database, refreshed in the background and after imports.
+
+Dashboard endpoints read <db>.replica.db instead of the live database the tracker
+writes to, so long analytics queries no longer hold read transactions open on it
+and WAL checkpoints are not held back. A replica is a full copy taken with SQLite's
+online backup API, STEP_PAGES pages at a time so the live side is released between
+steps, gets extra read-side indexes and ANALYZE statistics, and is swapped in
+atomically. Replicas are refreshed by a background thread every REFRESH_INTERVAL
+seconds when their database changed, and as soon as a request asks for it (imports,
+link changes) without making that request wait for the copy.
+The time of the copy is sent back in the X-Data-As-Of header.
+"""
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+from flask import g
+
+import metrics
+
+REFRESH_INTERVAL = int(os.environ.get("REPLICA_REFRESH_SECONDS", 300))
+STEP_PAGES = 1024
+STEP_SLEEP = 0.01
+# A stepped copy restarts when the database is written during a step; past this many, copy it in one step
+MAX_RESTARTS = 5
+
+# Read-side only: on the live database they would slow every click and import down
+INDEXES = (
+    "CREATE INDEX IF NOT EXISTS idx_replica_members_status ON members(status, joined_at)",
+    "CREATE INDEX IF NOT EXISTS idx_replica_members_churned ON members(churned_at)",
+    "CREATE INDEX IF NOT EXISTS idx_replica_members_invited ON members(invited_by)",
+)
+
+_locks = {}
+_locks_lock = threading.Lock()
+_pending = set()
+_wake = threading.Event()
+
+
+class _Restarted(Exception):
+    pass
+
+
+def replica_path(db_path):
+    root, ext = os.path.splitext(db_path)
+    return f"{root}.replica{ext}"
+
+
+class _Watcher:
+    """A connection kept open on one database to read PRAGMA data_version from."""
+
+    def __init__(self, db_path):
+        self.db = sqlite3.connect(db_path, check_same_thread=False)
+        self.lock = threading.Lock()
+        self.data_version = None
+        self.changes = 0
+
+    def poll(self, count=True):
+        """Changes seen so far (call with the lock held); count=False takes a new data_version as the baseline."""
+        data_version = self.db.execute("PRAGMA data_version").fetchone()[0]
+        if data_version != self.data_version:
+            if count and self.data_version is not None:
+                self.changes += 1
+            self.data_version = data_version
+        return self.changes
+
+
+_watchers = {}
+
+
+def _watcher(db_path):
+    with _locks_lock:
+        watcher = _watchers.get(db_path)
+        if watcher is None:
+            watcher = _watchers[db_path] = _Watcher(db_path)
+        return watcher
+
+
+def source_version(db_path):
+    """Changes whenever another connection commits to the database.
+
+    Based on PRAGMA data_version rather than file stats, so checkpoints run under
+    checkpointing() do not count. Only comparable within one process: the pid is
+    part of it, so a restart counts as one change.
+    """
+    watcher = _watcher(db_path)
+    with watcher.lock:
+        return f"{os.getpid()}:{watcher.poll()}"
+
+
+@contextmanager
+def checkpointing(db_path):
+    """Run a checkpoint inside: the data_version move it causes (a TRUNCATE resets the WAL) is not a change.
+
+    Commits made while it runs are not counted either; the next one is.
+    """
+    watcher = _watcher(db_path)
+    with watcher.lock:
+        watcher.poll()
+        yield
+        watcher.poll(count=False)
+
+
+def read_meta(path):
+    """{taken_at, source_version} of a replica, empty when there is none yet."""
+    if not os.path.exists(path):
+        return {}
+    db = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        return dict(db.execute("SELECT key, value FROM replica_meta").fetchall())
+    except sqlite3.Error:
+        return {}
+    finally:
+        db.close()
+
+
+def stepped_backup(source, copy, pages=STEP_PAGES, sleep=STEP_SLEEP):
+    """Online backup of source into copy, `pages` at a time. Returns the number of restarts.
+
+    Each step is its own read transaction, so checkpoints and writers are not held
+    back for the whole copy. A database written to faster than it can be copied is
+    copied in one step after MAX_RESTARTS restarts.
+    """
+    restarts = [0, None]
+
+    def progress(status, remaining, total):
+        if restarts[1] is not None and remaining > restarts[1]:
+            restarts[0] += 1
+            if restarts[0] > MAX_RESTARTS:
+                raise _Restarted()
+        restarts[1] = remaining
+
+    try:
+        source.backup(copy, pages=pages, progress=progress, sleep=sleep)
+    except _Restarted:
+        source.backup(copy)
+    return restarts[0]
+
+
+def _lock(db_path):
+    with _locks_lock:
+        return _locks.setdefault(db_path, threading.Lock())
+
+
+def refresh(db_path, force=True):
+    """Copy a live database to its replica. Without force, only when it changed since the last copy."""
+    target = replica_path(db_path)
+    with _lock(db_path):
+        version = source_version(db_path)
+        if not force and read_meta(target).get("source_version") == version:
+            return False
+        tmp = f"{target}.{os.getpid()}.tmp"
+        try:
+            with metrics.timer("tracker_replica_refresh_seconds"):
+                _copy(db_path, tmp, version)
+            os.replace(tmp, target)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+    return True
+
+
+def _copy(db_path, tmp, version):
+    source = sqlite3.connect(db_path)
+    copy = sqlite3.connect(tmp)
+    try:
+        stepped_backup(source, copy)
+        copy.execute("PRAGMA journal_mode=DELETE")
+        for statement in INDEXES:
+            copy.execute(statement)
+        copy.execute("CREATE TABLE replica_meta (key TEXT PRIMARY KEY, value TEXT)")
+        copy.executemany("INSERT INTO replica_meta (key, value) VALUES (?, ?)", [
+            ("taken_at", datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")),
+            ("source_version", version),
+        ])
+        copy.execute("ANALYZE")
+        copy.commit()
+    finally:
+        copy.close()
+        source.close()
+
+
+def _refresh_logged(db_path, force):
+    if not os.path.exists(db_path):
+        return
+    try:
+        if refresh(db_path, force=force):
+            print(f"[REPLICA] {os.path.basename(db_path)} refreshed")
+    except (sqlite3.Error, OSError) as e:
+        print(f"[REPLICA] {os.path.basename(db_path)} refresh failed: {e}")
+
+
+def refresh_all(databases):
+    for db_path in databases():
+        _refresh_logged(db_path, force=False)
+
+
+def request_refresh(db_path):
+    """Have the background thread copy a database now (after a write users expect to see)."""
+    with _locks_lock:
+        _pending.add(db_path)
+    _wake.set()
+
+
+def _run(app, databases):
+    next_all = 0
+    while True:
+        _wake.wait(timeout=max(0, next_all - time.monotonic()))
+        _wake.clear()
+        with _locks_lock:
+            pending = list(_pending)
+            _pending.clear()
+        with app.app_context():
+            for db_path in pending:
+                _refresh_logged(db_path, force=True)
+            if time.monotonic() >= next_all:
+                refresh_all(databases)
+                next_all = time.monotonic() + REFRESH_INTERVAL
+
+
+def taken_at(db):
+    row = db.execute("SELECT value FROM replica_meta WHERE key = 'taken_at'").fetchone()
+    return row[0] if row else None
+
+
+def init_app(app, databases):
+    """databases: callable returning the paths of the live databases to replicate."""
+    if not app.config.get("ANALYTICS_REPLICA"):
+        return
+    threading.Thread(target=_run, args=(app, databases), name="replica-refresh", daemon=True).start()
+
+    @app.after_request
+    def _data_as_of(response):
+        as_of = taken_at(g.read_db) if "read_db" in g else None
+        if as_of:
+            response.headers["X-Data-As-Of"] = as_of
+        return response
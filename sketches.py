@@ -0,0 +1,50 @@
+"""HyperLogLog sketches for approximate unique-visitor counts."""
+import math
+
+PRECISION = 11                 # 2048 one-byte registers, ~2.3% standard error
+REGISTERS = 1 << PRECISION
+_VALUE_BITS = 64 - PRECISION
+_VALUE_MASK = (1 << _VALUE_BITS) - 1
+_ALPHA = 0.7213 / (1 + 1.079 / REGISTERS)
+
+
+class HyperLogLog:
+    """Sketch over 64-bit hashes, stored as a bytearray of REGISTERS ranks."""
+
+    __slots__ = ("registers",)
+
+    def __init__(self, data=None):
+        self.registers = bytearray(data) if data else bytearray(REGISTERS)
+
+    def add_hash(self, value):
+        """Add a 64-bit hash; returns True when the sketch changed."""
+        idx = value >> _VALUE_BITS
+        rank = _VALUE_BITS - (value & _VALUE_MASK).bit_length() + 1
+        if rank > self.registers[idx]:
+            self.registers[idx] = rank
+            return True
+        return False
+
+    def add_hex(self, hex_hash):
+        """Add a hex digest such as clicks.ip_hash (the first 16 hex digits are used)."""
+        return self.add_hash(int(hex_hash[:16].ljust(16, "0"), 16))
+
+    def count(self):
+        estimate = _ALPHA * REGISTERS * REGISTERS / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * REGISTERS and zeros:
+            estimate = REGISTERS * math.log(REGISTERS / zeros)
+        return int(round(estimate))
+
+    def to_bytes(self):
+        return bytes(self.registers)
+
+    @classmethod
+    def merge(cls, blobs):
+        """Union of serialized sketches (register-wise max), in one pass over all of them."""
+        blobs = [b for b in blobs if b]
+        if not blobs:
+            return cls()
+        if len(blobs) == 1:
+            return cls(blobs[0])
+        return cls(bytes(map(max, *blobs)))
@@ -0,0 +1,303 @@
+// 20 distinct colors for channels
+const PALETTE = [
+    '#ff0033','#0077b5','#e1306c','#00f2ea','#1da1f2','#1877f2',
+    '#f39c12','#34a853','#ff4500','#ff6719','#a29bfe','#00b894',
+    '#fdcb6e','#e17055','#6c5ce7','#55efc4','#fab1a0','#74b9ff',
+    '#ffeaa7','#dfe6e9'
+];
+const PLATFORM_COLORS = {
+    'youtube':'#ff0033','linkedin':'#0077b5','instagram':'#e1306c',
+    'tiktok':'#00f2ea','x':'#1da1f2','facebook':'#1877f2',
+    'newsletter':'#f39c12','google-ads':'#34a853','reddit':'#ff4500',
+    'substack':'#ff6719','linktree':'#43d172','direct':'#a29bfe',
+    'podcast':'#e17055','autre':'#636e72'
+};
+
+function getColor(name, idx) {
+    // Check platform colors first
+    const base = name.split('-')[0];
+    if (PLATFORM_COLORS[base]) return PLATFORM_COLORS[base];
+    if (PLATFORM_COLORS[name]) return PLATFORM_COLORS[name];
+    return PALETTE[idx % PALETTE.length];
+}
+
+let ch1, ch2, ch3, ch4;
+
+async function load() {
+    if(ch1) ch1.destroy();
+    if(ch2) ch2.destroy();
+    if(ch3) ch3.destroy();
+    if(ch4) ch4.destroy();
+
+    const days = document.getElementById('period').value;
+    const view = document.getElementById('viewMode').value;
+    const model = document.getElementById('attrModel').value;
+    const lookback = document.getElementById('attrLookback').value;
+    const d = await (await fetch(BASE+`/api/clicks?days=${days}&model=${model}&lookback=${lookback}`)).json();
+
+    const isPlatform = view === 'platform';
+    const byData = isPlatform ? d.by_platform : d.by_channel;
+    const uniqueData = isPlatform ? d.unique_by_platform : d.unique_by_channel;
+    const dailyData = isPlatform ? d.daily_by_platform : d.daily_by_channel;
+    const names = Object.keys(byData);
+    const vals = Object.values(byData);
+
+    current = d;
+    lastClickId = d.last_click_id;
+
+    document.getElementById('pieTitle').textContent = isPlatform ? 'Répartition par plateforme' : 'Répartition par lien';
+    document.getElementById('lineTitle').textContent = 'Évolution des clics';
+
+    renderKpis();
+
+    // Pie chart
+    ch1 = new Chart('pieChart', {
+        type: 'doughnut',
+        data: {
+            labels: names,
+            datasets: [{
+                data: vals,
+                backgroundColor: names.map((n, i) => getColor(n, i)),
+                borderWidth: 0
+            }]
+        },
+        options: {
+            responsive: true, cutout: '65%',
+            plugins: {
+                legend: {position: 'bottom', labels: {color: '#8b8fa3', font: {size: 12}}},
+                tooltip: {
+                    callbacks: {
+                        label: ctx => ` ${ctx.label}: ${ctx.parsed} clics (${Math.round(ctx.parsed / ctx.dataset.data.reduce((a, b) => a + b, 0) * 100)}%)`
+                    }
+                }
+            }
+        }
+    });
+
+    // Line chart with proper tooltips
+    const allDays = Object.keys(dailyData).sort();
+    const allNames = new Set();
+    Object.values(dailyData).forEach(o => Object.keys(o).forEach(c => allNames.add(c)));
+
+    ch2 = new Chart('lineChart', {
+        type: 'line',
+        data: {
+            labels: allDays.map(d => d.slice(5)),
+            datasets: [...allNames].map((name, i) => ({
+                label: name,
+                data: allDays.map(day => (dailyData[day] || {})[name] || 0),
+                borderColor: getColor(name, i),
+                backgroundColor: getColor(name, i) + '20',
+                tension: 0.3,
+                pointRadius: 3,
+                pointHoverRadius: 6,
+                borderWidth: 2
+            }))
+        },
+        options: {
+            responsive: true,
+            interaction: { mode: 'index', intersect: false },
+            plugins: {
+                legend: {position: 'bottom', labels: {color: '#8b8fa3', font: {size: 11}, usePointStyle: true}},
+                tooltip: {
+                    mode: 'index', intersect: false,
+                    callbacks: {
+                        title: ctx => '📅 ' + ctx[0].label,
+                        label: ctx => ctx.parsed.y > 0 ? ` ${ctx.dataset.label}: ${ctx.parsed.y} clics` : null
+                    },
+                    filter: ctx => ctx.parsed.y > 0
+                }
+            },
+            scales: {
+                x: {grid: {color: 'rgba(45,49,72,0.5)'}, ticks: {color: '#5f637a'}},
+                y: {beginAtZero: true, grid: {color: 'rgba(45,49,72,0.5)'}, ticks: {color: '#5f637a', precision: 0}}
+            }
+        }
+    });
+
+    renderRanking();
+    ch3 = segmentChart('deviceChart', d.by_device);
+    ch4 = segmentChart('browserChart', d.by_browser);
+    renderSegments();
+    // Clicks newer than the server's analytics copy, counted like live-feed deltas
+    if (d.live_tail) applyClicks(d.live_tail);
+
+    // Attribution table
+    const attr = (isPlatform ? d.attribution : d.attribution_by_channel) || {};
+    const attrKeys = Object.keys(attr);
+    if (attrKeys.length > 0) {
+        const MODEL_HINTS = {
+            last: 'chaque inscription revient au dernier clic',
+            first: 'chaque inscription revient au premier clic',
+            linear: 'chaque inscription est partagée à parts égales entre les clics',
+            time_decay: `chaque inscription est partagée entre les clics, un clic comptant deux fois moins toutes les ${d.attribution_model.half_life_hours}h`
+        };
+        document.getElementById('attributionCard').style.display = 'block';
+        document.getElementById('attributionKey').textContent = isPlatform ? 'Plateforme' : 'Lien';
+        document.getElementById('attributionHint').textContent =
+            `Estimation basée sur les clics dans les ${d.attribution_model.lookback_hours}h précédant l'inscription d'un membre : ${MODEL_HINTS[d.attribution_model.model]}.`;
+        document.getElementById('attributionBody').innerHTML = attrKeys
+            .sort((a, b) => attr[b].signups - attr[a].signups)
+            .map(p => {
+                const a = attr[p];
+                const convRate = a.signups > 0 && byData[p] ? Math.round(a.signups / byData[p] * 100) : 0;
+                return `<tr>
+                    <td><span class="channel-badge" style="background:${getColor(p, 0)}22;color:${getColor(p, 0)}">${p}</span></td>
+                    <td><strong>${a.signups}</strong></td>
+                    <td>${a.paid}</td>
+                    <td style="color:var(--success)">$${a.mrr}/mois</td>
+                    <td>$${a.ltv}</td>
+                    <td>${convRate}%</td>
+                </tr>`;
+            }).join('');
+    } else {
+        document.getElementById('attributionCard').style.display = 'none';
+    }
+}
+
+let current = null, lastClickId = 0;
+
+function currentView() {
+    const isPlatform = document.getElementById('viewMode').value === 'platform';
+    return {
+        isPlatform,
+        byData: isPlatform ? current.by_platform : current.by_channel,
+        uniqueData: isPlatform ? current.unique_by_platform : current.unique_by_channel
+    };
+}
+
+function renderKpis() {
+    const {isPlatform, byData} = currentView();
+    const names = Object.keys(byData).sort((a, b) => byData[b] - byData[a]);
+    document.getElementById('clickKpis').innerHTML = `
+        <div class="kpi-card"><div class="kpi-value">${current.total}</div><div class="kpi-label">Clics totaux</div></div>
+        <div class="kpi-card"><div class="kpi-value">~${current.unique_total}</div><div class="kpi-label">Visiteurs uniques</div></div>
+        <div class="kpi-card"><div class="kpi-value">${current.bot_clicks}</div><div class="kpi-label">Clics de bots exclus</div></div>
+        <div class="kpi-card"><div class="kpi-value">${names.length}</div><div class="kpi-label">${isPlatform ? 'Plateformes' : 'Liens'} actifs</div></div>
+        <div class="kpi-card"><div class="kpi-value">${names[0] || '—'}</div><div class="kpi-label">Meilleur ${isPlatform ? 'plateforme' : 'lien'}</div></div>
+    `;
+}
+
+function renderRanking() {
+    const {byData, uniqueData} = currentView();
+    const names = Object.keys(byData).sort((a, b) => byData[b] - byData[a]);
+    const mx = byData[names[0]] || 1;
+    document.getElementById('ranking').innerHTML = names.map((n, i) => `
+        <div class="ranking-item">
+            <div class="ranking-pos">#${i + 1}</div>
+            <div class="ranking-channel"><span class="channel-badge" style="background:${getColor(n, i)}22;color:${getColor(n, i)};border:1px solid ${getColor(n, i)}44">${n}</span></div>
+            <div class="ranking-bar-wrapper"><div class="ranking-bar" style="width:${byData[n] / mx * 100}%;background:${getColor(n, i)}"></div></div>
+            <div class="ranking-count">${byData[n]} clics · ~${uniqueData[n] || 0} visiteurs</div>
+        </div>`).join('');
+}
+
+function segmentChart(canvas, counts) {
+    const names = Object.keys(counts).sort((a, b) => counts[b] - counts[a]);
+    return new Chart(canvas, {
+        type: 'doughnut',
+        data: {labels: names, datasets: [{data: names.map(n => counts[n]), backgroundColor: names.map((n, i) => PALETTE[i % PALETTE.length]), borderWidth: 0}]},
+        options: {
+            responsive: true, cutout: '65%',
+            plugins: {legend: {position: 'bottom', labels: {color: '#8b8fa3', font: {size: 12}}}}
+        }
+    });
+}
+
+// Referrer sites ranking, and devices + main referrer site per platform or link
+function renderSegments() {
+    const {isPlatform, byData} = currentView();
+    const refs = current.by_referrer;
+    const refNames = Object.keys(refs).sort((a, b) => refs[b] - refs[a]);
+    const mx = refs[refNames[0]] || 1;
+    document.getElementById('referrerRanking').innerHTML = refNames.length ? refNames.map((n, i) => `
+        <div class="ranking-item">
+            <div class="ranking-pos">#${i + 1}</div>
+            <div class="ranking-channel">${n}</div>
+            <div class="ranking-bar-wrapper"><div class="ranking-bar" style="width:${refs[n] / mx * 100}%;background:${PALETTE[i % PALETTE.length]}"></div></div>
+            <div class="ranking-count">${refs[n]} clics</div>
+        </div>`).join('') : '<p class="text-muted">Aucun clic sur la période.</p>';
+
+    const devices = Object.keys(current.by_device).sort((a, b) => current.by_device[b] - current.by_device[a]);
+    const byDevice = isPlatform ? current.device_by_platform : current.device_by_channel;
+    const byReferrer = isPlatform ? current.referrer_by_platform : current.referrer_by_channel;
+    const top = counts => Object.keys(counts || {}).sort((a, b) => counts[b] - counts[a])[0] || '—';
+    document.getElementById('segmentTitle').textContent = `📊 Appareils et sources par ${isPlatform ? 'plateforme' : 'lien'}`;
+    document.getElementById('segmentHead').innerHTML =
+        `<tr><th>${isPlatform ? 'Plateforme' : 'Lien'}</th>${devices.map(dv => `<th>${dv}</th>`).join('')}<th>Principal site référent</th></tr>`;
+    const rows = Object.keys(byDevice).sort((a, b) => (byData[b] || 0) - (byData[a] || 0));
+    document.getElementById('segmentBody').innerHTML = rows.map((n, i) => {
+        const counts = byDevice[n], total = Object.values(counts).reduce((a, b) => a + b, 0) || 1;
+        return `<tr>
+            <td><span class="channel-badge" style="background:${getColor(n, i)}22;color:${getColor(n, i)}">${n}</span></td>
+            ${devices.map(dv => `<td>${counts[dv] || 0} <span class="text-muted">(${Math.round((counts[dv] || 0) / total * 100)}%)</span></td>`).join('')}
+            <td>${top(byReferrer[n])}</td>
+        </tr>`;
+    }).join('');
+}
+
+// Live feed: fold click deltas into the loaded data and update the charts in place
+function applyClicks(ev) {
+    if (!current || ev.last_id <= lastClickId) return;
+    if (ev.from_id !== lastClickId) { load(); return; }  // missed or overlapping deltas: reload the snapshot
+    lastClickId = ev.last_id;
+    const isPlatform = document.getElementById('viewMode').value === 'platform';
+    current.bot_clicks += ev.bot_clicks;
+    for (const [day, delta] of Object.entries(ev.by_day)) {
+        for (const [key, daily, totals] of [['by_channel', current.daily_by_channel, current.by_channel],
+                                            ['by_platform', current.daily_by_platform, current.by_platform]]) {
+            daily[day] = daily[day] || {};
+            for (const [name, n] of Object.entries(delta[key])) {
+                daily[day][name] = (daily[day][name] || 0) + n;
+                totals[name] = (totals[name] || 0) + n;
+            }
+        }
+        const shown = isPlatform ? delta.by_platform : delta.by_channel;
+        for (const [name, n] of Object.entries(shown)) {
+            current.total += n;
+            // Pie: one slice per name
+            let i = ch1.data.labels.indexOf(name);
+            if (i < 0) {
+                i = ch1.data.labels.push(name) - 1;
+                ch1.data.datasets[0].data.push(0);
+                ch1.data.datasets[0].backgroundColor.push(getColor(name, i));
+            }
+            ch1.data.datasets[0].data[i] += n;
+            // Line: one point per day, one dataset per name
+            const label = day.slice(5);
+            let x = ch2.data.labels.indexOf(label);
+            if (x < 0) {
+                x = ch2.data.labels.push(label) - 1;
+                ch2.data.datasets.forEach(ds => ds.data.push(0));
+            }
+            let ds = ch2.data.datasets.find(ds => ds.label === name);
+            if (!ds) {
+                const color = getColor(name, ch2.data.datasets.length);
+                ds = {label: name, data: ch2.data.labels.map(() => 0), borderColor: color, backgroundColor: color + '20',
+                      tension: 0.3, pointRadius: 3, pointHoverRadius: 6, borderWidth: 2};
+                ch2.data.datasets.push(ds);
+            }
+            ds.data[x] += n;
+        }
+    }
+    ch1.update('none');
+    ch2.update('none');
+    renderKpis();
+    renderRanking();
+}
+
+// The server refuses viewers past its cap (503): the browser gives up, so try again later
+function openLiveFeed() {
+    const liveFeed = new EventSource(BASE+'/api/live');
+    liveFeed.addEventListener('clicks', e => applyClicks(JSON.parse(e.data)));
+    liveFeed.addEventListener('resync', () => load());
+    liveFeed.addEventListener('error', () => {
+        if (liveFeed.readyState === EventSource.CLOSED) setTimeout(openLiveFeed, 30000);
+    });
+}
+openLiveFeed();
+
+document.getElementById('period').addEventListener('change', load);
+document.getElementById('viewMode').addEventListener('change', load);
+document.getElementById('attrModel').addEventListener('change', load);
+document.getElementById('attrLookback').addEventListener('change', load);
+load();
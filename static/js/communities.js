@@ -0,0 +1,25 @@
+async function load(){
+    const d=await(await fetch(BASE+'/api/communities')).json();
+    const t=d.totals;
+    document.getElementById('totals').innerHTML=`
+        <div class="kpi-card"><div class="kpi-value">${d.communities.length}</div><div class="kpi-label">Communautés</div></div>
+        <div class="kpi-card"><div class="kpi-value">${t.active_members}</div><div class="kpi-label">Membres actifs</div></div>
+        <div class="kpi-card"><div class="kpi-value">$${t.mrr}</div><div class="kpi-label">MRR total</div></div>
+        <div class="kpi-card"><div class="kpi-value">${t.clicks_30d}</div><div class="kpi-label">Clics (30 jours)</div></div>
+    `;
+    document.getElementById('rollupBody').innerHTML=d.communities.map(c=>c.error
+        ? `<tr><td><strong>${c.name}</strong></td><td colspan="6" style="color:var(--danger)">${c.error}</td></tr>`
+        : `<tr>
+        <td><a href="${c.base}/dashboard"><strong>${c.name}</strong></a></td>
+        <td>${c.active_members}</td><td>${c.new_this_month}</td>
+        <td style="color:var(--success)">$${c.mrr}/mois</td><td>$${c.total_ltv}</td>
+        <td>${c.clicks_30d}</td><td>${c.last_import||'—'}</td>
+    </tr>`).join('');
+}
+async function createCommunity(){
+    const body={slug:document.getElementById('newSlug').value.trim(),name:document.getElementById('newName').value.trim(),skool_url:document.getElementById('newUrl').value.trim()};
+    const res=await(await fetch(BASE+'/api/communities/create',{method:'POST',headers:{'Content-Type':'application/json'},body:JSON.stringify(body)})).json();
+    document.getElementById('msg').innerHTML=`<div class="alert alert-${res.error?'error':'success'}">${res.error||res.message}</div>`;
+    if(!res.error) location.reload();
+}
+load();
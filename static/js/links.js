@@ -0,0 +1,37 @@
+// Live URL preview
+const platformSelect = document.querySelector('[name="platform"]');
+const linkNameInput = document.querySelector('[name="link_name"]');
+const preview = document.getElementById('previewUrl');
+
+function updatePreview() {
+    const p = platformSelect.value;
+    const n = linkNameInput.value.toLowerCase().replace(/[^a-z0-9-_]/g, '');
+    let slug = '';
+    if (p && n) slug = p + '-' + n;
+    else if (n) slug = n;
+    else if (p) slug = p;
+    if (slug) {
+        preview.innerHTML = '🔗 URL générée : <strong style="color:var(--accent)">' + GO_URL + '/' + slug + '</strong>';
+    } else {
+        preview.textContent = '';
+    }
+}
+platformSelect.addEventListener('change', updatePreview);
+linkNameInput.addEventListener('input', updatePreview);
+
+function copyLink(ch) {
+    navigator.clipboard.writeText(document.getElementById('url-'+ch).textContent).then(() => {
+        event.target.textContent = '✅';
+        setTimeout(() => event.target.textContent = '📋', 2000);
+    });
+}
+
+function deleteLink(id, channel) {
+    if (!confirm('⚠️ Supprimer le lien "' + channel + '" ?\n\nAttention : la suppression est DÉFINITIVE.\nToutes les données de clics associées seront aussi supprimées.')) return;
+    fetch(BASE+'/api/links/' + id + '/delete', {method: 'POST'})
+        .then(r => r.json())
+        .then(d => {
+            if (d.ok) document.getElementById('link-row-' + id).remove();
+            else alert('Erreur: ' + (d.error || 'inconnue'));
+        });
+}
@@ -0,0 +1,21 @@
+let timer;
+async function load(){
+    const s=document.getElementById('search').value;
+    const sort=document.getElementById('sortBy').value;
+    const order=document.getElementById('sortOrder').value;
+    const d=await(await fetch(BASE+`/api/members?search=${encodeURIComponent(s)}&sort=${sort}&order=${order}`)).json();
+    document.getElementById('memberCount').textContent=`${d.length} membre(s)`;
+    document.getElementById('membersBody').innerHTML=d.map(m=>`<tr>
+        <td><strong>${m.first_name} ${m.last_name}</strong></td>
+        <td style="color:var(--text-secondary);font-size:0.85rem">${m.email}</td>
+        <td>${m.joined_at.slice(0,10)}</td>
+        <td>${m.invited_by?'<span style="color:var(--accent)">'+m.invited_by+'</span>':'<span style="color:var(--text-muted)">—</span>'}</td>
+        <td>${m.price>0?'$'+m.price:'<span style="color:var(--text-muted)">gratuit</span>'}</td>
+        <td><span class="channel-badge" style="background:${m.tier==='premium'?'rgba(253,203,110,0.15)':'rgba(108,92,231,0.15)'};color:${m.tier==='premium'?'#fdcb6e':'#6c5ce7'}">${m.tier||'—'}</span></td>
+        <td>$${m.ltv}</td>
+    </tr>`).join('');
+}
+document.getElementById('search').addEventListener('input',()=>{clearTimeout(timer);timer=setTimeout(load,300);});
+document.getElementById('sortBy').addEventListener('change',load);
+document.getElementById('sortOrder').addEventListener('change',load);
+load();
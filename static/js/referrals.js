@@ -0,0 +1,29 @@
+async function load(){
+    const {referrals:d,referral_tree:t}=await(await fetch(BASE+'/api/bundle?widgets=referrals,referral_tree')).json();
+    const total=d.organic+d.referral;
+    const pct=total>0?Math.round(d.referral/total*100):0;
+    document.getElementById('refKpis').innerHTML=`
+        <div class="kpi-card"><div class="kpi-value">${d.referral}</div><div class="kpi-label">Via parrainage</div></div>
+        <div class="kpi-card"><div class="kpi-value">${d.organic}</div><div class="kpi-label">Organique</div></div>
+        <div class="kpi-card"><div class="kpi-value">${pct}%</div><div class="kpi-label">Taux de parrainage</div></div>
+        <div class="kpi-card"><div class="kpi-value">${d.top_referrers.length}</div><div class="kpi-label">Parrains actifs</div></div>
+    `;
+    new Chart('pieChart',{type:'doughnut',data:{labels:['Parrainage','Organique'],datasets:[{data:[d.referral,d.organic],backgroundColor:['#6c5ce7','#636e72'],borderWidth:0}]},options:{responsive:true,cutout:'65%',plugins:{legend:{position:'bottom',labels:{color:'#8b8fa3'}}}}});
+    const m=d.monthly;
+    new Chart('monthlyChart',{type:'bar',data:{labels:m.map(r=>r.month),datasets:[{label:'Parrainage',data:m.map(r=>r.referrals),backgroundColor:'#6c5ce7'},{label:'Organique',data:m.map(r=>r.organic),backgroundColor:'#636e72'}]},options:{responsive:true,scales:{x:{stacked:true,grid:{color:'rgba(45,49,72,0.5)'},ticks:{color:'#5f637a'}},y:{stacked:true,beginAtZero:true,grid:{color:'rgba(45,49,72,0.5)'},ticks:{color:'#5f637a',precision:0}}},plugins:{legend:{position:'bottom',labels:{color:'#8b8fa3'}}}}});
+    const maxR=d.top_referrers[0]?.count||1;
+    document.getElementById('topList').innerHTML=d.top_referrers.map((r,i)=>`
+        <div class="ranking-item">
+            <div class="ranking-pos">#${i+1}</div>
+            <div class="ranking-channel" style="min-width:180px"><strong>${r.name}</strong></div>
+            <div class="ranking-bar-wrapper"><div class="ranking-bar" style="width:${r.count/maxR*100}%;background:#6c5ce7"></div></div>
+            <div class="ranking-count">${r.count} filleul${r.count>1?'s':''}</div>
+        </div>`).join('');
+    if(t.unresolved>0) document.getElementById('treeHint').textContent+=` ${t.unresolved} filleul${t.unresolved>1?'s':''} dont le parrain est introuvable parmi les membres.`;
+    document.getElementById('treeBody').innerHTML=t.referrers.map(r=>`<tr>
+        <td><strong>${r.name}</strong>${r.status==='churned'?' <span style="color:var(--text-muted)">(parti)</span>':''}</td>
+        <td>${r.direct}</td><td>${r.size}</td><td>${r.depth}</td>
+        <td>$${r.ltv}</td><td style="color:var(--success)">$${r.mrr}/mois</td>
+    </tr>`).join('')||'<tr><td colspan="6" class="text-muted">Aucun parrainage résolu</td></tr>';
+}
+load();
@@ -0,0 +1,36 @@
+async function load(){
+    const {revenue:d,overview:o,mrr_movements:mv}=await(await fetch(BASE+'/api/bundle?widgets=revenue,overview,mrr_movements')).json();
+    document.getElementById('revKpis').innerHTML=`
+        <div class="kpi-card"><div class="kpi-value">\$${o.mrr.toLocaleString()}</div><div class="kpi-label">MRR</div></div>
+        <div class="kpi-card"><div class="kpi-value">${d.paid}</div><div class="kpi-label">Membres payants</div></div>
+        <div class="kpi-card"><div class="kpi-value">${d.free}</div><div class="kpi-label">Membres gratuits</div></div>
+        <div class="kpi-card"><div class="kpi-value">\$${o.avg_ltv}</div><div class="kpi-label">LTV moyen</div></div>
+    `;
+    new Chart('freePaidChart',{type:'doughnut',data:{labels:['Payants','Gratuits'],datasets:[{data:[d.paid,d.free],backgroundColor:['#6c5ce7','#636e72'],borderWidth:0}]},options:{responsive:true,cutout:'65%',plugins:{legend:{position:'bottom',labels:{color:'#8b8fa3'}}}}});
+    movements(mv);
+    const mr=d.monthly_revenue;
+    new Chart('monthlyRevChart',{type:'bar',data:{labels:mr.map(r=>r.month),datasets:[{label:'Revenus ($)',data:mr.map(r=>r.revenue),backgroundColor:'#00b894'}]},options:{responsive:true,plugins:{legend:{display:false}},scales:{x:{grid:{color:'rgba(45,49,72,0.5)'},ticks:{color:'#5f637a'}},y:{beginAtZero:true,grid:{color:'rgba(45,49,72,0.5)'},ticks:{color:'#5f637a'}}}}});
+    new Chart('priceChart',{type:'bar',data:{labels:d.prices.map(r=>'$'+r.price),datasets:[{label:'Membres',data:d.prices.map(r=>r.count),backgroundColor:'#0984e3'}]},options:{responsive:true,indexAxis:'y',plugins:{legend:{display:false}},scales:{x:{grid:{color:'rgba(45,49,72,0.5)'},ticks:{color:'#5f637a'}},y:{grid:{display:false},ticks:{color:'#e8eaf0'}}}}});
+    new Chart('ltvChart',{type:'bar',data:{labels:d.ltv_buckets.map(r=>'$'+r.bucket),datasets:[{label:'Membres',data:d.ltv_buckets.map(r=>r.count),backgroundColor:'#fdcb6e'}]},options:{responsive:true,plugins:{legend:{display:false}},scales:{x:{grid:{color:'rgba(45,49,72,0.5)'},ticks:{color:'#5f637a'}},y:{beginAtZero:true,grid:{color:'rgba(45,49,72,0.5)'},ticks:{color:'#5f637a',precision:0}}}}});
+}
+const MOVEMENTS=[['new','Nouveau','#00b894'],['expansion','Expansion','#55efc4'],['contraction','Contraction','#fdcb6e'],['churned','Churn','#d63031'],['reactivated','Réactivé','#6c5ce7']];
+const GRID={x:{grid:{color:'rgba(45,49,72,0.5)'},ticks:{color:'#5f637a'}},y:{grid:{color:'rgba(45,49,72,0.5)'},ticks:{color:'#5f637a',callback:v=>'$'+v}}};
+let waterfall;
+function movements(mv){
+    if(!mv.length){document.getElementById('noMovements').style.display='block';return;}
+    const select=document.getElementById('movementBatch');
+    select.innerHTML=[...mv].reverse().map((m,i)=>`<option value="${mv.length-1-i}">${m.uploaded_at.slice(0,16)}</option>`).join('');
+    select.onchange=()=>showWaterfall(mv[select.value]);
+    showWaterfall(mv[mv.length-1]);
+    new Chart('movementsChart',{type:'bar',data:{labels:mv.map(m=>m.uploaded_at.slice(0,10)),datasets:MOVEMENTS.map(([k,label,color])=>({label,data:mv.map(m=>m[k].mrr),backgroundColor:color}))},options:{responsive:true,plugins:{legend:{position:'bottom',labels:{color:'#8b8fa3'}}},scales:{x:{...GRID.x,stacked:true},y:{...GRID.y,stacked:true}}}});
+}
+function showWaterfall(m){
+    // Floating bars: each movement starts where the previous one ended
+    let level=m.starting_mrr;
+    const bars=[[0,m.starting_mrr]],colors=['#636e72'],labels=['Début'];
+    for(const [k,label,color] of MOVEMENTS){bars.push([level,level+m[k].mrr]);level+=m[k].mrr;colors.push(color);labels.push(`${label} (${m[k].members})`);}
+    bars.push([0,m.ending_mrr]);colors.push('#0984e3');labels.push('Fin');
+    if(waterfall)waterfall.destroy();
+    waterfall=new Chart('waterfallChart',{type:'bar',data:{labels,datasets:[{label:'MRR ($)',data:bars,backgroundColor:colors}]},options:{responsive:true,plugins:{legend:{display:false},tooltip:{callbacks:{label:c=>{const [a,b]=c.raw;const v=Math.round((b-a)*100)/100;const sign=c.dataIndex&&c.dataIndex<bars.length-1?(v<0?'−':'+'):'';return sign+'$'+Math.abs(v).toLocaleString();}}}},scales:GRID}});
+}
+load();
@@ -0,0 +1,29 @@
+async function loadUsers(){
+    const d=await(await fetch(BASE+'/api/users')).json();
+    document.getElementById('usersBody').innerHTML=d.map(u=>`<tr>
+        <td>${u.id}</td><td><strong>${u.username}</strong></td>
+        <td><span class="channel-badge" style="background:${u.role==='admin'?'rgba(253,203,110,0.15)':'rgba(108,92,231,0.15)'};color:${u.role==='admin'?'#fdcb6e':'#6c5ce7'}">${u.role}</span></td>
+        <td>${u.created_at}</td>
+        <td style="display:flex;gap:0.5rem">
+            <button class="btn btn-copy" onclick="changePass(${u.id},'${u.username}')">🔑</button>
+            <button class="btn btn-copy" style="color:var(--danger)" onclick="deleteUser(${u.id},'${u.username}')">🗑️</button>
+        </td></tr>`).join('');
+}
+async function createUser(){
+    const u=document.getElementById('newUser').value,p=document.getElementById('newPass').value,r=document.getElementById('newRole').value;
+    const res=await(await fetch(BASE+'/api/users/create',{method:'POST',headers:{'Content-Type':'application/json'},body:JSON.stringify({username:u,password:p,role:r})})).json();
+    document.getElementById('msg').innerHTML=`<div class="alert alert-${res.error?'error':'success'}">${res.error||res.message}</div>`;
+    if(!res.error){document.getElementById('newUser').value='';document.getElementById('newPass').value='';loadUsers();}
+}
+async function changePass(id,name){
+    const pw=prompt('Nouveau mot de passe pour '+name+' :');
+    if(!pw)return;
+    await fetch(BASE+'/api/users/'+id+'/password',{method:'POST',headers:{'Content-Type':'application/json'},body:JSON.stringify({password:pw})});
+    alert('Mot de passe modifié !');
+}
+async function deleteUser(id,name){
+    if(!confirm('Supprimer '+name+' ?'))return;
+    const res=await(await fetch(BASE+'/api/users/'+id+'/delete',{method:'POST'})).json();
+    if(res.error)alert(res.error);else loadUsers();
+}
+loadUsers();
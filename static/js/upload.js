@@ -0,0 +1,12 @@
+// Progress of this upload, from the live feed; opened only on submit since every
+// open feed holds a server thread
+const importProgress = document.getElementById('importProgress');
+document.querySelector('.import-form').addEventListener('submit', () => {
+    new EventSource(BASE+'/api/live').addEventListener('import', e => {
+        const ev = JSON.parse(e.data);
+        importProgress.style.display = 'block';
+        importProgress.textContent = ev.phase === 'done'
+            ? `Import ${ev.job} terminé : ${ev.total} lignes traitées.`
+            : `Import ${ev.job} en cours : ${ev.done} / ${ev.total} lignes (${ev.total ? Math.round(ev.done / ev.total * 100) : 0}%)`;
+    });
+});
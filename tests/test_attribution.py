@@ -0,0 +1,54 @@
+import math
+import random
+
+import attribution
+
+HOUR = 3600
+JOIN = 1_700_000_000 - 1_700_000_000 % 60
+
+
+def brute_time_decay(clicks, members, lookback_hours, half_life_hours):
+    """Decayed signup credit per channel, computed click by click in log space."""
+    credit = {}
+    for join, *_ in members:
+        # [start of the (join - lookback) minute, end of the join minute)
+        lo = join - lookback_hours * HOUR
+        lo -= lo % 60
+        hi = join - join % 60 + 60
+        window = [(ch, t) for ch, times in clicks.items() for t in times if lo <= t < hi]
+        if not window:
+            continue
+        exponents = [-(join - t) / (half_life_hours * HOUR) for _, t in window]
+        top = max(exponents)
+        total = sum(2.0 ** (e - top) for e in exponents)
+        for (ch, _), e in zip(window, exponents):
+            credit[ch] = credit.get(ch, 0.0) + 2.0 ** (e - top) / total
+    return credit
+
+
+def attribute(clicks, members, lookback_hours, half_life_hours):
+    index = attribution.ClickIndex()
+    index.add({ch: list(times) for ch, times in clicks.items()})
+    result = index.attribute(members, "time_decay", lookback_hours, half_life_hours)
+    return {ch: v["signups"] for ch, v in result.items()}
+
+
+def assert_close(result, expected):
+    for ch in set(result) | set(expected):
+        assert math.isclose(result.get(ch, 0.0), expected.get(ch, 0.0), rel_tol=1e-9, abs_tol=1e-9), (ch, result, expected)
+
+
+def test_time_decay_join_long_after_the_last_era():
+    clicks = {"c0": [JOIN - 520 * HOUR], "c1": [JOIN - 1080 * HOUR]}
+    members = [(JOIN, 0, 0, 0)]
+    result = attribute(clicks, members, 2000, 1)
+    assert_close(result, {"c0": 1.0})
+    assert_close(result, brute_time_decay(clicks, members, 2000, 1))
+
+
+def test_time_decay_matches_brute_force_with_short_half_life():
+    rnd = random.Random(3)
+    start = JOIN - 3000 * HOUR
+    clicks = {f"c{i}": sorted(start + rnd.randrange(3000 * 60) * 60 for _ in range(40)) for i in range(4)}
+    members = sorted((start + rnd.randrange(3200 * 60) * 60, 0, 0, 0) for _ in range(60))
+    assert_close(attribute(clicks, members, 2000, 1), brute_time_decay(clicks, members, 2000, 1))
@@ -0,0 +1,150 @@
+"""Time-series queries: date ranges, gap filling on a calendar table and downsampling.
+
+The calendar table holds one row per day with its ISO week and month, generated
+once per database. Series are built by joining per-day event counts onto it, so
+empty days, weeks and months come back as zeros and weeks follow ISO 8601
+(2024-W01 starts on Monday 2024-01-01; 2021-01-03 belongs to 2020-W53).
+"""
+from datetime import date, timedelta
+
+CALENDAR_START = date(2000, 1, 1)
+CALENDAR_END = date(2050, 12, 31)
+GRANULARITIES = {"day": "day", "week": "iso_week", "month": "month"}
+MAX_POINTS = 400
+
+
+class RangeError(ValueError):
+    pass
+
+
+def fill_calendar(db):
+    """Generate the calendar rows once (init_schema); later calls are no-ops."""
+    if db.execute("SELECT 1 FROM calendar LIMIT 1").fetchone():
+        return
+    rows = []
+    d = CALENDAR_START
+    while d <= CALENDAR_END:
+        year, week, _ = d.isocalendar()
+        rows.append((d.isoformat(), f"{year}-W{week:02d}", d.isoformat()[:7]))
+        d += timedelta(days=1)
+    db.executemany("INSERT INTO calendar (day, iso_week, month) VALUES (?, ?, ?)", rows)
+
+
+def parse_day(value, default=None):
+    if not value:
+        return default
+    try:
+        day = date.fromisoformat(value[:10])
+    except ValueError:
+        raise RangeError(f"Date invalide : {value}")
+    if not CALENDAR_START <= day <= CALENDAR_END:
+        raise RangeError(f"Date hors calendrier : {value}")
+    return day
+
+
+def parse_count(args, name, default):
+    """Positive integer query argument `name` (default when missing). Raises RangeError otherwise."""
+    try:
+        value = int(args.get(name, default))
+    except ValueError:
+        value = 0
+    if value < 1:
+        raise RangeError(f"Paramètre {name} invalide : entier positif attendu")
+    return value
+
+
+def parse_range(args, default_start, today, default_granularity="day"):
+    """(start, end, granularity, max_points) from ?from=&to=&granularity=&points=.
+
+    default_start is used when `from` is missing (None = no data, empty series).
+    Raises RangeError on malformed input.
+    """
+    granularity = args.get("granularity", default_granularity)
+    if granularity not in GRANULARITIES:
+        raise RangeError(f"Granularité inconnue : {granularity}")
+    end = parse_day(args.get("to"), today)
+    start = parse_day(args.get("from"), default_start)
+    if start is not None:
+        start = max(start, CALENDAR_START)
+        if start > end:
+            raise RangeError("La date de début est après la date de fin")
+    try:
+        max_points = int(args.get("points", MAX_POINTS))
+    except ValueError:
+        raise RangeError("Nombre de points invalide")
+    if max_points < 0:
+        raise RangeError("Nombre de points invalide")
+    return start, end, granularity, max_points
+
+
+def series(db, source, params, start, end, granularity="day", keyed=False, max_points=MAX_POINTS):
+    """Gap-filled series over [start, end].
+
+    source is a SELECT returning one row per day with `day` (YYYY-MM-DD) and
+    `value` columns, plus `key` when keyed. Returns ([(period, value)], step) or,
+    keyed, ([(period, {key: value})], step); step > 1 means every point sums
+    `step` consecutive buckets to stay under max_points (0 = no limit).
+    """
+    if start is None:
+        return [], 1
+    col = GRANULARITIES[granularity]
+    key = "e.key" if keyed else "NULL"
+    rows = db.execute(f"""
+        SELECT c.{col} AS period, {key} AS key, SUM(e.value) AS value
+        FROM calendar c LEFT JOIN ({source}) e ON e.day = c.day
+        WHERE c.day BETWEEN ? AND ?
+        GROUP BY c.{col}, {key}
+        ORDER BY c.{col}
+    """, (*params, start.isoformat(), end.isoformat())).fetchall()
+
+    points = []
+    for r in rows:
+        if not points or points[-1][0] != r["period"]:
+            points.append((r["period"], {} if keyed else 0))
+        if r["value"] is None:
+            continue
+        if keyed:
+            points[-1][1][r["key"]] = r["value"]
+        else:
+            points[-1] = (r["period"], r["value"])
+    return downsample(points, max_points, keyed)
+
+
+def fill(db, counts, start, end, granularity="day", max_points=MAX_POINTS):
+    """Same as series() for per-day counts already aggregated in Python ({"YYYY-MM-DD": n})."""
+    if start is None:
+        return [], 1
+    points = []
+    for day, period in db.execute(
+        f"SELECT day, {GRANULARITIES[granularity]} FROM calendar WHERE day BETWEEN ? AND ? ORDER BY day",
+        (start.isoformat(), end.isoformat())
+    ).fetchall():
+        if not points or points[-1][0] != period:
+            points.append((period, 0))
+        if day in counts:
+            points[-1] = (period, points[-1][1] + counts[day])
+    return downsample(points, max_points)
+
+
+def downsample(points, max_points, keyed=False):
+    """Merge consecutive buckets (summing counts) so at most max_points remain."""
+    if not max_points or len(points) <= max_points:
+        return points, 1
+    step = -(-len(points) // max_points)
+    merged = []
+    for i in range(0, len(points), step):
+        chunk = points[i:i + step]
+        if keyed:
+            total = {}
+            for _, values in chunk:
+                for k, v in values.items():
+                    total[k] = total.get(k, 0) + v
+        else:
+            total = sum(v for _, v in chunk)
+        merged.append((chunk[0][0], total))
+    return merged, step
+
+
+def range_info(start, end, granularity, step):
+    return {"from": start.isoformat() if start else None, "to": end.isoformat(),
+            "granularity": granularity, "step": step}
@@ -0,0 +1,223 @@
+"""Dashboard widgets computed together from one scan of members (/api/bundle).
+
+The member columns every widget reads are loaded with a single SELECT into
+parallel arrays (MemberColumns) and kept per database until the next import;
+each requested widget then aggregates those in-memory columns, so a bundle costs
+one table scan at most. /api/overview, /api/revenue, /api/referrals and
+/api/churn are the one-widget case of the same code.
+"""
+import heapq
+import re
+import threading
+from array import array
+from collections import Counter
+from datetime import datetime, timedelta
+
+import mrr_movements
+import timeseries
+from referrals import tree_summary
+
+COLUMNS = ("status", "email", "joined_at", "churned_at", "price", "ltv", "recurring_interval", "tier",
+           "invited_by", "first_name", "last_name")
+NUMERIC = {"price", "ltv"}
+
+# Mirrors SQL `email LIKE '__no_email_%'`: '_' matches any character, case-insensitive
+_PLACEHOLDER = re.compile(r"..no.email.", re.IGNORECASE | re.DOTALL)
+
+LTV_BUCKETS = ((30, "1-30"), (60, "31-60"), (100, "61-100"), (200, "101-200"))
+
+
+class MemberColumns:
+    """Member columns loaded with one SELECT: numbers in array('d'), strings in tuples."""
+
+    def __init__(self, db):
+        cur = db.cursor()
+        cur.row_factory = None
+        rows = cur.execute(f"SELECT {', '.join(COLUMNS)} FROM members").fetchall()
+        self.length = len(rows)
+        transposed = zip(*rows) if rows else [()] * len(COLUMNS)
+        for name, values in zip(COLUMNS, transposed):
+            setattr(self, name, array("d", [v or 0 for v in values]) if name in NUMERIC else values)
+        self.month = tuple(j[:7] for j in self.joined_at)
+        # email NOT LIKE '__no_email_%' (NULL emails match neither side, as in SQL)
+        self.real = tuple(e is not None and not _PLACEHOLDER.match(e) for e in self.email)
+
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def member_columns(db, key):
+    """MemberColumns for a database, reloaded when its import version changes."""
+    version = tuple(db.execute(
+        "SELECT (SELECT MAX(id) FROM upload_history), (SELECT COUNT(*) FROM members), (SELECT MAX(id) FROM members)"
+    ).fetchone())
+    cached = _cache.get(key)
+    if cached and cached[0] == version:
+        return cached[1]
+    cols = MemberColumns(db)
+    with _cache_lock:
+        _cache[key] = (version, cols)
+    return cols
+
+
+def _ltv_bucket(ltv):
+    if ltv == 0:
+        return "0 (gratuit)"
+    for upper, label in LTV_BUCKETS:
+        if ltv <= upper:
+            return label
+    return "200+"
+
+
+def _days_between(start, end):
+    try:
+        return (datetime.fromisoformat(end) - datetime.fromisoformat(start)).total_seconds() / 86400
+    except (TypeError, ValueError):
+        return None
+
+
+def _ranked(counter, limit=None):
+    items = sorted(counter.items(), key=lambda kv: (-kv[1], kv[0]))
+    return items[:limit] if limit else items
+
+
+# ---------- widgets ----------
+
+def overview(c, db, args, now):
+    this_month = now.strftime("%Y-%m")
+    last_month = (now.replace(day=1) - timedelta(days=1)).strftime("%Y-%m")
+    statuses = Counter(c.status)
+    total = statuses["active"]
+    by_month = Counter(c.month)
+    this_month_new, last_month_new = by_month[this_month], by_month[last_month]
+
+    # MRR — only count active members who have actually paid (LTV > 0)
+    mrr = annual = 0.0
+    for status, price, ltv, interval in zip(c.status, c.price, c.ltv, c.recurring_interval):
+        if status == "active" and price > 0 and ltv > 0:
+            if interval == "month":
+                mrr += price
+            elif interval == "year":
+                annual += price
+    mrr += annual / 12
+    paid_ltv = [v for v in c.ltv if v > 0]
+    referral_count = sum(1 for v in c.invited_by if v)
+
+    growth = 0
+    if last_month_new > 0:
+        growth = round((this_month_new - last_month_new) / last_month_new * 100, 1)
+    return {
+        "total_members": total,
+        "total_ever": sum(c.real),
+        "churned": statuses["churned"],
+        "this_month_new": this_month_new,
+        "last_month_new": last_month_new,
+        "growth_pct": growth,
+        "mrr": round(mrr, 2),
+        "avg_ltv": round(sum(paid_ltv) / len(paid_ltv), 2) if paid_ltv else 0,
+        "total_ltv": round(sum(c.ltv), 2),
+        "referral_count": referral_count,
+        "referral_pct": round(referral_count / total * 100, 1) if total > 0 else 0,
+        "monthly": [{"month": m, "count": by_month[m]} for m in sorted(by_month)],
+    }
+
+
+def revenue(c, db, args, now):
+    prices = Counter(p for p in c.price if p > 0)
+    revenue_by_month, paid_by_month = Counter(), Counter()
+    for month, price in zip(c.month, c.price):
+        if price > 0:
+            revenue_by_month[month] += price
+            paid_by_month[month] += 1
+    buckets, bucket_min = Counter(), {}
+    for ltv in c.ltv:
+        bucket = _ltv_bucket(ltv)
+        buckets[bucket] += 1
+        if ltv < bucket_min.get(bucket, float("inf")):
+            bucket_min[bucket] = ltv
+    return {
+        "prices": [{"price": p, "count": n} for p, n in _ranked(prices)],
+        "tiers": [{"tier": t, "count": n} for t, n in _ranked(Counter(filter(None, c.tier)))],
+        "ltv_buckets": [{"bucket": b, "count": buckets[b]} for b in sorted(buckets, key=bucket_min.get)],
+        "monthly_revenue": [{"month": m, "revenue": revenue_by_month[m], "members": paid_by_month[m]}
+                            for m in sorted(paid_by_month)],
+        "free": c.price.count(0),
+        "paid": sum(prices.values()),
+    }
+
+
+def referrals(c, db, args, now):
+    referrers = Counter(filter(None, c.invited_by))
+    referral_months = Counter(m for m, v in zip(c.month, c.invited_by) if v)
+    organic_months = Counter(m for m, v in zip(c.month, c.invited_by) if v == "")
+    return {
+        "top_referrers": [{"name": name, "count": n} for name, n in _ranked(referrers, 20)],
+        "organic": c.invited_by.count(""),
+        "referral": sum(referrers.values()),
+        "monthly": [{"month": m, "referrals": referral_months[m], "organic": organic_months[m]}
+                    for m in sorted(set(c.month))],
+    }
+
+
+def churn(c, db, args, now):
+    churned = [i for i, status in enumerate(c.status) if status == "churned"]
+    active = sum(1 for status, real in zip(c.status, c.real) if status == "active" and real)
+    churn_days, lifetimes = Counter(), []
+    for i in churned:
+        if c.churned_at[i]:
+            churn_days[c.churned_at[i][:10]] += 1
+            days = _days_between(c.joined_at[i], c.churned_at[i]) if c.joined_at[i] else None
+            if days is not None:
+                lifetimes.append(days)
+
+    # Churn by month (when they churned), months without departures included
+    start, end, _, max_points = timeseries.parse_range(
+        args, timeseries.parse_day(min(churn_days)) if churn_days else None, now.date()
+    )
+    monthly_churn, step = timeseries.fill(db, churn_days, start, end, "month", max_points)
+
+    total_ever = active + len(churned)
+    churn_pct = round(len(churned) / total_ever * 100, 1) if total_ever > 0 else 0
+    latest = heapq.nlargest(100, churned, key=lambda i: c.churned_at[i] or "")
+    return {
+        "active": active,
+        "churned": len(churned),
+        "total_ever": total_ever,
+        "churn_pct": churn_pct,
+        "retention_pct": round(100 - churn_pct, 1),
+        "lost_ltv": round(sum(c.ltv[i] for i in churned), 2),
+        "avg_lifetime_days": round(sum(lifetimes) / len(lifetimes), 0) if lifetimes else 0,
+        "monthly_churn": [{"month": month, "count": count} for month, count in monthly_churn],
+        "range": timeseries.range_info(start, end, "month", step),
+        "churned_list": [{
+            "name": f"{c.first_name[i]} {c.last_name[i]}",
+            "email": c.email[i], "joined_at": c.joined_at[i],
+            "churned_at": c.churned_at[i], "ltv": c.ltv[i],
+            "invited_by": c.invited_by[i]
+        } for i in latest],
+    }
+
+
+SCANNED = {"overview": overview, "revenue": revenue, "referrals": referrals, "churn": churn}
+# Widgets that read other tables, computed by their own query
+SEPARATE = {
+    "referral_tree": lambda db, args, now: tree_summary(db, timeseries.parse_count(args, "limit", 50)),
+    "mrr_movements": lambda db, args, now: mrr_movements.recent(
+        db, timeseries.parse_count(args, "imports", mrr_movements.MAX_IMPORTS)),
+}
+WIDGETS = tuple(SCANNED) + tuple(SEPARATE)
+
+
+def compute(db, names, args, now, key=None):
+    """{widget: payload} for the requested widgets. Raises timeseries.RangeError on a bad range."""
+    cols = None
+    result = {}
+    for name in names:
+        if name in SCANNED:
+            if cols is None:
+                cols = member_columns(db, key) if key else MemberColumns(db)
+            result[name] = SCANNED[name](cols, db, args, now)
+        else:
+            result[name] = SEPARATE[name](db, args, now)
+    return result